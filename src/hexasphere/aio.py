@@ -0,0 +1,221 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+from hexasphere.batch import X_to_latlon, ids_to_polygons, ids_to_str
+from hexasphere.batch import latlon_to_ids, pack_ids, str_to_ids
+from hexasphere.hexgrid import Hexagon
+
+
+class AsyncHexGrid:
+    """
+    Asyncio wrappers of `HexGrid` methods
+
+    Concurrent single-point requests received within a short time window are
+    gathered into one call of the batch functions (see `batch`), which is run
+    on an executor, so that the event loop is never blocked. Each caller gets
+    its own result back.
+
+    ```
+    agrid = AsyncHexGrid(grid)
+    hexagons = await agrid.latlon_to_hex(lat, lon, n, out_str=True)
+    ```
+    """
+
+    def __init__(self, grid, window=0.002, max_batch=10000, executor=None):
+        """
+        ## Parameters
+
+        - grid : HexGrid
+
+        The grid must not be overlapping
+
+        - window : float, optional
+
+        Time (in s) a request waits for other requests to be batched with
+
+        - max_batch : int, optional
+
+        Maximum number of requests in a batch. A full batch is run without
+        waiting for the end of the window
+
+        - executor : concurrent.futures.Executor, optional
+
+        Executor the batches are run on, the default executor of the event
+        loop if not provided
+        """
+        self.grid = grid
+
+        # The batch functions are run once, from this thread, so that the
+        # compiled kernels (see `kernels`) are ready before the first request
+        ids = latlon_to_ids(grid, [0.0], [0.0], 0)
+        ids_to_polygons(grid, ids)
+
+        self._batchers = {
+            "latlon_to_hex": _MicroBatcher(
+                self._latlon_to_hex_batch, window, max_batch, executor
+            ),
+            "retrieve_polygon": _MicroBatcher(
+                self._retrieve_polygon_batch, window, max_batch, executor
+            ),
+        }
+
+    async def latlon_to_hex(self, lat, lon, n, out_str=False):
+        """
+        Async version of `HexGrid.latlon_to_hex`
+        """
+        if self.grid.margin > 0:
+            raise ValueError("AsyncHexGrid doesn't support overlapping grids")
+
+        return await self._batchers["latlon_to_hex"].submit(
+            (n, out_str), (lat, lon)
+        )
+
+    async def retrieve_polygon(
+        self, hexagon, out_latlon=False, out_lonlat=False, out_geojson=False
+    ):
+        """
+        Async version of `Hexagon.retrieve_polygon` (without overlap)
+
+        hexagon can be an Hexagon or a string id. Pentagons have 5 vertices.
+        """
+        if isinstance(hexagon, str):
+            hex_id = int(str_to_ids([hexagon])[0])
+            n = sum(int(x) for x in hexagon[1:].split("-")) // 2 - 1
+        else:
+            hex_id = int(pack_ids(hexagon.face, hexagon.pos))
+            n = hexagon.n
+
+        return await self._batchers["retrieve_polygon"].submit(
+            (n, out_latlon, out_lonlat, out_geojson), hex_id
+        )
+
+    def stats(self):
+        """
+        Returns the request and batch counts, batch sizes and latencies (in
+        s) of each method
+        """
+        return {name: b.stats() for name, b in self._batchers.items()}
+
+    def _latlon_to_hex_batch(self, key, points):
+        n, out_str = key
+        lat, lon = np.array(points, dtype=float).T
+
+        str_ids = ids_to_str(latlon_to_ids(self.grid, lat, lon, n))
+        if out_str:
+            return [[str_id] for str_id in str_ids]
+        return [[Hexagon(self.grid, str_id=str_id)] for str_id in str_ids]
+
+    def _retrieve_polygon_batch(self, key, ids):
+        _, out_latlon, out_lonlat, out_geojson = key
+
+        X, index = ids_to_polygons(self.grid, np.array(ids, dtype=np.int64))
+        if out_latlon:
+            X = X_to_latlon(X)
+        elif out_lonlat or out_geojson:
+            X = X_to_latlon(X)[:, ::-1]
+
+        res = []
+        for vertices in index:
+            polygon = list(X[vertices[vertices >= 0]])
+            if out_latlon or out_lonlat or out_geojson:
+                polygon = [x.tolist() for x in polygon]
+                polygon.append(polygon[0])
+            if out_geojson:
+                polygon = {"coordinates": [polygon], "type": "Polygon"}
+            res.append(polygon)
+
+        return res
+
+
+class _MicroBatcher:
+    """
+    Gathers the items submitted within a time window (by key), and computes
+    them with a single call of func(key, items) on an executor
+    """
+
+    def __init__(self, func, window, max_batch, executor, history=10000):
+        self.func = func
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = executor
+
+        self._pending = {}
+        self._timers = {}
+        self._tasks = set()
+
+        self.requests = 0
+        self.batches = 0
+        self._batch_sizes = deque(maxlen=history)
+        self._latencies = deque(maxlen=history)
+
+    async def submit(self, key, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future, time.perf_counter()))
+        self.requests += 1
+
+        if len(pending) >= self.max_batch:
+            self._flush(key)
+        elif len(pending) == 1:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(key, [])
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key, batch):
+        loop = asyncio.get_running_loop()
+        items = [item for item, _, _ in batch]
+
+        self.batches += 1
+        self._batch_sizes.append(len(batch))
+
+        try:
+            results = await loop.run_in_executor(
+                self.executor, self.func, key, items
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        end = time.perf_counter()
+        for (_, future, start), result in zip(batch, results):
+            self._latencies.append(end - start)
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """
+        Latencies and batch sizes are computed over the last batches
+        """
+        sizes = np.array(self._batch_sizes)
+        latencies = np.array(self._latencies)
+
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": float(sizes.mean()) if len(sizes) else 0.0,
+            "max_batch_size": int(sizes.max()) if len(sizes) else 0,
+            "latency_p50": (
+                float(np.percentile(latencies, 50)) if len(latencies) else 0.0
+            ),
+            "latency_p99": (
+                float(np.percentile(latencies, 99)) if len(latencies) else 0.0
+            ),
+        }
@@ -0,0 +1,195 @@
+"""
+Columnar I/O with Apache Arrow (and thus Parquet)
+
+pyarrow is optional, and only required by the functions of this module.
+Buffers are shared between NumPy and Arrow, without copies, whenever the
+types allow it: float64 coordinates without nulls, and ids as uint64.
+
+```
+import pyarrow.parquet as pq
+
+table = pq.read_table("events.parquet")
+ids = arrow.latlon_to_ids(grid, table["lat"], table["lon"], n)
+pq.write_table(arrow.aggregate(ids, table["value"]), "cells.parquet")
+```
+"""
+
+import numpy as np
+
+from hexasphere import batch
+from hexasphere.batch import CHUNK_SIZE, STR_ID_WIDTH
+from hexasphere.batch import bytes_to_ids, ids_to_bytes, str_to_ids
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _require():
+    if pa is None:
+        raise ImportError("pyarrow is not installed")
+
+
+def to_numpy(array):
+    """
+    Returns the values of an Arrow array (or chunked array) without nulls,
+    without copy when possible (a single chunk of a primitive type)
+    """
+    _require()
+    if array.null_count:
+        raise ValueError(f"{array.null_count} null values")
+
+    if isinstance(array, pa.ChunkedArray):
+        if array.num_chunks == 1:
+            array = array.chunk(0)
+        else:
+            return array.to_numpy()
+
+    return array.to_numpy(zero_copy_only=False)
+
+
+def latlon_to_ids(grid, lat, lon, n, chunk_size=CHUNK_SIZE):
+    """
+    Returns the packed ids (see `batch.latlon_to_ids`) of Arrow columns of
+    latitudes and longitudes, in degrees, as an Arrow uint64 array
+
+    Chunked columns with the same chunks give a chunked array
+    """
+    _require()
+
+    if (
+        isinstance(lat, pa.ChunkedArray)
+        and isinstance(lon, pa.ChunkedArray)
+        and lat.num_chunks > 1
+        and [len(c) for c in lat.chunks] == [len(c) for c in lon.chunks]
+    ):
+        return pa.chunked_array(
+            [
+                latlon_to_ids(grid, lat_i, lon_i, n, chunk_size)
+                for lat_i, lon_i in zip(lat.chunks, lon.chunks)
+            ],
+            type=pa.uint64(),
+        )
+
+    ids = batch.latlon_to_ids(
+        grid, to_numpy(lat), to_numpy(lon), n, chunk_size=chunk_size
+    )
+    return ids_to_arrow(ids)
+
+
+def ids_to_arrow(ids, dictionary=False):
+    """
+    Returns packed ids as an Arrow array
+
+    ## Parameters
+
+    - ids : np.array, dtype = int64
+
+    - dictionary : bool, optional
+
+    If False, ids are returned as a uint64 array sharing the buffer of ids.
+    Otherwise, they are returned as string identifiers, dictionary-encoded:
+    each distinct id is formatted only once
+    """
+    _require()
+    ids = np.ascontiguousarray(ids, dtype=np.int64).reshape(-1)
+
+    if not dictionary:
+        return pa.Array.from_buffers(
+            pa.uint64(), len(ids), [None, pa.py_buffer(ids)]
+        )
+
+    unique, indices = np.unique(ids, return_inverse=True)
+    offsets = np.arange(len(unique) + 1, dtype=np.int32) * STR_ID_WIDTH
+    strings = pa.Array.from_buffers(
+        pa.string(),
+        len(unique),
+        [None, pa.py_buffer(offsets), pa.py_buffer(ids_to_bytes(unique))],
+    )
+
+    return pa.DictionaryArray.from_arrays(
+        indices.reshape(-1).astype(np.int32), strings
+    )
+
+
+def arrow_to_ids(array):
+    """
+    Returns the packed ids of an Arrow array (or chunked array) of integer
+    ids, or of string identifiers (dictionary-encoded or not)
+    """
+    _require()
+    if isinstance(array, pa.ChunkedArray):
+        if array.num_chunks == 1:
+            return arrow_to_ids(array.chunk(0))
+        return np.concatenate(
+            [arrow_to_ids(chunk) for chunk in array.chunks]
+        ).astype(np.int64, copy=False)
+
+    if pa.types.is_dictionary(array.type):
+        return arrow_to_ids(array.dictionary)[to_numpy(array.indices)]
+
+    # 64-bit ids are viewed without copy, narrower integers are converted
+    if pa.types.is_int64(array.type) or pa.types.is_uint64(array.type):
+        return to_numpy(array).view(np.int64)
+    if pa.types.is_integer(array.type):
+        return to_numpy(array).astype(np.int64)
+
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        if array.null_count:
+            raise ValueError(f"{array.null_count} null values")
+
+        # Fixed-width identifiers are parsed from the data buffer
+        offset_type = np.int32 if pa.types.is_string(array.type) else np.int64
+        _, offsets, data = array.buffers()
+        offsets = np.frombuffer(offsets, dtype=offset_type)[
+            array.offset:array.offset + len(array) + 1
+        ]
+        if np.all(np.diff(offsets) == STR_ID_WIDTH):
+            data = np.frombuffer(data, dtype=np.uint8)
+            return bytes_to_ids(data[offsets[0]:offsets[-1]])
+
+        return str_to_ids(array.to_pylist())
+
+    raise TypeError(f"Arrow arrays of type {array.type} don't hold ids")
+
+
+def aggregate(ids, values=None, dictionary=False):
+    """
+    Aggregates values by hexagon, as an Arrow table with columns "cell",
+    "count" and, if values are provided, "sum" and "mean"
+
+    ## Parameters
+
+    - ids : np.array or Arrow array
+
+    Packed ids (or string identifiers, see `arrow_to_ids`)
+
+    - values : np.array or Arrow array, optional
+
+    - dictionary : bool, optional
+
+    Type of the "cell" column (see `ids_to_arrow`)
+    """
+    _require()
+    if not isinstance(ids, np.ndarray):
+        ids = arrow_to_ids(ids)
+
+    cells, inverse, counts = np.unique(
+        ids, return_inverse=True, return_counts=True
+    )
+    columns = {
+        "cell": ids_to_arrow(cells, dictionary=dictionary),
+        "count": pa.array(counts.astype(np.int64)),
+    }
+
+    if values is not None:
+        if not isinstance(values, np.ndarray):
+            values = to_numpy(values)
+        sums = np.bincount(
+            inverse.reshape(-1), weights=values, minlength=len(cells)
+        )
+        columns["sum"] = pa.array(sums)
+        columns["mean"] = pa.array(sums / counts)
+
+    return pa.table(columns)
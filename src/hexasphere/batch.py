@@ -0,0 +1,942 @@
+import numpy as np
+
+from hexasphere import kernels
+from hexasphere.geometry import phi
+
+# Number of bits used by each of the a, b, c coordinates in a packed id.
+# 17 bits hold any coordinate of a string id (5 digits), the face uses the
+# remaining high bits: face << 51 | a << 34 | b << 17 | c
+POS_BITS = 17
+POS_MASK = (1 << POS_BITS) - 1
+
+# Width of a string identifier (?XXXXX-YYYYY-ZZZZZ), and the columns of its
+# digits
+STR_ID_WIDTH = 18
+_DIGIT_COLUMNS = np.r_[1:6, 7:12, 13:18]
+
+# The six (a, b, c) offsets leading to the neighbors of an hex
+NEIGHBOR_OFFSETS = np.array(
+    [
+        [1, -1, 0],
+        [1, 0, -1],
+        [0, 1, -1],
+        [-1, 1, 0],
+        [-1, 0, 1],
+        [0, -1, 1],
+    ]
+)
+
+
+# Face normals are the vertices of a dodecahedron: the cubic vertex and the 3
+# rectangular vertices of an octant, given for the octant of |X|. The face
+# of X is the nearest of them, once signed as X
+FACE_TEMPLATES = np.array(
+    [
+        [1 + phi, 1 + phi, 1 + phi],
+        [2 * phi + 1, phi, 0],
+        [phi, 0, 2 * phi + 1],
+        [0, 2 * phi + 1, phi],
+    ]
+)
+
+# Octants are numbered by the signs of X: 4 * (x < 0) + 2 * (y < 0) + (z < 0)
+_OCTANT_SIGNS = 1 - 2 * ((np.arange(8)[:, None] >> np.arange(3)[::-1]) & 1)
+
+# Default maximum number of points processed at once by the batch functions
+CHUNK_SIZE = 1 << 20
+
+# Maximum error (in km) of float32 outputs: 0.35 m for unitary vectors and
+# 0.85 m for (lat, lon) coordinates, whatever n. Relative to the height of
+# hexagons (see `HexGrid.compute_height_for_n`), this is:
+#
+# | n      | height   | error / height |
+# | ------ | -------- | -------------- |
+# | 100    | 38 km    | 0.002 %        |
+# | 1000   | 3.8 km   | 0.02 %         |
+# | 10000  | 380 m    | 0.2 %          |
+# | 40000  | 96 m     | 0.9 %          |
+FLOAT32_ERROR = 1e-3
+
+
+def _chunks(size, chunk_size):
+    """
+    Slices of at most chunk_size items covering range(size)
+    """
+    return [
+        slice(start, start + chunk_size) for start in range(0, size, chunk_size)
+    ]
+
+
+def _output(out, shape, dtype):
+    """
+    Checks a preallocated output array, or allocates it. If dtype is None,
+    it is the type of out (float64 if out isn't provided)
+    """
+    if out is None:
+        return np.empty(shape, dtype=dtype or np.float64)
+    if dtype is None:
+        dtype = out.dtype
+    if out.shape != shape or out.dtype != dtype:
+        raise ValueError(
+            f"out must have shape {shape} and dtype {np.dtype(dtype)}, "
+            f"got {out.shape} and {out.dtype}"
+        )
+    return out
+
+
+def pack_ids(face, pos):
+    """
+    Packs arrays of (face, pos) into 64 bits integer identifiers
+
+    Sorting packed ids is equivalent to sorting the (face, a, b, c) tuples,
+    and like string ids, the resolution can be deduced from a packed id
+
+    ## Parameters
+
+    - face : np.array, shape = (N,), dtype = int
+
+    - pos : np.array, shape = (N, 3), dtype = int
+    """
+    face = np.asarray(face, dtype=np.int64)
+    pos = np.asarray(pos, dtype=np.int64)
+
+    return (
+        (face << 3 * POS_BITS)
+        | (pos[..., 0] << 2 * POS_BITS)
+        | (pos[..., 1] << POS_BITS)
+        | pos[..., 2]
+    )
+
+
+def unpack_ids(ids):
+    """
+    Retrieves arrays of face and pos from packed identifiers
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+
+    face = ids >> 3 * POS_BITS
+    pos = np.stack(
+        [
+            (ids >> 2 * POS_BITS) & POS_MASK,
+            (ids >> POS_BITS) & POS_MASK,
+            ids & POS_MASK,
+        ],
+        axis=-1,
+    )
+
+    return face, pos
+
+
+def ids_resolution(ids):
+    """
+    Returns the resolution n of packed identifiers
+    """
+    _, pos = unpack_ids(ids)
+    return pos.sum(axis=-1) // 2 - 1
+
+
+def rectify_coordinates(grid, face, pos, n):
+    """
+    Vectorized version of `HexGrid.rectify_coordinates`
+
+    Retrieves new faces and new pos in faces, for the given pos that are out
+    of their face
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - face : np.array, shape = (N,), dtype = int
+
+    - pos : np.array, shape = (N, 3), dtype = int
+
+    - n : int
+    """
+    if kernels.enabled():
+        return kernels.rectify_coordinates(grid, face, pos, n)
+
+    face = np.array(face, dtype=np.int64)
+    x, y, z = np.array(pos, dtype=np.int64).T
+    N = n + 1
+
+    while True:
+
+        over_x = x > N
+        over_y = (y > N) & ~over_x
+        over_z = (z > N) & ~over_x & ~over_y
+
+        if not (over_x.any() or over_y.any() or over_z.any()):
+            break
+
+        upper = face % 10 < 5
+
+        m = over_x & upper
+        x[m], y[m], z[m] = N - z[m], 2 * N - x[m], N - y[m]
+        m = over_x & ~upper
+        x[m], y[m], z[m] = 2 * N - x[m], N - y[m], N - z[m]
+        face[over_x] = grid.neighboring_face[face[over_x], 0]
+
+        m = over_y & upper
+        x[m], y[m], z[m] = 2 * N - y[m], N - z[m], N - x[m]
+        m = over_y & ~upper
+        x[m], y[m], z[m] = N - x[m], 2 * N - y[m], N - z[m]
+        face[over_y] = grid.neighboring_face[face[over_y], 1]
+
+        m = over_z
+        x[m], y[m], z[m] = N - x[m], N - y[m], 2 * N - z[m]
+        face[over_z] = grid.neighboring_face[face[over_z], 2]
+
+    return face, np.stack([x, y, z], axis=-1)
+
+
+def canonicalize(face, pos, n=None):
+    """
+    Returns the standard (face, pos) couples of hexagons
+
+    Hexagons falling on an edge or a vertex of the icosahedron belong to
+    several faces, and are given their standard (face, pos) couple, as in
+    `Hexagon.resolve_conflicts`. Other hexagons are left untouched. Each
+    hexagon is classified (interior, vertex or edge, and which coordinate),
+    and transformed in one pass with the table of its (face, case).
+
+    ## Parameters
+
+    - face : np.array, shape = (N,), dtype = int
+
+    - pos : np.array, shape = (N, 3), dtype = int
+
+    - n : int or np.array of shape (N,), optional
+
+    Resolutions of the hexagons, deduced from pos if not provided
+    """
+    f = np.asarray(face, dtype=np.int64).reshape(-1)
+    pos = np.asarray(pos, dtype=np.int64).reshape(-1, 3)
+    if n is None:
+        n = pos.sum(axis=1) // 2 - 1
+    elif np.ndim(n) == 0 and kernels.enabled():
+        return kernels.resolve_conflicts(f, pos, int(n))
+
+    N = np.asarray(n, dtype=np.int64) + 1
+
+    case = _conflict_case(pos, N)
+
+    new_pos = np.einsum("nij,nj->ni", _CANONICAL_MATRIX[f, case], pos)
+    new_pos += _CANONICAL_OFFSET[f, case] * np.reshape(N, (-1, 1))
+
+    return _CANONICAL_FACE[f, case], new_pos
+
+
+def _conflict_case(pos, N):
+    """
+    Returns the case of hexagons: 0 inside a face, 1 to 3 on the vertex where
+    a, b or c is 0, 4 to 6 on the edge where c, a or b is N
+    """
+    N = np.reshape(N, (-1, 1))
+    zero = pos == 0
+    full = pos == N
+
+    case = np.zeros(len(pos), dtype=np.int64)
+    for i, j in [(6, 1), (5, 0), (4, 2)]:
+        case[full[:, j]] = i
+    for i, j in [(3, 2), (2, 1), (1, 0)]:
+        case[zero[:, j]] = i
+
+    return case
+
+
+def neighbor_ids(grid, ids):
+    """
+    Returns the packed ids of the neighbors of packed ids, shape = (N, 6)
+
+    Pentagons have 5 neighbors: one of their slots is -1.
+    """
+    ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+    face, pos = unpack_ids(ids)
+    n = pos.sum(axis=1) // 2 - 1
+
+    face = np.repeat(face, 6)
+    pos = (pos[:, None, :] + NEIGHBOR_OFFSETS).reshape(-1, 3)
+    n = np.repeat(n, 6)
+
+    # Neighbors are rectified by resolution
+    res = np.empty(len(face), dtype=np.int64)
+    for n_i in np.unique(n).tolist():
+        m = n == n_i
+        f, p = rectify_coordinates(grid, face[m], pos[m], n_i)
+        res[m] = pack_ids(*canonicalize(f, p, n_i))
+    res = res.reshape(-1, 6)
+
+    # Two slots of pentagons lead to the same neighbor
+    for j in range(1, 6):
+        res[np.any(res[:, j:j + 1] == res[:, :j], axis=1), j] = -1
+
+    return res
+
+
+def face_positions(n):
+    """
+    Returns all the pos (a, b, c) of a face of a grid of resolution n,
+    including the ones on its edges and vertices
+    """
+    N = n + 1
+    a, b = np.meshgrid(np.arange(N + 1), np.arange(N + 1), indexing="ij")
+    c = 2 * N - a - b
+    inside = c <= N
+
+    return np.stack([a[inside], b[inside], c[inside]], axis=-1)
+
+
+def enumerate_cells(n):
+    """
+    Returns the sorted packed ids of all the hexagons (and pentagons) of a
+    grid of resolution n
+
+    The position of an id in this array is its canonical ordinal. There are
+    10 * (n + 1) ** 2 + 2 cells in a grid of resolution n.
+    """
+    pos = face_positions(n)
+    face = np.repeat(np.arange(20), len(pos))
+    pos = np.tile(pos, (20, 1))
+
+    new_face, new_pos = canonicalize(face, pos, n)
+    standard = (new_face == face) & np.all(new_pos == pos, axis=1)
+
+    # Ids are generated in (face, a, b) order, and are thus already sorted
+    return pack_ids(face[standard], pos[standard])
+
+
+def cell_ordinals(ids, n, cells=None):
+    """
+    Returns the canonical ordinals of packed ids at resolution n
+
+    ## Parameters
+
+    - ids : np.array, dtype = int64
+
+    Packed ids of standard hexagons
+
+    - n : int
+
+    - cells : np.array, optional
+
+    Output of `enumerate_cells(n)`, if already available
+    """
+    if cells is None:
+        cells = enumerate_cells(n)
+    return np.searchsorted(cells, ids)
+
+
+def latlon_to_X(lat, lon, dtype=np.float64):
+    """
+    Vectorized version of `geometry.latlon_to_X`, shape = (N, 3)
+    """
+    lat = np.radians(np.asarray(lat, dtype=dtype)).reshape(-1)
+    lon = np.radians(np.asarray(lon, dtype=dtype)).reshape(-1)
+
+    cos_lat = np.cos(lat)
+    return np.stack(
+        [cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1
+    )
+
+
+def X_to_latlon(X):
+    """
+    Vectorized version of `geometry.X_to_latlon`, shape = (N, 2), of the type
+    of X
+    """
+    X = np.asarray(X)
+    lat = np.arctan2(X[:, 2], np.hypot(X[:, 0], X[:, 1]))
+    lon = np.where(np.abs(lat) == np.pi / 2, 0, np.arctan2(X[:, 1], X[:, 0]))
+
+    return np.degrees(np.stack([lat, lon], axis=-1))
+
+
+def project(grid, X):
+    """
+    Projects unitary vectors X on the icosahedron of grid
+
+    ## Returns
+
+    - face : np.array, shape = (N,), dtype = int
+
+    - P : np.array, shape = (N, 2)
+
+    Face coordinates of the projected points
+    """
+    face = select_faces(grid, X)
+    P = grid.projection.project_batch(X, face)
+
+    return face, P
+
+
+def select_faces(grid, X, tolerance=1e-12):
+    """
+    Returns the faces of the icosahedron unitary vectors X project on, the
+    same as `np.argmax(X.dot(grid.k.T), axis=1)`
+
+    Only 4 candidate faces are compared, given by the octant of each vector.
+    Points within tolerance of a tie (on the edges of faces, or on the planes
+    between octants) are compared to all the faces.
+    """
+    # Faces of the candidates of each octant
+    templates = (_OCTANT_SIGNS[:, None, :] * FACE_TEMPLATES).reshape(-1, 3)
+    table = np.argmax(templates.dot(grid.k.T), axis=1)
+
+    A = np.abs(X)
+    cube, r1, r2, r3 = A.dot(FACE_TEMPLATES.T).T
+
+    j = np.where(r1 >= r2, 1, 2)
+    rect = np.maximum(r1, r2)
+    tie = np.abs(r1 - r2) < tolerance
+    tie |= np.abs(rect - r3) < tolerance
+    j = np.where(rect >= r3, j, 3)
+    rect = np.maximum(rect, r3)
+    tie |= np.abs(cube - rect) < tolerance
+    j = np.where(cube >= rect, 0, j)
+
+    x, y, z = A.T
+    tie |= np.minimum(np.minimum(x, y), z) < tolerance
+
+    octant = (X[:, 0] < 0) * 4 + (X[:, 1] < 0) * 2 + (X[:, 2] < 0)
+    face = table[4 * octant + j]
+
+    if tie.any():
+        face[tie] = np.argmax(X[tie].dot(grid.k.T), axis=1)
+
+    return face
+
+
+def find_pos(grid, face, P, n):
+    """
+    Vectorized version of `Location.find_pos_from_P_TrB`, from face
+    coordinates P
+
+    ## Returns
+
+    - face : np.array, shape = (N,), dtype = int
+
+    - pos : np.array, shape = (N, 3), dtype = int
+    """
+    if kernels.enabled():
+        return kernels.find_pos(grid, face, P, n)
+
+    N = 2 * n + 1
+
+    u, v, w = ((P.dot(grid.Tr) + 1) * (N + 1) / 2).astype(np.int64).T
+
+    a = (2 + (N - v) + w) // 3
+    b = (2 + (N - w) + u) // 3
+    c = N + 1 - (a + b)
+    pos = np.stack([a, b, c], axis=-1)
+
+    out = np.any((pos < 0) | (pos > n + 1), axis=1)
+    if out.any():
+        face = face.copy()
+        face[out], pos[out] = rectify_coordinates(grid, face[out], pos[out], n)
+
+    return face, pos
+
+
+def X_to_ids(grid, X, n, out=None, chunk_size=CHUNK_SIZE, normalize=False):
+    """
+    Returns the packed ids of the hexagons to which the unitary vectors X
+    belong, at resolution n
+
+    Unlike `HexGrid.latlon_to_hex`, the overlap of the grid is ignored: one
+    hexagon is returned per point
+
+    ## Parameters
+
+    - X : np.array, shape = (N, 3)
+
+    X can be float32: points are converted to float64 by chunks
+
+    - out : np.array, shape = (N,), dtype = int64, optional
+
+    Output array
+
+    - chunk_size : int, optional
+
+    Maximum number of points processed at once, which bounds the memory used
+    by intermediate arrays
+
+    - normalize : bool, optional
+
+    If True, X can be any non-zero vectors (ECEF coordinates for instance),
+    which are normalized by chunks. Points are then taken along their
+    direction from the center of the Earth
+    """
+    X = np.asarray(X).reshape(-1, 3)
+    out = _output(out, (len(X),), np.int64)
+
+    for chunk in _chunks(len(X), chunk_size):
+        out[chunk] = _X_to_ids(grid, _unit(X[chunk], normalize), n)
+
+    return out
+
+
+def _unit(X, normalize):
+    X = X.astype(float)
+    if normalize:
+        X /= np.linalg.norm(X, axis=1)[:, None]
+    return X
+
+
+def _X_to_ids(grid, X, n):
+    return _X_to_ids_multi(grid, X, [n])[:, 0]
+
+
+def _X_to_ids_multi(grid, X, ns):
+
+    face, P = project(grid, X)
+
+    ids = np.empty((len(X), len(ns)), dtype=np.int64)
+    for j, n in enumerate(ns):
+        if kernels.enabled():
+            face_n, pos = kernels.find_pos(grid, face, P, n, resolve=True)
+        else:
+            face_n, pos = find_pos(grid, face, P, n)
+            face_n, pos = canonicalize(face_n, pos, n)
+        ids[:, j] = pack_ids(face_n, pos)
+
+    return ids
+
+
+def latlon_to_ids(grid, lat, lon, n, out=None, chunk_size=CHUNK_SIZE):
+    """
+    Returns the packed ids of the hexagons to which the points (lat, lon),
+    in degrees, belong, at resolution n
+
+    Unlike `HexGrid.latlon_to_hex`, the overlap of the grid is ignored: one
+    hexagon is returned per point
+
+    See `X_to_ids` for the other parameters
+    """
+    lat = np.asarray(lat).reshape(-1)
+    lon = np.asarray(lon).reshape(-1)
+    out = _output(out, (len(lat),), np.int64)
+
+    for chunk in _chunks(len(lat), chunk_size):
+        out[chunk] = _X_to_ids(grid, latlon_to_X(lat[chunk], lon[chunk]), n)
+
+    return out
+
+
+def X_to_ids_multi(
+    grid, X, ns, out=None, chunk_size=CHUNK_SIZE, normalize=False
+):
+    """
+    Returns the packed ids of the hexagons to which the unitary vectors X
+    belong, at each resolution of ns
+
+    Points are projected once, for all the resolutions.
+
+    ## Parameters
+
+    - ns : list of int
+
+    - out : np.array, shape = (N, len(ns)), dtype = int64, optional
+
+    See `X_to_ids` for the other parameters
+
+    ## Returns
+
+    - ids : np.array, shape = (N, len(ns)), dtype = int64
+    """
+    X = np.asarray(X).reshape(-1, 3)
+    ns = list(ns)
+    out = _output(out, (len(X), len(ns)), np.int64)
+
+    for chunk in _chunks(len(X), chunk_size):
+        out[chunk] = _X_to_ids_multi(grid, _unit(X[chunk], normalize), ns)
+
+    return out
+
+
+def latlon_to_ids_multi(grid, lat, lon, ns, out=None, chunk_size=CHUNK_SIZE):
+    """
+    Returns the packed ids of the hexagons to which the points (lat, lon),
+    in degrees, belong, at each resolution of ns
+
+    See `X_to_ids_multi`
+    """
+    lat = np.asarray(lat).reshape(-1)
+    lon = np.asarray(lon).reshape(-1)
+    ns = list(ns)
+    out = _output(out, (len(lat), len(ns)), np.int64)
+
+    for chunk in _chunks(len(lat), chunk_size):
+        out[chunk] = _X_to_ids_multi(
+            grid, latlon_to_X(lat[chunk], lon[chunk]), ns
+        )
+
+    return out
+
+
+def ids_to_P(grid, ids):
+    """
+    Returns the faces and face coordinates of the centers of packed ids
+    """
+    face, pos = unpack_ids(ids)
+    N = pos.sum(axis=1) // 2
+
+    P = 2 * np.sqrt(3) * pos.dot(grid.Bis.T) / (3 * N[:, None])
+
+    return face, P
+
+
+def ids_to_X(grid, ids, dtype=None, out=None, chunk_size=CHUNK_SIZE):
+    """
+    Returns the unitary vectors of the centers of packed ids, shape = (N, 3)
+
+    ## Parameters
+
+    - ids : np.array, dtype = int64
+
+    - dtype : np.dtype, optional
+
+    Type of the output, float64 or float32 (see `FLOAT32_ERROR`). Defaults
+    to the type of out, or float64. Computations are made in float64, by
+    chunks
+
+    - out : np.array, shape = (N, 3), optional
+
+    Output array
+
+    - chunk_size : int, optional
+
+    Maximum number of ids processed at once
+    """
+    ids = np.asarray(ids).reshape(-1)
+    out = _output(out, (len(ids), 3), dtype)
+
+    for chunk in _chunks(len(ids), chunk_size):
+        face, P = ids_to_P(grid, ids[chunk])
+        out[chunk] = grid.projection.inv_project_batch(P, face)
+
+    return out
+
+
+def ids_to_latlon(grid, ids, dtype=None, out=None, chunk_size=CHUNK_SIZE):
+    """
+    Returns the (lat, lon) coordinates of the centers of packed ids,
+    shape = (N, 2)
+
+    See `ids_to_X` for the other parameters
+    """
+    ids = np.asarray(ids).reshape(-1)
+    out = _output(out, (len(ids), 2), dtype)
+
+    for chunk in _chunks(len(ids), chunk_size):
+        out[chunk] = X_to_latlon(ids_to_X(grid, ids[chunk]))
+
+    return out
+
+
+def ids_to_polygons(
+    grid, ids, dtype=None, out=None, chunk_size=CHUNK_SIZE
+):
+    """
+    Returns the vertices of the hexagons of packed ids, in the order of
+    `Hexagon.retrieve_polygon`
+
+    The vertices shared by several hexagons are projected only once.
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - ids : np.array, dtype = int64
+
+    Packed ids of hexagons of a same resolution
+
+    - dtype : np.dtype, optional
+
+    Type of the vertices, float64 or float32 (see `FLOAT32_ERROR`). Defaults
+    to the type of out, or float64. Computations are made in float64, by
+    chunks
+
+    - out : tuple of np.array, optional
+
+    Output arrays (X, index). The number M of unique vertices isn't known in
+    advance: X must have at least M rows (6 N always suffice), and its first
+    M rows are returned
+
+    - chunk_size : int, optional
+
+    Maximum number of vertices projected at once
+
+    ## Returns
+
+    - X : np.array, shape = (M, 3)
+
+    Unitary vectors of the (unique) vertices
+
+    - index : np.array, shape = (N, 6), dtype = int64
+
+    Indices in X of the vertices of each hexagon. Pentagons have 5 vertices,
+    and -1 in the last column
+    """
+    ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+    face, pos = unpack_ids(ids)
+
+    X_out, index_out = (None, None) if out is None else out
+    if index_out is not None:
+        _output(index_out, (len(ids), 6), np.int64)
+    if X_out is not None and (X_out.ndim != 2 or X_out.shape[1] != 3):
+        raise ValueError(f"out X must have shape (M, 3), got {X_out.shape}")
+
+    if not len(ids):
+        X = _output(None if X_out is None else X_out[:0], (0, 3), dtype)
+        index = np.zeros((0, 6), dtype=np.int64)
+        return X, index if index_out is None else index_out
+
+    n = pos[0].sum() // 2 - 1
+    if np.any(pos.sum(axis=1) != 2 * (n + 1)):
+        raise ValueError("ids must have the same resolution")
+
+    # Vertices lie on a lattice 3 times finer than hex centers, and never on
+    # the edges of a face: rectified, they have a unique (face, pos)
+    M = 3 * (n + 1)
+    v_pos = (3 * pos[:, None, :] + _POLYGON_OFFSETS).reshape(-1, 3)
+    v_face = np.repeat(face, 6)
+    v_face, v_pos = rectify_coordinates(grid, v_face, v_pos, M - 1)
+
+    keys = (v_face * (M + 1) + v_pos[:, 0]) * (M + 1) + v_pos[:, 1]
+    keys, first, index = np.unique(keys, return_index=True, return_inverse=True)
+    index = index.reshape(-1, 6)
+
+    if X_out is not None and len(X_out) < len(keys):
+        raise ValueError(
+            f"out X must have at least {len(keys)} rows, got {len(X_out)}"
+        )
+    X = _output(
+        None if X_out is None else X_out[:len(keys)], (len(keys), 3), dtype
+    )
+    for chunk in _chunks(len(keys), chunk_size):
+        P = 2 * np.sqrt(3) * v_pos[first[chunk]].dot(grid.Bis.T) / (3 * M)
+        X[chunk] = grid.projection.inv_project_batch(P, v_face[first[chunk]])
+
+    # Two of the 6 vertices of a pentagon are the same
+    duplicate = np.zeros(index.shape, dtype=bool)
+    for j in range(1, 6):
+        duplicate[:, j] = np.any(index[:, :j] == index[:, j:j + 1], axis=1)
+    pentagon = duplicate.any(axis=1)
+    if pentagon.any():
+        rows = index[pentagon]
+        order = np.argsort(duplicate[pentagon], axis=1, kind="stable")
+        rows = np.take_along_axis(rows, order, axis=1)
+        rows[:, 5] = -1
+        index[pentagon] = rows
+
+    if index_out is None:
+        return X, index
+    index_out[:] = index
+    return X, index_out
+
+
+def ids_to_str(ids):
+    """
+    Returns the string identifiers of packed ids
+    """
+    face, pos = unpack_ids(np.asarray(ids).reshape(-1))
+    return [
+        _FACE_CHARS[f] + f"{a:05}-{b:05}-{c:05}"
+        for f, (a, b, c) in zip(face.tolist(), pos.tolist())
+    ]
+
+
+def str_to_ids(str_ids):
+    """
+    Returns the packed ids of string identifiers
+    """
+    face = [_FACE_CHARS.index(str_id[0]) for str_id in str_ids]
+    pos = [tuple(int(x) for x in str_id[1:].split("-")) for str_id in str_ids]
+    return pack_ids(face, np.array(pos, dtype=np.int64).reshape(-1, 3))
+
+
+def bytes_to_ids(data, stride=STR_ID_WIDTH, errors="raise"):
+    """
+    Returns the packed ids of string identifiers stored as fixed-width
+    records, decoded with array arithmetic on the bytes
+
+    ## Parameters
+
+    - data : bytes-like or np.array, dtype = S18
+
+    Records of stride bytes, each starting with a string identifier: the
+    remaining bytes (separators such as newlines) are ignored
+
+    - stride : int, optional
+
+    - errors : str, optional
+
+    "raise" raises a ValueError listing malformed records (see
+    `invalid_str_ids`), "mask" gives them the id -1
+    """
+    if errors not in ("raise", "mask"):
+        raise ValueError(f"errors must be 'raise' or 'mask', not {errors!r}")
+
+    records = _records(data, stride)
+    digits = records[:, _DIGIT_COLUMNS].astype(np.int64) - ord("0")
+    pos = digits.reshape(-1, 3, 5).dot(10 ** np.arange(4, -1, -1))
+    face = records[:, 0].astype(np.int64) - ord("A")
+
+    invalid = _invalid_records(records, face, pos)
+    if invalid.any():
+        if errors == "raise":
+            rows = np.nonzero(invalid)[0]
+            raise ValueError(
+                f"{len(rows)} malformed string ids, at rows "
+                f"{rows[:10].tolist()}{'...' if len(rows) > 10 else ''}"
+            )
+        face[invalid] = 0
+        pos[invalid] = 0
+
+    ids = pack_ids(face, pos)
+    ids[invalid] = -1
+    return ids
+
+
+def invalid_str_ids(data, stride=STR_ID_WIDTH):
+    """
+    Returns the indices of the malformed records of `bytes_to_ids`: wrong
+    face letter, digits or separators, or coordinates that aren't the ones
+    of an hexagon
+    """
+    records = _records(data, stride)
+    digits = records[:, _DIGIT_COLUMNS].astype(np.int64) - ord("0")
+    pos = digits.reshape(-1, 3, 5).dot(10 ** np.arange(4, -1, -1))
+    face = records[:, 0].astype(np.int64) - ord("A")
+
+    return np.nonzero(_invalid_records(records, face, pos))[0]
+
+
+def ids_to_bytes(ids, sep=b""):
+    """
+    Returns the string identifiers of packed ids as fixed-width records,
+    each followed by sep, formatted with array arithmetic
+
+    `np.frombuffer(ids_to_bytes(ids), dtype="S18")` gives an array of
+    string identifiers. Coordinates must fit in their 5 digits (n < 99999)
+    """
+    face, pos = unpack_ids(np.asarray(ids, dtype=np.int64).reshape(-1))
+    if len(pos) and pos.max() > 99999:
+        raise ValueError(
+            f"Coordinate {pos.max()} doesn't fit in the 5 digits of string ids"
+        )
+
+    width = STR_ID_WIDTH + len(sep)
+    records = np.empty((len(face), width), dtype=np.uint8)
+    records[:, 0] = face + ord("A")
+    records[:, [6, 12]] = ord("-")
+    records[:, STR_ID_WIDTH:] = np.frombuffer(sep, dtype=np.uint8)
+
+    # One digit of the 3 coordinates at a time: all the digits at once would
+    # take an (N, 3, 5) int64 temporary, 120 bytes per id
+    for i in range(5):
+        digits = pos // 10 ** (4 - i) % 10 + ord("0")
+        records[:, _DIGIT_COLUMNS[i::5]] = digits
+
+    return records.tobytes()
+
+
+def _records(data, stride):
+    """
+    Returns the first STR_ID_WIDTH bytes of each record, shape = (N, 18),
+    dtype = uint8
+    """
+    if isinstance(data, np.ndarray) and data.dtype.kind == "S":
+        stride = data.dtype.itemsize
+        data = np.ascontiguousarray(data).reshape(-1)
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    if stride < STR_ID_WIDTH or len(buffer) % stride:
+        raise ValueError(
+            f"A buffer of {len(buffer)} bytes can't hold records of {stride} "
+            f"bytes, of at least {STR_ID_WIDTH} bytes"
+        )
+
+    return buffer.reshape(-1, stride)[:, :STR_ID_WIDTH]
+
+
+def _invalid_records(records, face, pos):
+
+    digits = records[:, _DIGIT_COLUMNS]
+    invalid = np.any((digits < ord("0")) | (digits > ord("9")), axis=1)
+    invalid |= np.any(records[:, [6, 12]] != ord("-"), axis=1)
+    invalid |= (face < 0) | (face >= 20)
+
+    # a + b + c = 2 * N, with 0 <= a, b, c <= N
+    total = pos.sum(axis=1)
+    invalid |= (total % 2 == 1) | (total == 0)
+    invalid |= np.any(2 * pos > total[:, None], axis=1)
+
+    return invalid
+
+
+_FACE_CHARS = "ABCDEFGHIJKLMNOPQRST"
+
+
+def _canonical_tables():
+    """
+    Builds the (face, case) tables of `canonicalize` from the branches of
+    `Hexagon.resolve_conflicts`: the new face, and the new pos as an affine
+    function M . pos + N * t of pos
+    """
+    a, b, c = np.eye(3, dtype=np.int64)
+    o = np.zeros(3, dtype=np.int64)
+
+    # Transforms of pos, as (M, t)
+    same = (np.stack([a, b, c]), o)
+    swap_ab = (np.stack([b, a, c]), o)
+    rotate = (np.stack([c, a, b]), o)
+    flip_ab = (np.stack([-a, -b, c]), np.array([1, 1, 0]))
+    flip_bc = (np.stack([a, -b, -c]), np.array([0, 1, 1]))
+    flip_ca = (np.stack([-a, b, -c]), np.array([1, 0, 1]))
+    edge_b = (np.stack([b, -c, -a]), np.array([0, 1, 1]))
+
+    faces = np.zeros((20, 7), dtype=np.int64)
+    matrices = np.zeros((20, 7, 3, 3), dtype=np.int64)
+    offsets = np.zeros((20, 7, 3), dtype=np.int64)
+
+    for f in range(20):
+        upper = f % 10 < 5
+        band = f // 10
+
+        cases = [
+            (f, same),
+            (f, same) if upper else ((f - 4) % 5 + 10 * band, same),
+            ((f + 1) % 5 + 10 * band, swap_ab) if upper else (f - 5, swap_ab),
+            (10 * band, same) if upper else (
+                (2 - f) % 5 + 10 * (1 - band), rotate
+            ),
+            (f, same) if upper else (f - 5, flip_ab),
+            (f, same) if band == 0 or upper else ((2 - f) % 5 + 5, flip_bc),
+            ((f - 1) % 5 + 10 * band, edge_b) if upper else (
+                ((1 - f) % 5 + 5, flip_ca) if band == 1 else (f, same)
+            ),
+        ]
+
+        for case, (new_face, (M, t)) in enumerate(cases):
+            faces[f, case] = new_face
+            matrices[f, case] = M
+            offsets[f, case] = t
+
+    return faces, matrices, offsets
+
+
+_CANONICAL_FACE, _CANONICAL_MATRIX, _CANONICAL_OFFSET = _canonical_tables()
+
+# Offsets of the vertices of an hex from its center, on a lattice 3 times
+# finer, in the order of `Hexagon.retrieve_polygon`
+_POLYGON_OFFSETS = np.array(
+    [
+        [2, -1, -1],
+        [1, -2, 1],
+        [-1, -1, 2],
+        [-2, 1, 1],
+        [-1, 2, -1],
+        [1, 1, -2],
+    ]
+)
@@ -0,0 +1,152 @@
+import numpy as np
+
+from hexasphere.batch import pack_ids, unpack_ids
+
+
+def curve_depth(n: int):
+    """
+    Returns the number of subdivision levels of the face triangles used to
+    order the cells of a grid of resolution n
+
+    Going from resolution n to resolution 4 * (n + 1) - 1 (a child
+    generation of `Hexagon.find_parent_hex`) adds exactly two levels
+    """
+    return int(np.ceil(np.log2(n + 1))) + 1
+
+
+def ids_to_curve(ids, n: int):
+    """
+    Returns the index of packed ids along a space-filling curve
+
+    Each face triangle is recursively subdivided into 4 triangles (the
+    corner at the entry vertex, the corner at the third vertex, the center,
+    and the corner at the exit vertex), which gives a continuous curve going
+    through all the cells of the face. Curve indices are sorted by face
+    first, so that a range of indices maps to a compact region of a face.
+
+    Hex centers lying on the edges of sub-triangles are nudged towards the
+    center of their face. As this nudge doesn't depend on n, an hexagon and
+    its co-located child hexagon at resolution 4 * (n + 1) - 1 are given
+    indices such that `child_index >> 4 == parent_index`.
+
+    ## Parameters
+
+    - ids : np.array, dtype = int64
+
+    Packed ids of standard hexagons at resolution n
+
+    - n : int
+    """
+    N = n + 1
+    depth = curve_depth(n)
+
+    face, pos = unpack_ids(ids)
+
+    # Barycentric coordinates of hex centers (scaled by N), with respect to
+    # the face vertices (a = 0, b = 0, c = 0)
+    num = (N - pos).reshape(-1, 3)
+    # Sign of the direction of the nudge towards the center of the face
+    nudge = np.sign(N - 3 * num)
+
+    index = np.zeros(len(num), dtype=np.int64)
+    rows = np.arange(len(num))
+
+    for _ in range(depth):
+
+        t = 2 * num - N
+        over_half = (t > 0) | ((t == 0) & (nudge > 0))
+
+        # Child triangles, in the order of the curve
+        digit = np.full(len(num), 2)
+        digit[over_half[:, 0]] = 0
+        digit[over_half[:, 2]] = 1
+        digit[over_half[:, 1]] = 3
+
+        index = 4 * index + digit
+
+        # Coordinates in the frame (entry, exit, third vertex) of the child
+        # triangle: (sign, offset, permutation) of each child transform
+        perm = _CHILD_PERMUTATIONS[digit]
+        num = num[rows[:, None], perm]
+        nudge = nudge[rows[:, None], perm]
+
+        num = 2 * num - N * _CHILD_OFFSETS[digit]
+        center = digit == 2
+        num[center] = -num[center]
+        nudge[center] = -nudge[center]
+
+    return (face.reshape(-1) << 2 * depth) | index
+
+
+def curve_to_ids(index, n: int):
+    """
+    Returns the packed ids of the hexagons given by their curve index
+    (see `ids_to_curve`)
+    """
+    N = n + 1
+    depth = curve_depth(n)
+
+    index = np.asarray(index, dtype=np.int64).reshape(-1)
+    face = index >> 2 * depth
+
+    # Vertices (entry, exit, third) of the current triangle, in barycentric
+    # coordinates scaled by 2 ** depth
+    V = np.zeros((len(index), 3, 3), dtype=np.int64)
+    V[:] = np.eye(3, dtype=np.int64) << depth
+
+    for level in range(depth - 1, -1, -1):
+
+        digit = (index >> 2 * level) & 3
+
+        E, X, O = V[:, 0], V[:, 1], V[:, 2]
+        m_EX, m_XO, m_EO = (E + X) // 2, (X + O) // 2, (E + O) // 2
+
+        children = np.stack(
+            [
+                np.stack([E, m_EO, m_EX], axis=1),
+                np.stack([m_EO, m_XO, O], axis=1),
+                np.stack([m_XO, m_EX, m_EO], axis=1),
+                np.stack([m_EX, X, m_XO], axis=1),
+            ]
+        )
+        V = children[digit, np.arange(len(index))]
+
+    # The nearest hex center to the centroid of the final triangle
+    x = V.sum(axis=1) * N / (3 * 2**depth)
+    num = np.round(x).astype(np.int64)
+
+    error = np.abs(num - x)
+    worst = np.argmax(error, axis=1)
+    rows = np.arange(len(num))
+    num[rows, worst] -= num.sum(axis=1) - N
+
+    return pack_ids(face, N - num)
+
+
+def sort_by_curve(ids, n: int):
+    """
+    Sorts packed ids at resolution n along the space-filling curve
+    """
+    ids = np.asarray(ids)
+    return ids[np.argsort(ids_to_curve(ids, n), kind="stable")]
+
+
+# Child transforms of barycentric coordinates (scaled by N): the coordinates
+# are permuted, doubled and shifted by N (then negated for the center child)
+_CHILD_PERMUTATIONS = np.array(
+    [
+        [0, 2, 1],
+        [0, 1, 2],
+        [0, 2, 1],
+        [0, 1, 2],
+    ]
+)
+
+_CHILD_OFFSETS = np.array(
+    [
+        [1, 0, 0],
+        [0, 0, 1],
+        [1, 1, 1],
+        [0, 1, 0],
+    ]
+)
@@ -0,0 +1,141 @@
+import json
+
+import numpy as np
+
+from hexasphere.batch import X_to_latlon, ids_to_polygons, ids_to_str
+
+
+class GeoJSONWriter:
+    """
+    Streams hexagons as GeoJSON features to a text file object
+
+    Hexagons are written by chunks, so that memory stays bounded whatever
+    the number of exported hexagons. The output is either a
+    FeatureCollection, or newline-delimited GeoJSON (one feature per line).
+
+    ```
+    with open("cells.geojson", "w") as fp:
+        with GeoJSONWriter(grid, fp) as writer:
+            for ids, values in chunks:
+                writer.write(ids, {"value": values})
+    ```
+    """
+
+    def __init__(self, grid, fp, ndjson=False, chunk_size=10000, precision=7):
+        """
+        ## Parameters
+
+        - grid : HexGrid
+
+        - fp : text file object
+
+        - ndjson : bool, optional
+
+        If True, features are written one per line, without a collection
+
+        - chunk_size : int, optional
+
+        Maximum number of hexagons processed at once
+
+        - precision : int, optional
+
+        Number of decimals of the coordinates (in degrees)
+        """
+        self.grid = grid
+        self.fp = fp
+        self.ndjson = ndjson
+        self.chunk_size = chunk_size
+        self.precision = precision
+
+        self.count = 0
+        self._opened = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self):
+        if not self.ndjson:
+            self.fp.write('{"type": "FeatureCollection", "features": [\n')
+        self._opened = True
+
+    def close(self):
+        if self._opened and not self.ndjson:
+            self.fp.write("\n]}\n")
+        self._opened = False
+
+    def write(self, ids, properties=None):
+        """
+        Writes the hexagons of packed ids (of a same resolution)
+
+        ## Parameters
+
+        - ids : np.array, dtype = int64
+
+        - properties : dict, optional
+
+        Arrays of per-hexagon values, by property name
+        """
+        if not self._opened:
+            self.open()
+
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        properties = properties or {}
+
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            self._write_chunk(
+                ids[chunk],
+                {
+                    name: np.asarray(values)[chunk].tolist()
+                    for name, values in properties.items()
+                },
+            )
+
+    def _write_chunk(self, ids, properties):
+
+        X, index = ids_to_polygons(self.grid, ids)
+        lonlat = np.round(X_to_latlon(X)[:, ::-1], self.precision).tolist()
+
+        lines = []
+        for i, (str_id, vertices) in enumerate(
+            zip(ids_to_str(ids), index.tolist())
+        ):
+            ring = [lonlat[v] for v in vertices if v >= 0]
+            ring.append(ring[0])
+
+            feature = {
+                "type": "Feature",
+                "id": str_id,
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": {
+                    name: values[i] for name, values in properties.items()
+                },
+            }
+            lines.append(json.dumps(feature))
+
+        if self.ndjson:
+            self.fp.write("\n".join(lines) + "\n")
+        else:
+            separator = ",\n" if self.count else ""
+            self.fp.write(separator + ",\n".join(lines))
+
+        self.count += len(ids)
+
+
+def write_geojson(
+    grid, ids, fp, properties=None, ndjson=False, chunk_size=10000, precision=7
+):
+    """
+    Writes the hexagons of packed ids to the text file object fp, as a
+    GeoJSON FeatureCollection (or newline-delimited GeoJSON), see
+    `GeoJSONWriter`
+
+    Returns the number of written features
+    """
+    with GeoJSONWriter(grid, fp, ndjson, chunk_size, precision) as writer:
+        writer.write(ids, properties)
+    return writer.count
@@ -1,3 +1,4 @@
+from types import MappingProxyType, SimpleNamespace
 
 import numpy as np
 
@@ -27,11 +28,9 @@ def X_to_latlon(X):
     """
     Converts orthogonal coordinates into latlon coordinates
     """
-    PX = np.copy(X)
-    PX[2] = 0
-
-    lat = np.arctan2(X[2], np.linalg.norm(PX))
-    if lat == 90 or lat == -90:
+    lat = np.arctan2(X[2], np.hypot(X[0], X[1]))
+    # At the poles, lon is 0 (arctan2 of signed zeros would give +-180)
+    if abs(lat) == np.pi / 2:
         lon = 0
     else:
         lon = np.arctan2(X[1], X[0])
@@ -52,163 +51,222 @@ def compute_dist(X1, X2, in_latlon=False):
     return np.arccos(X1.dot(X2)) * R
 
 
-class Icosahedron:
-    def __init__(self, *args, **kwargs):
+def _build_icosahedron():
+    """
+    Computes the constants of the icosahedron shared by all grids
+    """
+    ico = SimpleNamespace()
+
+    # Face-to-center distance
+    ico.FtoC = np.sqrt(phi**2 - 1 / 3)
+
+    # Vertex-to-center distance
+    ico.VtoC = np.sqrt(1 + phi**2)
+
+    # Normal vector of all face triangles
+    ico.k = (np.sqrt(3) / (3 * (1 + phi))) * np.array(
+        [
+            [2 * phi + 1, phi, 0],
+            [1 + phi, 1 + phi, 1 + phi],
+            [phi, 0, 2 * phi + 1],
+            [1 + phi, -(1 + phi), 1 + phi],
+            [2 * phi + 1, -phi, 0],
+            [1 + phi, 1 + phi, -(1 + phi)],
+            [0, 2 * phi + 1, phi],
+            [-phi, 0, 2 * phi + 1],
+            [0, -(2 * phi + 1), phi],
+            [1 + phi, -(1 + phi), -(1 + phi)],
+            [-(2 * phi + 1), phi, 0],
+            [-(1 + phi), 1 + phi, -(1 + phi)],
+            [-phi, 0, -(2 * phi + 1)],
+            [-(1 + phi), -(1 + phi), -(1 + phi)],
+            [-(2 * phi + 1), -phi, 0],
+            [-(1 + phi), 1 + phi, 1 + phi],
+            [0, 2 * phi + 1, -phi],
+            [phi, 0, -(2 * phi + 1)],
+            [0, -(2 * phi + 1), -phi],
+            [-(1 + phi), -(1 + phi), 1 + phi],
+        ]
+    )
+
+    # Directing summit of all face triangles
+    ico.a = np.array(
+        [
+            [phi, 0, -1],
+            [1, phi, 0],
+            [0, 1, phi],
+            [0, -1, phi],
+            [1, -phi, 0],
+            [1, phi, 0],
+            [0, 1, phi],
+            [0, -1, phi],
+            [1, -phi, 0],
+            [phi, 0, -1],
+            [-phi, 0, 1],
+            [-1, phi, 0],
+            [0, 1, -phi],
+            [0, -1, -phi],
+            [-1, -phi, 0],
+            [-1, phi, 0],
+            [0, 1, -phi],
+            [0, -1, -phi],
+            [-1, -phi, 0],
+            [-phi, 0, 1],
+        ]
+    )
+
+    # Directing edge of all face triangles
+    ico.e1 = np.array(
+        [
+            [1 - phi, phi, 1],
+            [-1, 1 - phi, phi],
+            [0, -2, 0],
+            [1, 1 - phi, -phi],
+            [phi - 1, phi, -1],
+            [1 - phi, phi, 1],
+            [-1, 1 - phi, phi],
+            [0, -2, 0],
+            [1, 1 - phi, -phi],
+            [phi - 1, phi, -1],
+            [phi - 1, phi, -1],
+            [1, 1 - phi, -phi],
+            [0, -2, 0],
+            [-1, 1 - phi, phi],
+            [1 - phi, phi, 1],
+            [phi - 1, phi, -1],
+            [1, 1 - phi, -phi],
+            [0, -2, 0],
+            [-1, 1 - phi, phi],
+            [1 - phi, phi, 1],
+        ]
+    )
+
+    ico.e1[5:10] *= -1
+    ico.e1[15:20] *= -1
 
-        # Face-to-center distance
-        self.FtoC = np.sqrt(phi**2 - 1 / 3)
-
-        # Vertex-to-center distance
-        self.VtoC = np.sqrt(1 + phi**2)
-
-        # Normal vector of all face triangles
-        self.k = (np.sqrt(3) / (3 * (1 + phi))) * np.array(
-            [
-                [2 * phi + 1, phi, 0],
-                [1 + phi, 1 + phi, 1 + phi],
-                [phi, 0, 2 * phi + 1],
-                [1 + phi, -(1 + phi), 1 + phi],
-                [2 * phi + 1, -phi, 0],
-                [1 + phi, 1 + phi, -(1 + phi)],
-                [0, 2 * phi + 1, phi],
-                [-phi, 0, 2 * phi + 1],
-                [0, -(2 * phi + 1), phi],
-                [1 + phi, -(1 + phi), -(1 + phi)],
-                [-(2 * phi + 1), phi, 0],
-                [-(1 + phi), 1 + phi, -(1 + phi)],
-                [-phi, 0, -(2 * phi + 1)],
-                [-(1 + phi), -(1 + phi), -(1 + phi)],
-                [-(2 * phi + 1), -phi, 0],
-                [-(1 + phi), 1 + phi, 1 + phi],
-                [0, 2 * phi + 1, -phi],
-                [phi, 0, -(2 * phi + 1)],
-                [0, -(2 * phi + 1), -phi],
-                [-(1 + phi), -(1 + phi), 1 + phi],
-            ]
-        )
-
-        # Directing summit of all face triangles
-        self.a = np.array(
-            [
-                [phi, 0, -1],
-                [1, phi, 0],
-                [0, 1, phi],
-                [0, -1, phi],
-                [1, -phi, 0],
-                [1, phi, 0],
-                [0, 1, phi],
-                [0, -1, phi],
-                [1, -phi, 0],
-                [phi, 0, -1],
-                [-phi, 0, 1],
-                [-1, phi, 0],
-                [0, 1, -phi],
-                [0, -1, -phi],
-                [-1, -phi, 0],
-                [-1, phi, 0],
-                [0, 1, -phi],
-                [0, -1, -phi],
-                [-1, -phi, 0],
-                [-phi, 0, 1],
-            ]
-        )
-
-        # Directing edge of all face triangles
-        self.e1 = np.array(
-            [
-                [1 - phi, phi, 1],
-                [-1, 1 - phi, phi],
-                [0, -2, 0],
-                [1, 1 - phi, -phi],
-                [phi - 1, phi, -1],
-                [1 - phi, phi, 1],
-                [-1, 1 - phi, phi],
-                [0, -2, 0],
-                [1, 1 - phi, -phi],
-                [phi - 1, phi, -1],
-                [phi - 1, phi, -1],
-                [1, 1 - phi, -phi],
-                [0, -2, 0],
-                [-1, 1 - phi, phi],
-                [1 - phi, phi, 1],
-                [phi - 1, phi, -1],
-                [1, 1 - phi, -phi],
-                [0, -2, 0],
-                [-1, 1 - phi, phi],
-                [1 - phi, phi, 1],
-            ]
-        )
-
-        self.e1[5:10] *= -1
-        self.e1[15:20] *= -1
-
-        self.b = self.a + self.e1
-
-        self.e1 /= 2
-        self.e2 = np.cross(self.k, self.e1)
-        self.eB = [np.stack([self.e1[f], self.e2[f]]) for f in range(20)]
-
-        self.c = 0.5 * (self.a + self.b) + np.sqrt(3) * self.e2
-
-        self.a /= self.VtoC
-        self.b /= self.VtoC
-        self.c /= self.VtoC
-
-        self.abc = [
-            np.stack([self.a[f], self.b[f], self.c[f]]) for f in range(20)
+    ico.b = ico.a + ico.e1
+
+    ico.e1 /= 2
+    ico.e2 = np.cross(ico.k, ico.e1)
+    ico.eB = [np.stack([ico.e1[f], ico.e2[f]]) for f in range(20)]
+
+    ico.c = 0.5 * (ico.a + ico.b) + np.sqrt(3) * ico.e2
+
+    ico.a /= ico.VtoC
+    ico.b /= ico.VtoC
+    ico.c /= ico.VtoC
+
+    ico.abc = [
+        np.stack([ico.a[f], ico.b[f], ico.c[f]]) for f in range(20)
+    ]
+
+    # Oriented edges of the face triangle in the face coordinate system
+    ico.Tr = np.array(
+        [
+            [-1 / 2, -1 / 2, 1],
+            [np.sqrt(3) / 2, -np.sqrt(3) / 2, 0],
+        ]
+    )
+
+    # Bisectors of the face triangle in the face coordinate system
+    ico.Bis = np.array(
+        [
+            [np.sqrt(3) / 2, -np.sqrt(3) / 2, 0],
+            [1 / 2, 1 / 2, -1],
+        ]
+    )
+
+    # Neighboring faces
+    ico.neighboring_face = np.array(
+        [
+            [1, 4, 5],
+            [2, 0, 6],
+            [3, 1, 7],
+            [4, 2, 8],
+            [0, 3, 9],
+            [17, 16, 0],
+            [16, 15, 1],
+            [15, 19, 2],
+            [19, 18, 3],
+            [18, 17, 4],
+            [11, 14, 15],
+            [12, 10, 16],
+            [13, 11, 17],
+            [14, 12, 18],
+            [10, 13, 19],
+            [7, 6, 10],
+            [6, 5, 11],
+            [5, 9, 12],
+            [9, 8, 13],
+            [8, 7, 14],
         ]
+    )
 
-        # Oriented edges of the face triangle in the face coordinate system
-        self.Tr = np.array(
-            [
-                [-1 / 2, -1 / 2, 1],
-                [np.sqrt(3) / 2, -np.sqrt(3) / 2, 0],
-            ]
-        )
-
-        # Bisectors of the face triangle in the face coordinate system
-        self.Bis = np.array(
-            [
-                [np.sqrt(3) / 2, -np.sqrt(3) / 2, 0],
-                [1 / 2, 1 / 2, -1],
-            ]
-        )
-
-        # Neighboring faces
-        self.neighboring_face = np.array(
-            [
-                [1, 4, 5],
-                [2, 0, 6],
-                [3, 1, 7],
-                [4, 2, 8],
-                [0, 3, 9],
-                [17, 16, 0],
-                [16, 15, 1],
-                [15, 19, 2],
-                [19, 18, 3],
-                [18, 17, 4],
-                [11, 14, 15],
-                [12, 10, 16],
-                [13, 11, 17],
-                [14, 12, 18],
-                [10, 13, 19],
-                [7, 6, 10],
-                [6, 5, 11],
-                [5, 9, 12],
-                [9, 8, 13],
-                [8, 7, 14],
-            ]
-        )
+    # Constants are shared by all grids, and must not be modified
+    for name, value in list(vars(ico).items()):
+        if isinstance(value, list):
+            value = tuple(value)
+            setattr(ico, name, value)
+        for array in value if isinstance(value, tuple) else [value]:
+            if isinstance(array, np.ndarray):
+                array.setflags(write=False)
+
+    return MappingProxyType(vars(ico))
+
+
+# Read-only arrays of the icosahedron, computed once
+ICOSAHEDRON = _build_icosahedron()
+
+
+class Icosahedron:
+    def __init__(self, *args, **kwargs):
+
+        # The constants are shared, not copied: building a grid is cheap
+        self.__dict__.update(ICOSAHEDRON)
 
         self.projection = Projection()
 
 
 class Projection:
+
+    # Projections of the grids of `get_grid` are frozen with them
+    _frozen = False
+
     def __init__(self, base_poly: Icosahedron = None):
         self.base_poly = base_poly
 
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                "Projections of get_grid are shared, and can't be modified"
+            )
+        super().__setattr__(name, value)
+
+    def _freeze(self):
+        """
+        Makes the projection immutable, and its arrays read-only
+        """
+        for value in vars(self).values():
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+        super().__setattr__("_frozen", True)
+
     def project(self, X, face):
         raise NotImplementedError
 
     def inv_project(self, P, face):
         raise NotImplementedError
+
+    def project_batch(self, X, face):
+        raise NotImplementedError
+
+    def inv_project_batch(self, P, face):
+        raise NotImplementedError
+
+    def cache_name(self):
+        """
+        Name of the projection in the files of cached tables (see
+        `mesh.grid_mesh` and `metrics.metrics_table`), which differs whenever
+        the projection gives different results
+        """
+        return type(self).__name__
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+from hexasphere.stencil import Stencil
+
+
+def adjacency(grid, n: int, cache_dir=None):
+    """
+    Builds the neighbor adjacency of all the cells of a grid of resolution n,
+    as CSR arrays over canonical cell ordinals (see `batch.enumerate_cells`)
+
+    The neighbors of cell i are `indices[indptr[i]:indptr[i + 1]]`, sorted.
+    Hexagons have 6 neighbors, pentagons 5.
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - n : int
+
+    - cache_dir : str, optional
+
+    If provided, the arrays are loaded from (or saved to) the file
+    `adjacency_n{n}.npz` of this directory
+
+    ## Returns
+
+    - indptr, indices : np.array, dtype = int32 (or int64 for huge grids)
+    """
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"adjacency_n{n}.npz")
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return cached["indptr"], cached["indices"]
+
+    table = np.sort(Stencil(grid, n).neighbor_table(), axis=1)
+
+    # The missing neighbor of pentagons is -1, and thus sorted first
+    valid = table >= 0
+
+    nnz = np.count_nonzero(valid)
+    dtype = np.int32 if nnz < 2**31 else np.int64
+
+    indices = table[valid].astype(dtype)
+    indptr = np.zeros(len(table) + 1, dtype=dtype)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, indptr=indptr, indices=indices)
+
+    return indptr, indices
+
+
+def adjacency_matrix(grid, n: int, cache_dir=None):
+    """
+    Returns the adjacency of a grid of resolution n as a
+    `scipy.sparse.csr_matrix`, to be used with `scipy.sparse.csgraph` routines
+
+    Requires scipy
+    """
+    try:
+        from scipy.sparse import csr_matrix
+    except ImportError as e:
+        raise ImportError("adjacency_matrix requires scipy") from e
+
+    indptr, indices = adjacency(grid, n, cache_dir=cache_dir)
+    size = len(indptr) - 1
+
+    return csr_matrix(
+        (np.ones(len(indices), dtype=np.int8), indices, indptr),
+        shape=(size, size),
+    )
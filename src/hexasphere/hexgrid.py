@@ -1,3 +1,4 @@
+import threading
 
 import numpy as np
 
@@ -6,6 +7,11 @@ from hexasphere.geometry import compute_dist, X_to_latlon, latlon_to_X
 
 
 class HexGrid(Icosahedron):
+
+    # Grids of `get_grid` are frozen, and can be shared between threads (the
+    # compiled kernels, see `kernels`, are run one call at a time)
+    _frozen = False
+
     def __init__(self, face_A=None):
         """
         ### Parameters
@@ -19,6 +25,13 @@ class HexGrid(Icosahedron):
         self.overlap = 0
         self.margin = 0
 
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                "Grids of get_grid are shared, and can't be modified"
+            )
+        super().__setattr__(name, value)
+
     def set_overlap(self, overlap: float):
         """
         A positive overlap value (in km) will give a grid
@@ -163,25 +176,114 @@ class HexGrid(Icosahedron):
         # The hex to which the projected point belongs is retrieved
         return location.find_hex(n, out_str)
 
-    def hex_to_latlon(self, hexagon, n=None, in_str=False):
+    def latlon_to_hexes(self, lat: float, lon: float, ns, out_str=False):
         """
-        Returns the (lat, lon) coordinates of the center of the hexagon
+        Returns the results of `self.latlon_to_hex` for each resolution of ns,
+        projecting the point only once
 
         ## Parameters
 
-        - hexagon : Hexagon (or str)
+        - ns : list of int
 
-        - in_str : bool, optional
+        See `self.latlon_to_hex` for the other parameters
+        """
+        location = Location(self)
+        location.retrieve_by_projection(latlon=(lat, lon))
+        return [location.find_hex(n, out_str) for n in ns]
 
-        If True, hexagon parameter must be the string id of hexagon
+    def X_to_hex(self, X, n: int, out_str=False, normalize=False):
+        """
+        Same as `self.latlon_to_hex`, from orthogonal coordinates
+
+        ## Parameters
+
+        - X : np.array, shape = (3,)
+
+        - normalize : bool, optional
+
+        If True, X can be any non-zero vector (ECEF coordinates for instance),
+        which is normalized
+
+        See `self.latlon_to_hex` for the other parameters
+        """
+        X = np.asarray(X, dtype=float)
+        if normalize:
+            X = X / np.linalg.norm(X)
+
+        location = Location(self)
+        location.retrieve_by_projection(X=X)
+        return location.find_hex(n, out_str)
+
+    def hex_to_X(self, hexagon, n=None, in_str=False):
+        """
+        Returns the (unitary) orthogonal coordinates of the center of the
+        hexagon
+
+        See `self.hex_to_latlon` for the parameters
         """
         if in_str:
             if n is None:
                 hexagon = Hexagon(self, str_id=hexagon)
             else:
                 hexagon = Hexagon(self, str_id=hexagon, res=n + 1)
-        X = self.projection.inv_project(hexagon.P, hexagon.face)
-        return X_to_latlon(X)
+        return self.projection.inv_project(hexagon.P, hexagon.face)
+
+    def hex_to_latlon(self, hexagon, n=None, in_str=False):
+        """
+        Returns the (lat, lon) coordinates of the center of the hexagon
+
+        ## Parameters
+
+        - hexagon : Hexagon (or str)
+
+        - in_str : bool, optional
+
+        If True, hexagon parameter must be the string id of hexagon
+        """
+        return X_to_latlon(self.hex_to_X(hexagon, n, in_str))
+
+
+_GRIDS = {}
+_GRIDS_LOCK = threading.Lock()
+
+
+def get_grid(projection=None, overlap=0.0, **kwargs):
+    """
+    Returns a shared, frozen grid, built on the first call with the same
+    parameters and cached afterwards
+
+    ## Parameters
+
+    - projection : type, optional
+
+    Projection class (`SnyderEAProj` if not provided)
+
+    - overlap : float, optional
+
+    See `HexGrid.set_overlap`
+
+    - kwargs : optional
+
+    Parameters of the projection (`max_error` for instance)
+    """
+    if projection is None:
+        from hexasphere.projection import SnyderEAProj
+
+        projection = SnyderEAProj
+
+    key = (projection, float(overlap), tuple(sorted(kwargs.items())))
+    with _GRIDS_LOCK:
+        grid = _GRIDS.get(key)
+        if grid is None:
+            grid = HexGrid()
+            grid.projection = projection(grid, **kwargs)
+            if overlap > 0:
+                grid.set_overlap(overlap)
+            grid.projection._freeze()
+            grid._frozen = True
+            _GRIDS[key] = grid
+
+    return grid
 
 
 class Hexagon:
@@ -402,7 +504,6 @@ class Hexagon:
             res.append(res[0])
 
         if out_geojson:
-            res.append(res[0])
             res = {
                 "coordinates": [res],
                 "type": "Polygon",
@@ -446,7 +547,7 @@ class Hexagon:
         Returns the average distance between the vertices of hex and its center
         """
 
-        X_C = self.grid.projection.inv_project(self.get_P(), self.face)
+        X_C = self.grid.projection.inv_project(self.P, self.face)
 
         X_V = self.retrieve_polygon()
 
@@ -0,0 +1,223 @@
+import struct
+import zlib
+
+import numpy as np
+
+from hexasphere.batch import ids_resolution, ids_to_str, str_to_ids
+from hexasphere.batch import canonicalize, latlon_to_ids, pack_ids
+from hexasphere.batch import unpack_ids
+
+
+class HexSet:
+    """
+    A set of hexagons of a same resolution, stored as a sorted array of
+    unique packed ids (see `batch.pack_ids`)
+
+    Set operations are vectorized, and membership of arrays of points is
+    tested through the batch encoder.
+
+    ### Attributes
+
+    - self.ids : sorted packed ids, dtype = int64
+    - self.n : resolution of the hexagons (None for an empty set)
+    """
+
+    _MAGIC = b"HXS1"
+
+    def __init__(self, ids=(), n=None, assume_sorted=False):
+        """
+        ## Parameters
+
+        - ids : iterable of int, optional
+
+        Packed ids of standard hexagons (see `batch.canonicalize`), of a same
+        resolution. A ValueError is raised otherwise
+
+        - n : int, optional
+
+        Resolution of the hexagons, deduced from ids if not provided
+
+        - assume_sorted : bool, optional
+
+        If True, ids are expected to be already sorted, unique and valid, and
+        are not checked
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if not assume_sorted:
+            ids = np.unique(ids)
+
+        if n is None and len(ids):
+            n = int(ids_resolution(ids[:1])[0])
+
+        if not assume_sorted:
+            _validate(ids, n)
+
+        self.ids = ids
+        self.n = n
+
+    @classmethod
+    def from_str_ids(cls, str_ids):
+        return cls(str_to_ids(list(str_ids)))
+
+    @classmethod
+    def from_hexagons(cls, hexagons):
+        hexagons = list(hexagons)
+        return cls(
+            pack_ids(
+                [h.face for h in hexagons],
+                np.array([h.pos for h in hexagons]).reshape(-1, 3),
+            )
+        )
+
+    @classmethod
+    def from_latlon(cls, grid, lat, lon, n):
+        """
+        Returns the set of hexagons of resolution n covering points (lat, lon)
+        """
+        return cls(latlon_to_ids(grid, lat, lon, n), n=n)
+
+    def to_str_ids(self):
+        return ids_to_str(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __repr__(self):
+        return f"HexSet(n={self.n}, size={len(self)})"
+
+    def __contains__(self, hexagon):
+        """
+        hexagon can be a packed id, a string id or an Hexagon
+        """
+        if isinstance(hexagon, str):
+            hex_id = str_to_ids([hexagon])[0]
+        elif hasattr(hexagon, "pos"):
+            hex_id = pack_ids(hexagon.face, hexagon.pos)
+        else:
+            hex_id = hexagon
+        return bool(self.contains_ids([hex_id])[0])
+
+    def __eq__(self, other):
+        if not isinstance(other, HexSet):
+            return NotImplemented
+        return np.array_equal(self.ids, other.ids)
+
+    def contains_ids(self, ids):
+        """
+        Returns, for each packed id, whether it belongs to the set
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(ids.shape, dtype=bool)
+
+        i = np.searchsorted(self.ids, ids)
+        i[i == len(self.ids)] = 0
+        return self.ids[i] == ids
+
+    def contains_latlon(self, grid, lat, lon):
+        """
+        Returns, for each point (lat, lon), whether it falls into one of the
+        hexagons of the set
+        """
+        if self.n is None:
+            return np.zeros(np.size(lat), dtype=bool)
+        return self.contains_ids(latlon_to_ids(grid, lat, lon, self.n))
+
+    def _check(self, other):
+        if self.n is not None and other.n is not None and self.n != other.n:
+            raise ValueError(
+                f"HexSets of different resolutions: {self.n} and {other.n}"
+            )
+        return self.n if self.n is not None else other.n
+
+    def union(self, other):
+        n = self._check(other)
+        return HexSet(np.union1d(self.ids, other.ids), n, assume_sorted=True)
+
+    def intersection(self, other):
+        n = self._check(other)
+        return HexSet(
+            np.intersect1d(self.ids, other.ids, assume_unique=True),
+            n,
+            assume_sorted=True,
+        )
+
+    def difference(self, other):
+        n = self._check(other)
+        return HexSet(
+            np.setdiff1d(self.ids, other.ids, assume_unique=True),
+            n,
+            assume_sorted=True,
+        )
+
+    def symmetric_difference(self, other):
+        n = self._check(other)
+        return HexSet(
+            np.setxor1d(self.ids, other.ids, assume_unique=True),
+            n,
+            assume_sorted=True,
+        )
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+
+    def to_bytes(self):
+        """
+        Serializes the set: the gaps between consecutive sorted ids are small
+        and regular, and are compressed with zlib
+        """
+        gaps = np.diff(self.ids, prepend=np.int64(0))
+        header = self._MAGIC + struct.pack(
+            "<qq", -1 if self.n is None else self.n, len(self.ids)
+        )
+        return header + zlib.compress(gaps.astype("<i8").tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != cls._MAGIC:
+            raise ValueError("Not a serialized HexSet")
+
+        n, size = struct.unpack("<qq", data[4:20])
+        gaps = np.frombuffer(zlib.decompress(data[20:]), dtype="<i8")
+        if len(gaps) != size:
+            raise ValueError("Corrupted HexSet")
+
+        ids = np.cumsum(gaps, dtype=np.int64)
+        n = None if n < 0 else n
+        if np.any(np.diff(ids) <= 0):
+            raise ValueError("Corrupted HexSet")
+        _validate(ids, n)
+
+        return cls(ids, n, assume_sorted=True)
+
+
+def _validate(ids, n, chunk_size=1 << 13):
+    """
+    Checks that packed ids are standard ids of hexagons of resolution n, by
+    chunks to bound memory
+    """
+    N = n + 1 if len(ids) else 0
+
+    for start in range(0, len(ids), chunk_size):
+        face, pos = unpack_ids(ids[start:start + chunk_size])
+
+        if np.any(pos.sum(axis=1) != 2 * N):
+            resolutions = np.unique(ids_resolution(ids))
+            raise ValueError(
+                f"ids of several resolutions: {resolutions.tolist()[:10]}"
+            )
+        if np.any((face < 0) | (face >= 20)) or np.any(pos > N):
+            raise ValueError("ids out of the grid")
+
+        # Only hexagons on the edges of faces may be non standard
+        edge = np.any((pos == 0) | (pos == N), axis=1)
+        standard_face, standard_pos = canonicalize(face[edge], pos[edge], n)
+        if np.any(standard_face != face[edge]) or np.any(
+            standard_pos != pos[edge]
+        ):
+            raise ValueError("ids of non standard hexagons (see canonicalize)")
@@ -0,0 +1,196 @@
+import os
+
+import numpy as np
+
+from hexasphere.batch import X_to_ids, ids_to_X, latlon_to_X, neighbor_ids
+from hexasphere.geometry import R
+
+# Upper bound of the distance between the center of a hexagon and its
+# vertices, relative to `HexGrid.compute_height_for_n` (about 1.27 with both
+# projections)
+CIRCUMRADIUS = 1.5
+
+
+class PointIndex:
+    """
+    Static index of points on the sphere, bucketed by their hexagon of
+    resolution n, for nearest neighbor and radius queries
+
+    Points are sorted by packed id (see `batch.pack_ids`): the points of a
+    hexagon are contiguous, and found by binary search in the sorted array of
+    the occupied hexagons. Queries explore rings of hexagons around the
+    hexagon of the query point. Every point out of the explored rings is
+    farther than the centers of the next ring, minus their circumradius
+    (bounded with `HexGrid.compute_height_for_n`): the search stops as soon
+    as this bound exceeds the distance of the k-th nearest point found.
+
+    The arrays can be saved to a directory, and memory-mapped back.
+
+    ### Attributes
+
+    - self.cells : sorted packed ids of the occupied hexagons
+    - self.offsets : the points of self.cells[i] are
+    self.X[self.offsets[i]:self.offsets[i + 1]]
+    - self.X : unitary vectors of the points, sorted by hexagon
+    - self.order : indices of the points in the input arrays
+    """
+
+    _FILES = ("cells", "offsets", "X", "order")
+
+    def __init__(self, grid, n: int, cells, offsets, X, order):
+        self.grid = grid
+        self.n = n
+        self.cells = cells
+        self.offsets = offsets
+        self.X = X
+        self.order = order
+
+        self._radius = CIRCUMRADIUS * grid.compute_height_for_n(n)
+
+    @classmethod
+    def from_X(cls, grid, X, n: int):
+        """
+        Builds the index of unitary vectors X, shape = (N, 3)
+        """
+        X = np.asarray(X, dtype=np.float64).reshape(-1, 3)
+        ids = X_to_ids(grid, X, n)
+
+        order = np.argsort(ids, kind="stable")
+        cells, starts = np.unique(ids[order], return_index=True)
+
+        return cls(
+            grid, n, cells, np.r_[starts, len(ids)], X[order], order
+        )
+
+    @classmethod
+    def from_latlon(cls, grid, lat, lon, n: int):
+        """
+        Builds the index of points (lat, lon), in degrees
+        """
+        return cls.from_X(grid, latlon_to_X(lat, lon), n)
+
+    def __len__(self):
+        return len(self.X)
+
+    def save(self, path):
+        """
+        Saves the arrays of the index as .npy files of the directory path
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "n.npy"), np.array(self.n))
+        for name in self._FILES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, grid, path, mmap_mode="r"):
+        """
+        Loads an index saved in the directory path. Its arrays are
+        memory-mapped, unless mmap_mode is None (see `np.load`)
+        """
+        n = int(np.load(os.path.join(path, "n.npy")))
+        arrays = [
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in cls._FILES
+        ]
+        return cls(grid, n, *arrays)
+
+    def query(self, lat, lon, k=1):
+        """
+        Returns the k nearest points of (lat, lon), in degrees
+
+        ## Returns
+
+        - indices : np.array, dtype = int
+
+        Indices of the points in the arrays the index was built from, sorted
+        by distance
+
+        - distances : np.array, dtype = float
+
+        Great-circle distances, in km
+        """
+        x = latlon_to_X(lat, lon).reshape(3)
+        k = min(k, len(self))
+
+        def done(found, bound):
+            if len(found) < k:
+                return False
+            return np.partition(found, k - 1)[k - 1] <= bound
+
+        index, dist = self._search(x, done)
+        best = np.argsort(dist, kind="stable")[:k]
+
+        return self.order[index[best]], dist[best]
+
+    def query_radius(self, lat, lon, radius):
+        """
+        Returns the points within radius (in km) of (lat, lon), in degrees,
+        sorted by distance (see `query`)
+        """
+        x = latlon_to_X(lat, lon).reshape(3)
+
+        index, dist = self._search(x, lambda found, bound: bound > radius)
+        within = dist <= radius
+        index, dist = index[within], dist[within]
+        best = np.argsort(dist, kind="stable")
+
+        return self.order[index[best]], dist[best]
+
+    def _search(self, x, done):
+        """
+        Explores rings of hexagons around x, until done(distances, bound) is
+        True, bound being a lower bound of the distances to x of the points
+        out of the explored rings
+
+        ## Returns
+
+        - index, dist : positions in self.X and distances of the points of
+        the explored rings
+        """
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        ring = X_to_ids(self.grid, x[None], self.n)
+        explored = ring
+        index = [self._points_of(ring)]
+        dist = [self._distance(x, self.X[index[0]])]
+
+        while True:
+            neighbors = neighbor_ids(self.grid, ring).reshape(-1)
+            ring = np.setdiff1d(neighbors[neighbors >= 0], explored)
+
+            # Past the number of occupied hexagons, scanning them is cheaper
+            if not len(ring) or len(ring) > len(self.cells):
+                index = np.arange(len(self))
+                return index, self._distance(x, self.X)
+
+            bound = (
+                self._distance(x, ids_to_X(self.grid, ring)).min()
+                - self._radius
+            )
+            found = np.concatenate(dist)
+            if done(found, bound):
+                return np.concatenate(index), found
+
+            explored = np.union1d(explored, ring)
+            index.append(self._points_of(ring))
+            dist.append(self._distance(x, self.X[index[-1]]))
+
+    def _points_of(self, cells):
+        """
+        Returns the positions in self.X of the points of hexagons
+        """
+        i = np.searchsorted(self.cells, cells)
+        i = np.minimum(i, len(self.cells) - 1)
+        i = i[self.cells[i] == cells]
+
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        sizes = stop - start
+        shift = np.repeat(start - np.cumsum(sizes) + sizes, sizes)
+
+        return np.arange(sizes.sum()) + shift
+
+    @staticmethod
+    def _distance(x, X):
+        chord = np.linalg.norm(np.asarray(X) - x, axis=-1)
+        return 2 * np.arcsin(np.minimum(chord / 2, 1)) * R
@@ -0,0 +1,583 @@
+"""
+Compiled versions of the batch kernels, with Numba
+
+Numba is optional: when it isn't installed, `enabled()` is False and the
+NumPy implementations of `batch` and `projection` are used. The backend can
+also be chosen with `set_backend`.
+
+The kernels loop over the points in parallel, and follow the scalar code of
+`HexGrid` and of the projections, so that no temporary array is created.
+"""
+
+import functools
+import math
+import threading
+
+import numpy as np
+
+from hexasphere.geometry import phi as PHI
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+BACKENDS = ("numpy", "numba")
+
+_backend = "numba" if numba is not None else "numpy"
+
+
+def available():
+    """
+    Returns whether the Numba backend can be used
+    """
+    return numba is not None
+
+
+def set_backend(backend):
+    """
+    Selects the backend of the batch kernels, "numpy" or "numba"
+    """
+    global _backend
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend}, not in {BACKENDS}")
+    if backend == "numba" and numba is None:
+        raise ImportError("numba is not installed")
+
+    _backend = backend
+
+
+def get_backend():
+    return _backend
+
+
+def enabled():
+    """
+    Returns whether the compiled kernels are used
+    """
+    return _backend == "numba"
+
+
+# The default threading layer of Numba doesn't support parallel kernels
+# launched concurrently from several threads
+_lock = threading.Lock()
+
+
+# Floating point errors give NaN or inf, like with NumPy, instead of raising
+def _jit(func):
+    if numba is None:
+        return func
+    kernel = numba.njit(parallel=True, cache=True, error_model="numpy")(func)
+
+    @functools.wraps(func)
+    def locked(*args):
+        with _lock:
+            return kernel(*args)
+
+    return locked
+
+
+def _jit_inline(func):
+    if numba is None:
+        return func
+    return numba.njit(cache=True, error_model="numpy")(func)
+
+
+if numba is not None:
+    _prange = numba.prange
+else:
+    _prange = range
+
+
+# Cell assignment
+
+
+@_jit_inline
+def _rectify(face, x, y, z, n, neighboring_face):
+    N = n + 1
+
+    while True:
+        upper = face % 10 < 5
+        if x > N:
+            if upper:
+                x, y, z = N - z, 2 * N - x, N - y
+            else:
+                x, y, z = 2 * N - x, N - y, N - z
+            face = neighboring_face[face, 0]
+        elif y > N:
+            if upper:
+                x, y, z = 2 * N - y, N - z, N - x
+            else:
+                x, y, z = N - x, 2 * N - y, N - z
+            face = neighboring_face[face, 1]
+        elif z > N:
+            x, y, z = N - x, N - y, 2 * N - z
+            face = neighboring_face[face, 2]
+        else:
+            return face, x, y, z
+
+
+@_jit_inline
+def _resolve(f, a, b, c, n):
+    N = n + 1
+    upper = f % 10 < 5
+    band = f // 10
+
+    if a == 0 or b == 0 or c == 0:
+        if a == 0:
+            if upper:
+                return f, a, b, c
+            return (f - 4) % 5 + 10 * band, a, b, c
+        if b == 0:
+            if upper:
+                return (f + 1) % 5 + 10 * band, b, a, c
+            return f - 5, b, a, c
+        if upper:
+            return 10 * band, a, b, c
+        return (2 - f) % 5 + 10 * (1 - band), c, a, b
+
+    if c == N:
+        if upper:
+            return f, a, b, c
+        return f - 5, N - a, N - b, c
+    if a == N:
+        if band == 0 or upper:
+            return f, a, b, c
+        return (2 - f) % 5 + 5, a, N - b, N - c
+    if b == N:
+        if upper:
+            return (f - 1) % 5 + 10 * band, b, N - c, N - a
+        if band == 1:
+            return (1 - f) % 5 + 5, N - a, b, N - c
+
+    return f, a, b, c
+
+
+@_jit
+def _rectify_coordinates(face, pos, n, neighboring_face, out_face, out_pos):
+    for i in _prange(len(face)):
+        f, x, y, z = _rectify(
+            face[i], pos[i, 0], pos[i, 1], pos[i, 2], n, neighboring_face
+        )
+        out_face[i] = f
+        out_pos[i, 0] = x
+        out_pos[i, 1] = y
+        out_pos[i, 2] = z
+
+
+@_jit
+def _resolve_conflicts(face, pos, n, out_face, out_pos):
+    for i in _prange(len(face)):
+        f, a, b, c = _resolve(face[i], pos[i, 0], pos[i, 1], pos[i, 2], n)
+        out_face[i] = f
+        out_pos[i, 0] = a
+        out_pos[i, 1] = b
+        out_pos[i, 2] = c
+
+
+@_jit
+def _find_pos(face, P, n, Tr, neighboring_face, resolve, out_face, out_pos):
+    N = 2 * n + 1
+
+    for i in _prange(len(face)):
+        u = int((P[i, 0] * Tr[0, 0] + P[i, 1] * Tr[1, 0] + 1) * (N + 1) / 2)
+        v = int((P[i, 0] * Tr[0, 1] + P[i, 1] * Tr[1, 1] + 1) * (N + 1) / 2)
+        w = int((P[i, 0] * Tr[0, 2] + P[i, 1] * Tr[1, 2] + 1) * (N + 1) / 2)
+
+        a = (2 + (N - v) + w) // 3
+        b = (2 + (N - w) + u) // 3
+        c = N + 1 - (a + b)
+
+        f = face[i]
+        if min(a, b, c) < 0 or max(a, b, c) > n + 1:
+            f, a, b, c = _rectify(f, a, b, c, n, neighboring_face)
+        if resolve:
+            f, a, b, c = _resolve(f, a, b, c, n)
+
+        out_face[i] = f
+        out_pos[i, 0] = a
+        out_pos[i, 1] = b
+        out_pos[i, 2] = c
+
+
+def rectify_coordinates(grid, face, pos, n):
+    face = np.ascontiguousarray(face, dtype=np.int64)
+    pos = np.ascontiguousarray(pos, dtype=np.int64).reshape(-1, 3)
+
+    out_face = np.empty_like(face)
+    out_pos = np.empty_like(pos)
+    _rectify_coordinates(
+        face, pos, n, grid.neighboring_face.astype(np.int64), out_face, out_pos
+    )
+
+    return out_face, out_pos
+
+
+def resolve_conflicts(face, pos, n):
+    face = np.ascontiguousarray(face, dtype=np.int64)
+    pos = np.ascontiguousarray(pos, dtype=np.int64).reshape(-1, 3)
+
+    out_face = np.empty_like(face)
+    out_pos = np.empty_like(pos)
+    _resolve_conflicts(face, pos, n, out_face, out_pos)
+
+    return out_face, out_pos
+
+
+def find_pos(grid, face, P, n, resolve=False):
+    """
+    Compiled version of `batch.find_pos`, which can also resolve the
+    conflicts of the found hexagons
+    """
+    face = np.ascontiguousarray(face, dtype=np.int64)
+    P = np.ascontiguousarray(P, dtype=float)
+
+    out_face = np.empty_like(face)
+    out_pos = np.empty((len(face), 3), dtype=np.int64)
+    _find_pos(
+        face,
+        P,
+        n,
+        np.ascontiguousarray(grid.Tr, dtype=float),
+        grid.neighboring_face.astype(np.int64),
+        resolve,
+        out_face,
+        out_pos,
+    )
+
+    return out_face, out_pos
+
+
+# Projections
+
+
+@_jit_inline
+def _dot3(u, v):
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+@_jit_inline
+def _det3(u, v, w):
+    return (
+        u[0] * (v[1] * w[2] - v[2] * w[1])
+        - u[1] * (v[0] * w[2] - v[2] * w[0])
+        + u[2] * (v[0] * w[1] - v[1] * w[0])
+    )
+
+
+@_jit_inline
+def _slerp(u, v, t):
+    ang_dist = math.acos(_dot3(u, v))
+    s = math.sin(ang_dist)
+    s0 = math.sin((1 - t) * ang_dist) / s
+    s1 = math.sin(t * ang_dist) / s
+    return (
+        s0 * u[0] + s1 * v[0],
+        s0 * u[1] + s1 * v[1],
+        s0 * u[2] + s1 * v[2],
+    )
+
+
+@_jit_inline
+def _combine(a, u, b, v, c, w):
+    return (
+        a * u[0] + b * v[0] + c * w[0],
+        a * u[1] + b * v[1] + c * w[1],
+        a * u[2] + b * v[2] + c * w[2],
+    )
+
+
+@_jit
+def _gnomonic_project(X, face, k, e1, e2, FtoC, out):
+    for i in _prange(len(face)):
+        f = face[i]
+        scale = FtoC / _dot3(k[f], X[i])
+        out[i, 0] = _dot3(e1[f], X[i]) * scale
+        out[i, 1] = _dot3(e2[f], X[i]) * scale
+
+
+@_jit
+def _gnomonic_inv_project(P, face, k, e1, e2, FtoC, out):
+    for i in _prange(len(face)):
+        f = face[i]
+        X = _combine(P[i, 0], e1[f], P[i, 1], e2[f], FtoC, k[f])
+        norm = math.sqrt(_dot3(X, X))
+        for j in range(3):
+            out[i, j] = X[j] / norm
+
+
+@_jit_inline
+def _argsort3(d0, d1, d2):
+    """
+    Indices of the 3 values, in increasing order (first index first among
+    equal values, like `np.argsort`)
+    """
+    d = (d0, d1, d2)
+    i0, i1, i2 = 0, 1, 2
+    if d[i1] < d[i0]:
+        i0, i1 = i1, i0
+    if d[i2] < d[i1]:
+        i1, i2 = i2, i1
+        if d[i1] < d[i0]:
+            i0, i1 = i1, i0
+    return i0, i1, i2
+
+
+@_jit_inline
+def _subface(abc, f, i_mid, i_near, k, VtoC, FtoC):
+    """
+    Vertices (v0, w1, w2) and scale factors (s1, s2) of the subtriangle of
+    face f given by its nearest vertices (see `SnyderEAProj._subfaces_batch`)
+    """
+    v0 = (abc[f, i_near, 0], abc[f, i_near, 1], abc[f, i_near, 2])
+    v1 = (
+        (abc[f, i_near, 0] + abc[f, i_mid, 0]) * VtoC / (2 * PHI),
+        (abc[f, i_near, 1] + abc[f, i_mid, 1]) * VtoC / (2 * PHI),
+        (abc[f, i_near, 2] + abc[f, i_mid, 2]) * VtoC / (2 * PHI),
+    )
+    v2 = (k[f, 0], k[f, 1], k[f, 2])
+
+    # v1 and v2 are swapped to keep the orientation of the subtriangle
+    if (i_mid - i_near) % 3 != 1:
+        return v0, v2, v1, FtoC, PHI
+    return v0, v1, v2, PHI, FtoC
+
+
+@_jit
+def _snyder_project(X, face, abc, k, e1, e2, VtoC, FtoC, V, out):
+    for i in _prange(len(face)):
+        f = face[i]
+        x = (X[i, 0], X[i, 1], X[i, 2])
+
+        _, i_mid, i_near = _argsort3(
+            _dot3(abc[f, 0], x), _dot3(abc[f, 1], x), _dot3(abc[f, 2], x)
+        )
+        v0, w1, w2, s1, s2 = _subface(abc, f, i_mid, i_near, k, VtoC, FtoC)
+
+        # See `SnyderEAProj.find_EA_barycenter`
+        d = _combine(V, x, -_det3(x, w1, w2), v0, 0.0, v0)
+        norm = math.sqrt(_dot3(d, d))
+        d = (d[0] / norm, d[1] / norm, d[2] / norm)
+        h = math.sqrt((1 - _dot3(v0, x)) / (1 - _dot3(v0, d)))
+        A = 2 * math.atan(
+            _det3(v0, w1, d)
+            / (1 + _dot3(v0, w1) + _dot3(w1, d) + _dot3(v0, d))
+        )
+        K2 = h * A / (math.pi / 30)
+        K1 = h - K2
+        K0 = 1 - h
+
+        # Points on the vertices of the icosahedron
+        on_vertex = (
+            not (math.isfinite(K0) and math.isfinite(K1) and math.isfinite(K2))
+            or (x[0] == v0[0] and x[1] == v0[1] and x[2] == v0[2])
+        )
+        if on_vertex:
+            X_P = (VtoC * v0[0], VtoC * v0[1], VtoC * v0[2])
+        else:
+            X_P = _combine(K0 * VtoC, v0, K1 * s1, w1, K2 * s2, w2)
+
+        out[i, 0] = _dot3(e1[f], X_P)
+        out[i, 1] = _dot3(e2[f], X_P)
+
+
+@_jit
+def _snyder_inv_project(P, face, abc, k, e1, e2, Bis, VtoC, FtoC, V, out):
+    for i in _prange(len(face)):
+        f = face[i]
+        P0, P1 = P[i, 0], P[i, 1]
+
+        _, i_mid, i_near = _argsort3(
+            -(P0 * Bis[0, 0] + P1 * Bis[1, 0]),
+            -(P0 * Bis[0, 1] + P1 * Bis[1, 1]),
+            -(P0 * Bis[0, 2] + P1 * Bis[1, 2]),
+        )
+        v0, w1, w2, s1, s2 = _subface(abc, f, i_mid, i_near, k, VtoC, FtoC)
+
+        X_P = _combine(P0, e1[f], P1, e2[f], FtoC, k[f])
+
+        # Barycentric coordinates of X_P in the subtriangle (Cramer's rule)
+        c0 = (VtoC * v0[0], VtoC * v0[1], VtoC * v0[2])
+        c1 = (s1 * w1[0], s1 * w1[1], s1 * w1[2])
+        c2 = (s2 * w2[0], s2 * w2[1], s2 * w2[2])
+        det = _det3(c0, c1, c2)
+        h = 1 - _det3(X_P, c1, c2) / det
+        K2 = _det3(c0, c1, X_P) / det
+
+        # Points on the vertices of the icosahedron
+        if h < 1e-12:
+            for j in range(3):
+                out[i, j] = v0[j]
+            continue
+
+        c01 = _dot3(v0, w1)
+        c12 = _dot3(w1, w2)
+        c20 = _dot3(w2, v0)
+        s = math.sqrt(1 - c12**2)
+
+        A = (K2 / h) * math.pi / 30
+        S = math.sin(A)
+        C = 1 - math.cos(A)
+        g = C * s * (1 + c01)
+        q = 2 * math.atan2(g, S * V + C * (c01 * c12 - c20)) / math.acos(c12)
+
+        d = _slerp(w1, w2, q)
+        t = math.acos(1 + h**2 * (_dot3(v0, d) - 1)) / math.acos(_dot3(v0, d))
+        X = _slerp(v0, d, t)
+        for j in range(3):
+            out[i, j] = X[j]
+
+
+@_jit
+def _snyder_inv_project_table(
+    P, face, abc, k, Bis, sub_inv, coefficients, size, VtoC, FtoC, out
+):
+    for i in _prange(len(face)):
+        f = face[i]
+        P0, P1 = P[i, 0], P[i, 1]
+
+        # Subtriangle (i0, i1), see `SnyderEAProj._subtriangle_batch`
+        i0, i2 = 0, 0
+        d_min = d_max = P0 * Bis[0, 0] + P1 * Bis[1, 0]
+        for j in range(1, 3):
+            d = P0 * Bis[0, j] + P1 * Bis[1, j]
+            if d < d_min:
+                i0, d_min = j, d
+            if d > d_max:
+                i2, d_max = j, d
+        if i2 == i0:
+            i2 = (i0 + 1) % 3
+        i1 = 3 - i0 - i2
+
+        K0 = sub_inv[i0, i1, 0, 0] * P0 + sub_inv[i0, i1, 0, 1] * P1
+        K1 = sub_inv[i0, i1, 1, 0] * P0 + sub_inv[i0, i1, 1, 1] * P1
+        K2 = 1 - K0 - K1
+
+        h = 1 - K0
+        r = K2 / h if h > 0 else K2
+        u = min(max(h, 0.0), 1.0) * size
+        v = min(max(r, 0.0), 1.0) * size
+        j_u = min(int(u), size - 1)
+        j_v = min(int(v), size - 1)
+        x_u = u - j_u
+        x_v = v - j_v
+
+        # Bicubic polynomial of the cell, see `_CubicTable`
+        c = coefficients[j_u * size + j_v]
+        dK = [0.0, 0.0]
+        for o in range(2):
+            val = 0.0
+            for a in range(3, -1, -1):
+                res = 0.0
+                for b in range(3, -1, -1):
+                    res = res * x_v + c[o, a, b]
+                val = val * x_u + res
+            dK[o] = val
+
+        K1 += dK[0]
+        K2 += dK[1]
+        K0 = 1 - K1 - K2
+
+        s1 = K1 * VtoC / 2
+        X = (
+            (K0 * VtoC + s1) * abc[f, i0, 0] + s1 * abc[f, i1, 0]
+            + K2 * FtoC * k[f, 0],
+            (K0 * VtoC + s1) * abc[f, i0, 1] + s1 * abc[f, i1, 1]
+            + K2 * FtoC * k[f, 1],
+            (K0 * VtoC + s1) * abc[f, i0, 2] + s1 * abc[f, i1, 2]
+            + K2 * FtoC * k[f, 2],
+        )
+        norm = math.sqrt(_dot3(X, X))
+        for j in range(3):
+            out[i, j] = X[j] / norm
+
+
+def _face_arrays(poly):
+    return (
+        np.ascontiguousarray(poly.k, dtype=float),
+        np.ascontiguousarray(poly.e1, dtype=float),
+        np.ascontiguousarray(poly.e2, dtype=float),
+    )
+
+
+def gnomonic_project(proj, X, face):
+    k, e1, e2 = _face_arrays(proj.base_poly)
+    out = np.empty((len(face), 2))
+    _gnomonic_project(
+        np.ascontiguousarray(X, dtype=float),
+        np.ascontiguousarray(face, dtype=np.int64),
+        k, e1, e2, float(proj.base_poly.FtoC), out,
+    )
+    return out
+
+
+def gnomonic_inv_project(proj, P, face):
+    k, e1, e2 = _face_arrays(proj.base_poly)
+    out = np.empty((len(face), 3))
+    _gnomonic_inv_project(
+        np.ascontiguousarray(P, dtype=float),
+        np.ascontiguousarray(face, dtype=np.int64),
+        k, e1, e2, float(proj.base_poly.FtoC), out,
+    )
+    return out
+
+
+def snyder_project(proj, X, face):
+    poly = proj.base_poly
+    k, e1, e2 = _face_arrays(poly)
+    out = np.empty((len(face), 2))
+    _snyder_project(
+        np.ascontiguousarray(X, dtype=float),
+        np.ascontiguousarray(face, dtype=np.int64),
+        np.ascontiguousarray(proj._abc, dtype=float),
+        k, e1, e2,
+        float(poly.VtoC), float(poly.FtoC), float(proj.V), out,
+    )
+    return out
+
+
+def snyder_inv_project(proj, P, face):
+    poly = proj.base_poly
+    k, e1, e2 = _face_arrays(poly)
+    out = np.empty((len(face), 3))
+    _snyder_inv_project(
+        np.ascontiguousarray(P, dtype=float),
+        np.ascontiguousarray(face, dtype=np.int64),
+        np.ascontiguousarray(proj._abc, dtype=float),
+        k, e1, e2,
+        np.ascontiguousarray(poly.Bis, dtype=float),
+        float(poly.VtoC), float(poly.FtoC), float(proj.V), out,
+    )
+    return out
+
+
+def snyder_inv_project_table(proj, P, face):
+    poly = proj.base_poly
+    table = proj._inv_table
+    out = np.empty((len(face), 3))
+    _snyder_inv_project_table(
+        np.ascontiguousarray(P, dtype=float),
+        np.ascontiguousarray(face, dtype=np.int64),
+        np.ascontiguousarray(proj._abc, dtype=float),
+        np.ascontiguousarray(poly.k, dtype=float),
+        np.ascontiguousarray(poly.Bis, dtype=float),
+        proj._subtriangle_inv,
+        table._coefficients,
+        table.size,
+        float(poly.VtoC), float(poly.FtoC), out,
+    )
+    return out
+
+
+@_jit
+def _start(out):
+    for i in _prange(len(out)):
+        out[i] = i
+
+
+# The threading layer is started from the importing thread: started from
+# another thread, TBB hangs the interpreter at exit
+if numba is not None:
+    _start(np.empty(1))
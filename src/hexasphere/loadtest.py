@@ -0,0 +1,392 @@
+"""
+Load tests of the public API on adversarial workloads
+
+Uniformly random points hide the slow paths: points close to the edges and
+vertices of the icosahedron go through `rectify_coordinates` and
+`canonicalize`, the vertices themselves through the special cases of the
+projections, and the poles through the ones of `X_to_latlon`. Each workload
+is labelled, and every API is timed on each of them, with each projection,
+while the results are checked (scalar and batch paths agree, single and
+multi-resolution ids too, string ids decode back to their ids, rings and
+neighbors are the same hexagons, and decoded centers encode back to the same
+hexagons).
+
+```
+python -m hexasphere.loadtest --points 100000 --n 1000
+```
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from hexasphere import batch, geometry
+from hexasphere.geometry import ICOSAHEDRON
+from hexasphere.hexgrid import Hexagon, get_grid
+from hexasphere.projection import GnomonicProj, SnyderEAProj
+
+PROJECTIONS = {"gnomonic": GnomonicProj, "snyder": SnyderEAProj}
+
+
+def uniform(rng, size):
+    """
+    Uniformly random points on the sphere
+    """
+    X = rng.normal(size=(size, 3))
+    return batch.X_to_latlon(X / np.linalg.norm(X, axis=1)[:, None]).T
+
+
+def clustered(rng, size, clusters=50, spread=0.2):
+    """
+    Points around a few random centers (cities), within about spread degrees
+    """
+    lat, lon = uniform(rng, clusters)
+    i = rng.integers(clusters, size=size)
+    lat = np.clip(lat[i] + rng.normal(scale=spread, size=size), -90, 90)
+    lon = (lon[i] + rng.normal(scale=spread, size=size) + 180) % 360 - 180
+    return lat, lon
+
+
+def face_edges(rng, size, jitter=1e-9):
+    """
+    Points on the edges of the faces of the icosahedron, up to jitter (in
+    radians)
+    """
+    a, b = ICOSAHEDRON["a"], ICOSAHEDRON["b"]
+    face = rng.integers(20, size=size)
+    t = rng.random((size, 1))
+    X = (1 - t) * a[face] + t * b[face]
+    return _jittered(rng, X, jitter)
+
+
+def vertices(rng, size, jitter=1e-9):
+    """
+    Points around the vertices of the icosahedron, up to jitter (in radians):
+    a tenth of them exactly on the vertices
+    """
+    V = np.concatenate([ICOSAHEDRON["a"], ICOSAHEDRON["b"], ICOSAHEDRON["c"]])
+    X = V[rng.integers(len(V), size=size)]
+    lat, lon = _jittered(rng, X, jitter)
+
+    exact = batch.X_to_latlon(X[: size // 10]).T
+    lat[: size // 10], lon[: size // 10] = exact
+    return lat, lon
+
+
+def polar(rng, size, spread=1e-3):
+    """
+    Points within spread degrees of the poles, a tenth of them exactly on the
+    poles
+    """
+    lat = 90 - np.abs(rng.normal(scale=spread, size=size))
+    lat[: size // 10] = 90
+    lat *= rng.choice([-1, 1], size=size)
+    lon = rng.uniform(-180, 180, size)
+    return lat, lon
+
+
+def _jittered(rng, X, jitter):
+    X = X / np.linalg.norm(X, axis=1)[:, None]
+    X = X + rng.normal(scale=jitter, size=X.shape)
+    return batch.X_to_latlon(X / np.linalg.norm(X, axis=1)[:, None]).T
+
+
+WORKLOADS = {
+    "uniform": uniform,
+    "clustered": clustered,
+    "face_edges": face_edges,
+    "vertices": vertices,
+    "polar": polar,
+}
+
+
+def run(
+    workloads=None,
+    projections=None,
+    n=1000,
+    points=100000,
+    batch_size=10000,
+    scalar_points=1000,
+    seed=0,
+):
+    """
+    Runs the load tests
+
+    ## Parameters
+
+    - workloads, projections : list of str, optional
+
+    Names in WORKLOADS and PROJECTIONS, all of them if not provided
+
+    - n : int
+
+    Resolution of the hexagons
+
+    - points : int
+
+    Number of points of each workload, encoded by calls of batch_size points
+    to the batch functions
+
+    - scalar_points : int
+
+    Number of points of each workload given to the scalar methods, one call
+    per point
+
+    ## Returns
+
+    - results : list of dict
+
+    For each workload, projection and API: the number of calls and points,
+    the throughput (points per second), the p50 and p99 latencies of calls
+    (in s), and the number of failed checks
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for workload in workloads or list(WORKLOADS):
+        lat, lon = WORKLOADS[workload](rng, points)
+
+        for name in projections or list(PROJECTIONS):
+            grid = get_grid(PROJECTIONS[name])
+
+            # Compiled kernels (see `kernels`) are not timed
+            _run_batch(grid, lat[:10], lon[:10], n, 10, lambda *args: None)
+
+            def report(api, timings, size, errors=0):
+                timings = np.array(timings)
+                results.append(
+                    {
+                        "workload": workload,
+                        "projection": name,
+                        "api": api,
+                        "calls": len(timings),
+                        "points": size,
+                        "throughput": size / timings.sum(),
+                        "p50": float(np.percentile(timings, 50)),
+                        "p99": float(np.percentile(timings, 99)),
+                        "errors": int(errors),
+                    }
+                )
+
+            _run_batch(grid, lat, lon, n, batch_size, report)
+            _run_scalar(
+                grid, lat[:scalar_points], lon[:scalar_points], n, report
+            )
+
+    return results
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return res, time.perf_counter() - start
+
+
+def _run_batch(grid, lat, lon, n, batch_size, report):
+
+    calls = [slice(i, i + batch_size) for i in range(0, len(lat), batch_size)]
+
+    ids, timings = np.empty(len(lat), dtype=np.int64), []
+    for s in calls:
+        ids[s], t = _timed(batch.latlon_to_ids, grid, lat[s], lon[s], n)
+        timings.append(t)
+    report("latlon_to_ids", timings, len(lat))
+
+    X = batch.latlon_to_X(lat, lon)
+    timings, errors = [], 0
+    for s in calls:
+        res, t = _timed(batch.X_to_ids, grid, X[s], n)
+        timings.append(t)
+        errors += np.sum(res != ids[s])
+    report("X_to_ids", timings, len(lat), errors)
+
+    # Centers encode back to their hexagons
+    timings, errors = [], 0
+    for s in calls:
+        centers, t = _timed(batch.ids_to_latlon, grid, ids[s])
+        timings.append(t)
+        errors += np.sum(
+            batch.latlon_to_ids(grid, centers[:, 0], centers[:, 1], n) != ids[s]
+        )
+    report("ids_to_latlon", timings, len(lat), errors)
+
+    timings, errors = [], 0
+    for s in calls:
+        (V, index), t = _timed(batch.ids_to_polygons, grid, ids[s])
+        timings.append(t)
+        errors += np.sum(~np.isfinite(V).all(axis=1))
+    report("ids_to_polygons", timings, len(lat), errors)
+
+    # Multi-resolution ids agree with the ones of each resolution
+    ns = _resolutions(n)
+    multi = np.empty((len(lat), len(ns)), dtype=np.int64)
+    timings, errors = [], 0
+    for s in calls:
+        multi[s], t = _timed(batch.latlon_to_ids_multi, grid, lat[s], lon[s], ns)
+        timings.append(t)
+    for j, n_j in enumerate(ns):
+        errors += np.sum(multi[:, j] != batch.latlon_to_ids(grid, lat, lon, n_j))
+    report("latlon_to_ids_multi", timings, len(lat), errors)
+
+    timings, errors = [], 0
+    for s in calls:
+        res, t = _timed(batch.X_to_ids_multi, grid, X[s], ns)
+        timings.append(t)
+        errors += np.sum(res != multi[s])
+    report("X_to_ids_multi", timings, len(lat), errors)
+
+    # String ids decode back to the same ids, and none of them is malformed
+    timings, errors = [], 0
+    for s in calls:
+        data = batch.ids_to_bytes(ids[s])
+        res, t = _timed(batch.bytes_to_ids, data)
+        timings.append(t)
+        errors += np.sum(res != ids[s]) + len(batch.invalid_str_ids(data))
+    report("bytes_to_ids", timings, len(lat), errors)
+
+
+def _run_scalar(grid, lat, lon, n, report):
+
+    ids = batch.ids_to_str(batch.latlon_to_ids(grid, lat, lon, n))
+
+    hexagons, timings, errors = [], [], 0
+    for lat_i, lon_i, id_i in zip(lat, lon, ids):
+        res, t = _timed(grid.latlon_to_hex, lat_i, lon_i, n)
+        hexagons.append(res[0])
+        timings.append(t)
+        errors += res[0].to_str_id() != id_i
+    report("latlon_to_hex", timings, len(lat), errors)
+
+    timings, errors = [], 0
+    for hexagon in hexagons:
+        (lat_c, lon_c), t = _timed(grid.hex_to_latlon, hexagon)
+        timings.append(t)
+        errors += (
+            grid.latlon_to_hex(lat_c, lon_c, n, out_str=True)[0]
+            != hexagon.to_str_id()
+        )
+    report("hex_to_latlon", timings, len(lat), errors)
+
+    timings = []
+    for hexagon in hexagons:
+        _, t = _timed(Hexagon.retrieve_polygon, hexagon)
+        timings.append(t)
+    report("retrieve_polygon", timings, len(lat))
+
+    # Exact poles, with signed zeros, on top of the points of the workload
+    X = np.concatenate([batch.latlon_to_X(lat, lon), _POLES])
+    expected = batch.X_to_latlon(X)
+    timings, errors = [], 0
+    for X_i, expected_i in zip(X, expected):
+        res, t = _timed(geometry.X_to_latlon, X_i)
+        timings.append(t)
+        errors += not np.allclose(res, expected_i, rtol=0, atol=1e-12)
+    errors += np.sum(expected[-len(_POLES):] != [[90, 0], [-90, 0]] * 2)
+    report("X_to_latlon", timings, len(X), errors)
+
+    ns = _resolutions(n)
+    multi = batch.latlon_to_ids_multi(grid, lat, lon, ns)
+    timings, errors = [], 0
+    for lat_i, lon_i, ids_i in zip(lat, lon, multi):
+        res, t = _timed(grid.latlon_to_hexes, lat_i, lon_i, ns, out_str=True)
+        timings.append(t)
+        errors += [r[0] for r in res] != batch.ids_to_str(ids_i)
+    report("latlon_to_hexes", timings, len(lat), errors)
+
+    # Rings of radius 1 are the hexagons and their neighbors
+    neighbors = batch.neighbor_ids(grid, batch.str_to_ids(ids))
+    timings, errors = [], 0
+    for hexagon, id_i, neighbors_i in zip(hexagons, ids, neighbors):
+        res, t = _timed(hexagon.k_ring, 1, out_str=True)
+        timings.append(t)
+        expected = batch.ids_to_str(neighbors_i[neighbors_i >= 0])
+        errors += set(res) != {id_i, *expected}
+    report("k_ring", timings, len(lat), errors)
+
+    timings, errors = [], 0
+    for hexagon, neighbors_i in zip(hexagons, neighbors):
+        start = time.perf_counter()
+        res = {hexagon.compute_neighbor(dP).to_str_id() for dP in _STEPS}
+        timings.append(time.perf_counter() - start)
+        expected = batch.ids_to_str(neighbors_i[neighbors_i >= 0])
+        errors += res != set(expected)
+    report("compute_neighbor", timings, len(lat), errors)
+
+    # Parents contain the points of their children, at a resolution dividing
+    # in 4 (see `Hexagon.find_parent_hex`)
+    res_child = 4 * max((n + 1) // 4, 1)
+    children = batch.ids_to_str(
+        batch.latlon_to_ids(grid, lat, lon, res_child - 1)
+    )
+    parents = batch.ids_to_str(
+        batch.latlon_to_ids(grid, lat, lon, res_child // 4 - 1)
+    )
+    timings, errors = [], 0
+    for child, parent in zip(children, parents):
+        hexagon = Hexagon(grid, str_id=child)
+        res, t = _timed(hexagon.find_parent_hex)
+        timings.append(t)
+        errors += parent not in [h.to_str_id() for h in res]
+    report("find_parent_hex", timings, len(lat), errors)
+
+
+# Unit vectors of the poles, with each sign of zero
+_POLES = np.array(
+    [[0.0, 0.0, 1.0], [0.0, 0.0, -1.0], [-0.0, -0.0, 1.0], [-0.0, 0.0, -1.0]]
+)
+
+# Steps from hexagons to their neighbors, in face coordinates
+_STEPS = [(1, -1, 0), (-1, 1, 0), (1, 0, -1), (-1, 0, 1), (0, 1, -1), (0, -1, 1)]
+
+
+def _resolutions(n):
+    return sorted({n // 4, n // 2, n})
+
+
+def format_report(results):
+    """
+    Returns the results of `run` as a text table
+    """
+    header = (
+        f"{'workload':<11}{'projection':<11}{'api':<21}{'points/s':>12}"
+        f"{'p50 (ms)':>11}{'p99 (ms)':>11}{'errors':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['workload']:<11}{r['projection']:<11}{r['api']:<21}"
+            f"{r['throughput']:>12.0f}{1000 * r['p50']:>11.3f}"
+            f"{1000 * r['p99']:>11.3f}{r['errors']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workloads", nargs="+", choices=list(WORKLOADS))
+    parser.add_argument("--projections", nargs="+", choices=list(PROJECTIONS))
+    parser.add_argument("--n", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--scalar-points", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    results = run(
+        args.workloads,
+        args.projections,
+        n=args.n,
+        points=args.points,
+        batch_size=args.batch_size,
+        scalar_points=args.scalar_points,
+        seed=args.seed,
+    )
+    print(format_report(results))
+
+    # Failed checks give a non-zero exit code
+    return int(any(r["errors"] for r in results))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
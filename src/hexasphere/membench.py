@@ -0,0 +1,291 @@
+"""
+Memory benchmarks of the public API, against budgets
+
+Each API is run on a number of cells, and the peak and retained memory are
+measured with tracemalloc (NumPy arrays included), along with the growth
+of the resident set size. Both are given per million cells, for the object
+paths (`Hexagon`) and the columnar paths (`batch`, `HexSet`, `export`).
+Budgets, in MB per million cells, fail the suite when exceeded.
+
+```
+python -m hexasphere.membench --cells 20000 --budgets budgets.json
+```
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from hexasphere import batch
+from hexasphere.export import GeoJSONWriter
+from hexasphere.graph import adjacency
+from hexasphere.hexgrid import Hexagon, get_grid
+from hexasphere.hexset import HexSet
+from hexasphere.remap import remap
+from hexasphere.stencil import Stencil
+
+# Budgets in MB per million cells: (peak, retained), measured with the default
+# parameters of `run`. Retained memory is the one held by the results. The
+# peak of chunked functions (GeoJSONWriter) is bounded by their chunk size,
+# and falls, per million cells, with more cells
+BUDGETS = {
+    "latlon_to_hex": (900, 900),
+    "Hexagon": (600, 600),
+    "retrieve_polygon": (1800, 1800),
+    "k_ring": (650, 650),
+    "latlon_to_ids": (250, 16),
+    "latlon_to_ids_multi": (320, 48),
+    "X_to_ids_multi": (320, 48),
+    "ids_to_latlon": (250, 32),
+    "ids_to_polygons": (1400, 370),
+    "ids_to_str": (560, 150),
+    "ids_to_bytes": (240, 36),
+    "bytes_to_ids": (400, 16),
+    "HexSet": (64, 16),
+    "GeoJSONWriter": (1900, 5),
+    "remap": (320, 80),
+    "Stencil": (260, 130),
+    "adjacency": (320, 56),
+}
+
+
+def measure(func):
+    """
+    Runs func, and returns the peak and retained memory of tracemalloc, and
+    the growth of the resident set size (None if unavailable), in bytes
+    """
+    gc.collect()
+    rss = _rss()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        res = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    rss_growth = None if rss is None else _rss() - rss
+    del res
+
+    return peak - start, current - start, rss_growth
+
+
+def _rss():
+    """
+    Current resident set size (Linux only)
+    """
+    if resource is None:
+        return None
+
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+
+    return pages * resource.getpagesize()
+
+
+class _NullFile:
+    def write(self, text):
+        pass
+
+
+def _benchmarks(grid, lat, lon, n, ring):
+    """
+    Returns the benchmarks, as (name, number of cells, function)
+    """
+    ids = batch.latlon_to_ids(grid, lat, lon, n)
+    str_ids = batch.ids_to_str(ids)
+    data = batch.ids_to_bytes(ids)
+    X = batch.latlon_to_X(lat, lon)
+    ns = [n // 4, n // 2, n]
+
+    # Remapping and stencils on grids of about as many cells as points
+    n1 = int(np.sqrt(len(lat) / 10))
+    n2 = 3 * n1 // 4
+    cells = 10 * (n1 + 1) ** 2 + 2
+    hexagons = [Hexagon(grid, str_id=str_id) for str_id in str_ids]
+    center = hexagons[0]
+
+    def export():
+        with GeoJSONWriter(grid, _NullFile()) as writer:
+            writer.write(ids)
+
+    return [
+        (
+            "latlon_to_hex",
+            len(lat),
+            lambda: [grid.latlon_to_hex(x, y, n) for x, y in zip(lat, lon)],
+        ),
+        (
+            "Hexagon",
+            len(ids),
+            lambda: [Hexagon(grid, str_id=str_id) for str_id in str_ids],
+        ),
+        (
+            "retrieve_polygon",
+            len(ids),
+            lambda: [h.retrieve_polygon() for h in hexagons],
+        ),
+        ("k_ring", 3 * ring * (ring + 1) + 1, lambda: center.k_ring(ring)),
+        (
+            "latlon_to_ids",
+            len(lat),
+            lambda: batch.latlon_to_ids(grid, lat, lon, n),
+        ),
+        (
+            "latlon_to_ids_multi",
+            len(lat),
+            lambda: batch.latlon_to_ids_multi(grid, lat, lon, ns),
+        ),
+        (
+            "X_to_ids_multi",
+            len(X),
+            lambda: batch.X_to_ids_multi(grid, X, ns),
+        ),
+        ("ids_to_latlon", len(ids), lambda: batch.ids_to_latlon(grid, ids)),
+        (
+            "ids_to_polygons",
+            len(ids),
+            lambda: batch.ids_to_polygons(grid, ids),
+        ),
+        ("ids_to_str", len(ids), lambda: batch.ids_to_str(ids)),
+        ("ids_to_bytes", len(ids), lambda: batch.ids_to_bytes(ids)),
+        ("bytes_to_ids", len(ids), lambda: batch.bytes_to_ids(data)),
+        ("HexSet", len(ids), lambda: HexSet(ids)),
+        ("GeoJSONWriter", len(ids), export),
+        ("remap", cells, lambda: remap(grid, n1, n2)),
+        ("Stencil", cells, lambda: Stencil(grid, n1)),
+        ("adjacency", cells, lambda: adjacency(grid, n1)),
+    ]
+
+
+def run(cells=20000, n=1000, ring=100, budgets=None, names=None, seed=0):
+    """
+    Runs the memory benchmarks
+
+    ## Parameters
+
+    - cells : int
+
+    Number of points (and cells) of each benchmark
+
+    - n : int
+
+    Resolution of the cells
+
+    - ring : int
+
+    Radius of the `Hexagon.k_ring` benchmark
+
+    - budgets : dict, optional
+
+    Budgets (peak, retained) in MB per million cells, by benchmark name,
+    BUDGETS if not provided
+
+    - names : list of str, optional
+
+    Benchmarks to run, all of them if not provided
+
+    ## Returns
+
+    - results : list of dict
+
+    For each benchmark: its number of cells, the peak and retained memory
+    and the growth of RSS (in MB per million cells), and whether it exceeds
+    its budget
+    """
+    budgets = BUDGETS if budgets is None else budgets
+    grid = get_grid()
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(cells, 3))
+    lat, lon = batch.X_to_latlon(X / np.linalg.norm(X, axis=1)[:, None]).T
+
+    # Compiled kernels (see `kernels`) are not measured
+    batch.ids_to_polygons(
+        grid, batch.latlon_to_ids(grid, lat[:10], lon[:10], n)
+    )
+
+    results = []
+    for name, size, func in _benchmarks(grid, lat, lon, n, ring):
+        if names is not None and name not in names:
+            continue
+
+        peak, retained, rss = measure(func)
+        scale = 1e6 / size / 2**20
+
+        result = {
+            "name": name,
+            "cells": size,
+            "peak": peak * scale,
+            "retained": retained * scale,
+            "rss": None if rss is None else rss * scale,
+        }
+        peak_budget, retained_budget = budgets.get(name, (np.inf, np.inf))
+        result["over_budget"] = bool(
+            result["peak"] > peak_budget or result["retained"] > retained_budget
+        )
+        results.append(result)
+
+    return results
+
+
+def format_report(results):
+    """
+    Returns the results of `run` as a text table
+    """
+    header = (
+        f"{'benchmark':<21}{'cells':>9}{'peak MB/M':>12}{'retained MB/M':>15}"
+        f"{'RSS MB/M':>11}  budget"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        rss = "" if r["rss"] is None else f"{r['rss']:.1f}"
+        lines.append(
+            f"{r['name']:<21}{r['cells']:>9}{r['peak']:>12.1f}"
+            f"{r['retained']:>15.1f}{rss:>11}  "
+            f"{'EXCEEDED' if r['over_budget'] else 'ok'}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cells", type=int, default=20000)
+    parser.add_argument("--n", type=int, default=1000)
+    parser.add_argument("--ring", type=int, default=100)
+    parser.add_argument("--names", nargs="+", choices=list(BUDGETS))
+    parser.add_argument(
+        "--budgets",
+        help="JSON file of budgets {name: [peak, retained]}, in MB per "
+        "million cells, overriding the default ones",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    budgets = dict(BUDGETS)
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets.update({k: tuple(v) for k, v in json.load(f).items()})
+
+    results = run(
+        args.cells, args.n, args.ring, budgets, args.names, args.seed
+    )
+    print(format_report(results))
+
+    # Exceeded budgets give a non-zero exit code
+    return int(any(r["over_budget"] for r in results))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+
+from hexasphere.batch import enumerate_cells, ids_to_polygons
+
+
+def grid_mesh(grid, n: int, cache_dir=None):
+    """
+    Builds all the cells of a grid of resolution n as an indexed mesh
+
+    Vertices are shared by the cells around them: the vertices of cells on
+    the edges of the faces of the icosahedron are moved to their neighboring
+    face (through `neighboring_face`) before being deduplicated, so that the
+    mesh has no seam.
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - n : int
+
+    - cache_dir : str, optional
+
+    If provided, the arrays are loaded from (or saved to) the file
+    `mesh_{projection}_n{n}.npz` of this directory (see
+    `Projection.cache_name`)
+
+    ## Returns
+
+    - vertices : np.array, shape = (20 * (n + 1) ** 2, 3), dtype = float32
+
+    Unitary vectors of the vertices
+
+    - cells : np.array, shape = (10 * (n + 1) ** 2 + 2, 6), dtype = int32
+
+    Indices of the vertices of each cell, in canonical cell order (see
+    `batch.enumerate_cells`). Pentagons have -1 in their last column
+    """
+    if cache_dir is not None:
+        name = grid.projection.cache_name()
+        path = os.path.join(cache_dir, f"mesh_{name}_n{n}.npz")
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return cached["vertices"], cached["cells"]
+
+    X, index = ids_to_polygons(grid, enumerate_cells(n))
+
+    vertices = X.astype(np.float32)
+    dtype = np.int32 if len(X) < 2**31 else np.int64
+    cells = index.astype(dtype)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, vertices=vertices, cells=cells)
+
+    return vertices, cells
@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+
+from hexasphere.batch import canonicalize, enumerate_cells, ids_to_X
+from hexasphere.batch import ids_to_polygons, pack_ids, unpack_ids
+from hexasphere.geometry import R
+
+
+def cell_metrics(grid, ids):
+    """
+    Computes the area, perimeter and effective radius of the hexagons of
+    packed ids, on the sphere
+
+    Hexagons are approximated by the geodesic polygons joining their
+    vertices: areas are sums of the spherical excesses of the triangles
+    joining the center of each hexagon to its edges. The edges of
+    `SnyderEAProj` hexagons are not geodesics, so that their areas, equal
+    for the projection, spread by about 0.3 % here (from -0.07 % to +0.3 %
+    at n = 99), while their sum over the grid stays exact.
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - ids : np.array, dtype = int64
+
+    Packed ids of hexagons of a same resolution
+
+    ## Returns
+
+    - area : np.array, dtype = float
+
+    Area in km²
+
+    - perimeter : np.array, dtype = float
+
+    Perimeter in km
+
+    - radius : np.array, dtype = float
+
+    Radius of the disk with the same area (see
+    `HexGrid.compute_radius_for_n`), in km
+    """
+    ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+    X, index = ids_to_polygons(grid, ids)
+    C = ids_to_X(grid, ids)
+
+    # Pentagons: the missing vertex is replaced by the first one, giving an
+    # empty edge
+    index = np.where(index < 0, index[:, :1], index)
+    V = X[index]
+    W = np.roll(V, -1, axis=1)
+
+    # Van Oosterom and Strackee formula of the solid angle of the triangles
+    # (C, V, W)
+    C = C[:, None, :]
+    triple = np.einsum("nki,nki->nk", C, np.cross(V, W))
+    denominator = (
+        1
+        + np.einsum("nki,nki->nk", C, V)
+        + np.einsum("nki,nki->nk", V, W)
+        + np.einsum("nki,nki->nk", W, C)
+    )
+    area = 2 * np.abs(np.arctan2(triple, denominator)).sum(axis=1) * R**2
+
+    chord = np.linalg.norm(W - V, axis=2)
+    perimeter = 2 * np.arcsin(np.minimum(chord / 2, 1)).sum(axis=1) * R
+
+    return area, perimeter, np.sqrt(area / np.pi)
+
+
+def metrics_table(grid, n, cache_dir=None):
+    """
+    Returns the metrics of `cell_metrics` of all the hexagons of resolution
+    n, indexed by canonical ordinals (see `batch.enumerate_cells`)
+
+    The layout of hexagons is the same on every face, and symmetric under the
+    permutations of (a, b, c): metrics are computed only for sorted pos.
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - n : int
+
+    - cache_dir : str, optional
+
+    If provided, the table is loaded from (or saved to) the file
+    `metrics_{projection}_n{n}.npz` of this directory (see
+    `Projection.cache_name`)
+
+    ## Returns
+
+    - area, perimeter, radius : np.array, dtype = float
+    """
+    if cache_dir is not None:
+        name = grid.projection.cache_name()
+        path = os.path.join(cache_dir, f"metrics_{name}_n{n}.npz")
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return cached["area"], cached["perimeter"], cached["radius"]
+
+    N = n + 1
+    _, pos = unpack_ids(enumerate_cells(n))
+    pos = np.sort(pos, axis=1)
+    keys = pos[:, 0] * (N + 1) + pos[:, 1]
+
+    keys, first, inverse = np.unique(
+        keys, return_index=True, return_inverse=True
+    )
+    face, sorted_pos = canonicalize(
+        np.zeros(len(keys), dtype=np.int64), pos[first], n
+    )
+    metrics = cell_metrics(grid, pack_ids(face, sorted_pos))
+    area, perimeter, radius = (x[inverse.reshape(-1)] for x in metrics)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, area=area, perimeter=perimeter, radius=radius)
+
+    return area, perimeter, radius
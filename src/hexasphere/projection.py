@@ -1,7 +1,8 @@
 
 import numpy as np
 
-from hexasphere.geometry import Projection, phi
+from hexasphere import kernels
+from hexasphere.geometry import Projection, R, phi
 
 
 class GnomonicProj(Projection):
@@ -35,13 +36,70 @@ class GnomonicProj(Projection):
 
         return X / np.linalg.norm(X)
 
+    def project_batch(self, X, face):
+        """
+        Vectorized version of `project`
+
+        ## Parameters
+
+        - X : np.array, shape = (N, 3)
+
+        - face : np.array, shape = (N,), dtype = int
+        """
+        if kernels.enabled():
+            return kernels.gnomonic_project(self, X, face)
+
+        k = self.base_poly.k[face]
+        e1 = self.base_poly.e1[face]
+        e2 = self.base_poly.e2[face]
+
+        P = np.stack([_dot(e1, X), _dot(e2, X)], axis=-1)
+        P *= (self.base_poly.FtoC / _dot(k, X))[:, None]
+
+        return P
+
+    def inv_project_batch(self, P, face):
+        """
+        Vectorized version of `inv_project`
+
+        ## Parameters
+
+        - P : np.array, shape = (N, 2)
+
+        - face : np.array, shape = (N,), dtype = int
+        """
+        if kernels.enabled():
+            return kernels.gnomonic_inv_project(self, P, face)
+
+        X = (
+            self.base_poly.e1[face] * P[:, :1]
+            + self.base_poly.e2[face] * P[:, 1:]
+            + self.base_poly.FtoC * self.base_poly.k[face]
+        )
+
+        return X / np.linalg.norm(X, axis=1)[:, None]
+
 
 class SnyderEAProj(Projection):
     """
     A projection that preserves areas, but (slightly) deforms shapes
+
+    ### Approximate mode
+
+    If `max_error` (in km) is provided, the inverse projection is computed
+    from a table of the exact one, precomputed over a single subtriangle
+    (each face is split into 6 subtriangles, from its center to its vertices
+    and the middles of its edges: the projection is the same on the 120
+    subtriangles, up to rotations and symmetries). The table is refined until
+    the error, measured against the exact inverse projection, is below
+    `max_error`: 1e-5 km (1 cm) needs a table of 129 x 129 points. The
+    interpolation error falls as the fourth power of the step of the table:
+    1e-6 km needs 257 x 257 points. `table_error` gives the error of the
+    table, and the results of the projection are cached apart from the exact
+    ones (see `cache_name`).
     """
 
-    def __init__(self, grid=None):
+    def __init__(self, grid=None, max_error=None):
         super().__init__(grid)
 
         v0 = self.base_poly.a[0]
@@ -51,6 +109,46 @@ class SnyderEAProj(Projection):
 
         self.V = np.linalg.det(np.stack([v0, v1, v2]))
 
+        self._abc = np.stack(self.base_poly.abc)
+
+        # Vertices of the face triangle, in face coordinates (the same for
+        # all faces)
+        self._P_vertex = np.stack(
+            [
+                2 * self.base_poly.Bis.dot(1 - np.eye(3)[i]) / np.sqrt(3)
+                for i in range(3)
+            ]
+        )
+        # Barycentric coordinates (vertex, middle of edge) of points of the
+        # subtriangle (i0, i1), from their face coordinates
+        self._subtriangle_inv = np.zeros((3, 3, 2, 2))
+        for i0 in range(3):
+            for i1 in range(3):
+                if i0 != i1:
+                    P_v = self._P_vertex[i0]
+                    P_m = (self._P_vertex[i0] + self._P_vertex[i1]) / 2
+                    self._subtriangle_inv[i0, i1] = np.linalg.inv(
+                        np.stack([P_v, P_m], axis=1)
+                    )
+
+        self.max_error = max_error
+        self._inv_table = None
+        if max_error is not None:
+            self._inv_table = self._build_inv_table(max_error)
+
+    def _freeze(self):
+        if self._inv_table is not None:
+            for value in vars(self._inv_table).values():
+                if isinstance(value, np.ndarray):
+                    value.setflags(write=False)
+        super()._freeze()
+
+    def cache_name(self):
+        name = super().cache_name()
+        if self.max_error is not None:
+            name += f"_e{self.max_error:g}"
+        return name
+
     def project(self, X, face):
         """
         Project X onto face (k,e1)
@@ -63,28 +161,34 @@ class SnyderEAProj(Projection):
         v2 = self.base_poly.k[face]
 
         if np.all(X == v0):
-            X_P = X
-        else:
-            if (dist_to_V[1] - dist_to_V[2]) % 3 == 1:
-                # np.cross(v0.T, v1.T).dot(v2) >= 0:
+            K = None
+        elif (dist_to_V[1] - dist_to_V[2]) % 3 == 1:
+            # np.cross(v0.T, v1.T).dot(v2) >= 0:
+            with np.errstate(invalid="ignore", divide="ignore"):
                 K = self.find_EA_barycenter(X, v0, v1, v2)
-                subface = np.stack(
-                    [
-                        self.base_poly.VtoC * v0,
-                        phi * v1,
-                        self.base_poly.FtoC * v2
-                    ]
-                )
-
-            else:
+            subface = np.stack(
+                [
+                    self.base_poly.VtoC * v0,
+                    phi * v1,
+                    self.base_poly.FtoC * v2
+                ]
+            )
+        else:
+            with np.errstate(invalid="ignore", divide="ignore"):
                 K = self.find_EA_barycenter(X, v0, v2, v1)
-                subface = np.stack(
-                    [
-                        self.base_poly.VtoC * v0,
-                        self.base_poly.FtoC * v2,
-                        phi * v1
-                    ]
-                )
+            subface = np.stack(
+                [
+                    self.base_poly.VtoC * v0,
+                    self.base_poly.FtoC * v2,
+                    phi * v1
+                ]
+            )
+
+        # Points on the vertices of the icosahedron (up to rounding errors,
+        # which give no barycenter), as in `project_batch`
+        if K is None or not np.all(np.isfinite(K)):
+            X_P = self.base_poly.VtoC * v0
+        else:
             X_P = subface.T.dot(K)
 
         eB = self.base_poly.eB[face]
@@ -114,6 +218,9 @@ class SnyderEAProj(Projection):
         Project P from face to sphere
         """
 
+        if self._inv_table is not None:
+            return self._inv_project_approx(np.reshape(P, (1, 2)), [face])[0]
+
         abc = self.base_poly.abc[face]
         dist_to_V = np.argsort(-self.base_poly.Bis.T.dot(P))
         _, v1, v0 = abc[dist_to_V]
@@ -125,9 +232,6 @@ class SnyderEAProj(Projection):
 
         X_P = eB.T.dot(P) + self.base_poly.FtoC * k
 
-        if np.all(X_P == self.base_poly.VtoC * v0):
-            return X_P
-
         if (dist_to_V[1] - dist_to_V[2]) % 3 == 1:
             subface = np.stack(
                 [self.base_poly.VtoC * v0, phi * v1, self.base_poly.FtoC * v2]
@@ -146,7 +250,12 @@ class SnyderEAProj(Projection):
         c20 = v2.dot(v0)
         s = np.sqrt(1 - c12**2)
 
+        # Points on the vertices of the icosahedron (up to rounding errors),
+        # as in `inv_project_batch`
         h = 1 - K[0]
+        if h < 1e-12:
+            return v0
+
         A = (K[2] / h) * np.pi / 30
         S = np.sin(A)
         C = 1 - np.cos(A)
@@ -166,3 +275,357 @@ class SnyderEAProj(Projection):
             np.sin((1 - t) * ang_dist) * u / np.sin(ang_dist)
             + np.sin(t * ang_dist) * v / np.sin(ang_dist)
         )
+
+    def _subfaces_batch(self, dist_to_V, face):
+        """
+        Returns the vertices (v0, v1, v2) of the subtriangles used by the
+        projection, and their scale factors, from the ordering of the face
+        vertices
+        """
+        abc = self._abc[face]
+        rows = np.arange(len(face))
+
+        v0 = abc[rows, dist_to_V[:, 2]]
+        v1 = abc[rows, dist_to_V[:, 1]]
+        v1 = (v0 + v1) * self.base_poly.VtoC / (2 * phi)
+        v2 = self.base_poly.k[face]
+
+        # v1 and v2 are swapped to keep the orientation of the subtriangle
+        swap = ((dist_to_V[:, 1] - dist_to_V[:, 2]) % 3 != 1)[:, None]
+
+        w1 = np.where(swap, v2, v1)
+        w2 = np.where(swap, v1, v2)
+        s1 = np.where(swap, self.base_poly.FtoC, phi)
+        s2 = np.where(swap, phi, self.base_poly.FtoC)
+
+        return v0, w1, w2, s1, s2
+
+    def project_batch(self, X, face):
+        """
+        Vectorized version of `project`
+
+        ## Parameters
+
+        - X : np.array, shape = (N, 3)
+
+        - face : np.array, shape = (N,), dtype = int
+        """
+        if kernels.enabled():
+            return kernels.snyder_project(self, X, face)
+
+        abc = self._abc[face]
+        dist_to_V = np.argsort(np.einsum("nij,nj->ni", abc, X), axis=1)
+
+        v0, w1, w2, s1, s2 = self._subfaces_batch(dist_to_V, face)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            K = self.find_EA_barycenter_batch(X, v0, w1, w2)
+
+        X_P = (
+            K[:, :1] * self.base_poly.VtoC * v0
+            + K[:, 1:2] * s1 * w1
+            + K[:, 2:] * s2 * w2
+        )
+
+        # Points on the vertices of the icosahedron
+        on_vertex = ~np.all(np.isfinite(K), axis=1) | np.all(X == v0, axis=1)
+        X_P[on_vertex] = self.base_poly.VtoC * v0[on_vertex]
+
+        e1 = self.base_poly.e1[face]
+        e2 = self.base_poly.e2[face]
+
+        return np.stack([_dot(e1, X_P), _dot(e2, X_P)], axis=-1)
+
+    def find_EA_barycenter_batch(self, X, v0, v1, v2):
+        """
+        Vectorized version of `find_EA_barycenter`
+        """
+        d = self.V * X - _det(X, v1, v2)[:, None] * v0
+        d /= np.linalg.norm(d, axis=1)[:, None]
+        h = np.sqrt((1 - _dot(v0, X)) / (1 - _dot(v0, d)))
+        A = 2 * np.arctan(
+            _det(v0, v1, d)
+            / (1 + _dot(v0, v1) + _dot(v1, d) + _dot(v0, d))
+        )
+        A2 = np.pi / 30
+
+        K = np.empty((len(X), 3))
+        K[:, 2] = h * A / A2
+        K[:, 1] = h - K[:, 2]
+        K[:, 0] = 1 - h
+
+        return K
+
+    def inv_project_batch(self, P, face):
+        """
+        Vectorized version of `inv_project`
+
+        ## Parameters
+
+        - P : np.array, shape = (N, 2)
+
+        - face : np.array, shape = (N,), dtype = int
+        """
+        if self._inv_table is not None:
+            return self._inv_project_approx(P, face)
+        return self._inv_project_exact(P, face)
+
+    def _inv_project_exact(self, P, face):
+
+        if kernels.enabled():
+            return kernels.snyder_inv_project(self, P, face)
+
+        dist_to_V = np.argsort(-P.dot(self.base_poly.Bis), axis=1)
+
+        v0, w1, w2, s1, s2 = self._subfaces_batch(dist_to_V, face)
+
+        X_P = (
+            self.base_poly.e1[face] * P[:, :1]
+            + self.base_poly.e2[face] * P[:, 1:]
+            + self.base_poly.FtoC * self.base_poly.k[face]
+        )
+
+        subface = np.stack(
+            [self.base_poly.VtoC * v0, s1 * w1, s2 * w2], axis=-1
+        )
+        K = np.linalg.solve(subface, X_P[..., None])[..., 0]
+
+        c01 = _dot(v0, w1)
+        c12 = _dot(w1, w2)
+        c20 = _dot(w2, v0)
+        s = np.sqrt(1 - c12**2)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            h = 1 - K[:, 0]
+            A = (K[:, 2] / h) * np.pi / 30
+            S = np.sin(A)
+            C = 1 - np.cos(A)
+            f = S * self.V + C * (c01 * c12 - c20)
+            g = C * s * (1 + c01)
+            q = 2 * np.arctan2(g, f) / np.arccos(c12)
+            d = self.slerp_batch(w1, w2, q)
+            t = (
+                np.arccos(1 + h**2 * (_dot(v0, d) - 1))
+                / np.arccos(_dot(v0, d))
+            )
+            X = self.slerp_batch(v0, d, t)
+
+        # Points on the vertices of the icosahedron
+        on_vertex = h < 1e-12
+        X[on_vertex] = v0[on_vertex]
+
+        return X
+
+    def _subtriangle_batch(self, P):
+        """
+        Returns the subtriangles (i0, i1) of the face coordinates P, with the
+        barycentric coordinates (vertex, middle of edge, center) of P in them
+        """
+        dist = P.dot(self.base_poly.Bis)
+        i0 = np.argmin(dist, axis=1)
+        i2 = np.argmax(dist, axis=1)
+        # At the center of the face, all the subtriangles are equivalent
+        i2[i2 == i0] = (i0[i2 == i0] + 1) % 3
+        i1 = 3 - i0 - i2
+
+        K = np.empty((len(P), 3))
+        K[:, :2] = np.einsum("nij,nj->ni", self._subtriangle_inv[i0, i1], P)
+        K[:, 2] = 1 - K[:, 0] - K[:, 1]
+
+        return i0, i1, K
+
+    def _subtriangle_vertices(self, face, i0, i1):
+        """
+        Returns the unitary vectors of the vertex, middle of edge and center
+        of subtriangles (i0, i1) of faces
+        """
+        abc = self._abc[face]
+        rows = np.arange(len(face))
+
+        v0 = abc[rows, i0]
+        v1 = (v0 + abc[rows, i1]) * self.base_poly.VtoC / (2 * phi)
+
+        return v0, v1, self.base_poly.k[face]
+
+    def _inv_coefficients(self, h, r):
+        """
+        Exact inverse projection of the points (h, r) of subtriangle (0, 1) of
+        face 0, as coefficients over its (vertex, middle of edge, center)
+        unitary vectors
+
+        h = 1 - K[0] is the relative distance to the vertex, r = K[2] / h the
+        relative angle from the edge
+        """
+        P = (
+            (1 - h)[:, None] * self._P_vertex[0]
+            + ((1 - r) * h)[:, None]
+            * (self._P_vertex[0] + self._P_vertex[1]) / 2
+        )
+        face = np.zeros(len(P), dtype=int)
+        X = self._inv_project_exact(P, face)
+
+        B = self._subtriangle_basis()
+        coef = X.dot(np.linalg.inv(B).T)
+
+        # X is only needed up to a (positive) factor. The gnomonic projection
+        # would give coefficients (1 - h, (1 - r) * h, r * h): only the
+        # (small and smooth) difference is tabulated
+        coef = coef[:, 1:] / coef.sum(axis=1)[:, None]
+        return coef - np.stack([(1 - r) * h, r * h], axis=-1)
+
+    def _subtriangle_basis(self):
+        """
+        Returns the vertex, middle of edge and center of subtriangle (0, 1)
+        of face 0, as the columns of a matrix
+        """
+        v0, v1, v2 = self._subtriangle_vertices(np.zeros(1, dtype=int), [0], [1])
+        return np.stack(
+            [self.base_poly.VtoC * v0[0], phi * v1[0], self.base_poly.FtoC * v2[0]],
+            axis=-1,
+        )
+
+    def _build_inv_table(self, max_error):
+        """
+        Builds tables of the inverse projection, of increasing size, until
+        the error is below max_error (km)
+        """
+        size = 8
+        while size <= 4096:
+            nodes = np.linspace(0, 1, size + 1)
+            h, r = np.meshgrid(nodes, nodes, indexing="ij")
+            table = _CubicTable(
+                self._inv_coefficients(h.ravel(), r.ravel()).reshape(
+                    size + 1, size + 1, 2
+                )
+            )
+
+            # Interpolation errors are measured inside the cells of the table
+            check = (np.arange(size)[:, None] + [0.25, 0.5, 0.75]).ravel()
+            h, r = np.meshgrid(check / size, check / size, indexing="ij")
+            h, r = h.ravel(), r.ravel()
+
+            B = self._subtriangle_basis()
+            X = self._from_coefficients(table(h, r), h, r).dot(B.T)
+            X /= np.linalg.norm(X, axis=1)[:, None]
+            X_exact = self._from_coefficients(
+                self._inv_coefficients(h, r), h, r
+            ).dot(B.T)
+            X_exact /= np.linalg.norm(X_exact, axis=1)[:, None]
+
+            error = R * np.max(np.linalg.norm(X - X_exact, axis=1))
+            if error <= max_error:
+                self.table_error = error
+                return table
+
+            size *= 2
+
+        raise ValueError(f"max_error {max_error} km can't be reached")
+
+    def _inv_project_approx(self, P, face):
+        """
+        Approximate inverse projection, interpolated from `self._inv_table`
+        """
+        if kernels.enabled():
+            return kernels.snyder_inv_project_table(self, P, face)
+
+        P = np.asarray(P, dtype=float)
+        face = np.asarray(face)
+
+        i0, i1, K = self._subtriangle_batch(P)
+
+        h = 1 - K[:, 0]
+        r = K[:, 2] / np.where(h > 0, h, 1)
+        K[:, 1:] += self._inv_table(np.clip(h, 0, 1), np.clip(r, 0, 1))
+        K[:, 0] = 1 - K[:, 1] - K[:, 2]
+
+        v0, v1, v2 = self._subtriangle_vertices(face, i0, i1)
+        X = (
+            K[:, :1] * self.base_poly.VtoC * v0
+            + K[:, 1:2] * phi * v1
+            + K[:, 2:] * self.base_poly.FtoC * v2
+        )
+
+        return X / np.linalg.norm(X, axis=1)[:, None]
+
+    def _from_coefficients(self, coef, h, r):
+        coef = coef + np.stack([(1 - r) * h, r * h], axis=-1)
+        return np.concatenate([1 - coef.sum(axis=1)[:, None], coef], axis=1)
+
+    def slerp_batch(self, u, v, t):
+
+        ang_dist = np.arccos(_dot(u, v))[:, None]
+        t = t[:, None]
+        return (
+            np.sin((1 - t) * ang_dist) * u / np.sin(ang_dist)
+            + np.sin(t * ang_dist) * v / np.sin(ang_dist)
+        )
+
+
+def _dot(u, v):
+    """
+    Row-wise dot product of two arrays of vectors
+    """
+    return np.einsum("ij,ij->i", u, v)
+
+
+def _det(u, v, w):
+    """
+    Row-wise determinant of the matrices with rows u, v, w
+    """
+    return _dot(u, np.cross(v, w))
+
+
+class _CubicTable:
+    """
+    Values sampled on a regular grid over [0, 1] x [0, 1], interpolated with
+    piecewise bicubic (Lagrange) polynomials
+
+    The polynomial of each cell of the grid is precomputed, so that an
+    interpolation only reads one contiguous row of coefficients.
+    """
+
+    def __init__(self, values):
+        self.size = values.shape[0] - 1
+
+        # L[j] maps the values of the 4 nodes used by cell j to the monomial
+        # coefficients of the interpolating polynomial of x in [0, 1)
+        L = np.zeros((self.size, 4, 4))
+        self._start = np.clip(np.arange(self.size) - 1, 0, self.size - 3)
+        for j, start in enumerate(self._start):
+            nodes = np.arange(4) - (j - start)
+            L[j] = np.linalg.inv(np.vander(nodes, 4, increasing=True))
+
+        offsets = np.arange(4)
+        windows = values[
+            (self._start[:, None] + offsets)[:, None, :, None],
+            (self._start[:, None] + offsets)[None, :, None, :],
+        ]
+        coefficients = np.einsum(
+            "uai,uvij...,vbj->uv...ab", L, windows, L, optimize=True
+        )
+        self._coefficients = np.ascontiguousarray(
+            coefficients.reshape((self.size**2,) + coefficients.shape[2:])
+        )
+
+    def __call__(self, u, v):
+        j_u = np.minimum((u * self.size).astype(np.intp), self.size - 1)
+        j_v = np.minimum((v * self.size).astype(np.intp), self.size - 1)
+        x_u = (u * self.size - j_u)[:, None]
+        x_v = (v * self.size - j_v)[:, None, None]
+
+        c = self._coefficients[j_u * self.size + j_v]
+
+        # Horner scheme, along v and then along u
+        res = c[..., 3] * x_v
+        for i in [2, 1]:
+            res += c[..., i]
+            res *= x_v
+        res += c[..., 0]
+
+        val = res[..., 3] * x_u
+        for i in [2, 1]:
+            val += res[..., i]
+            val *= x_u
+        val += res[..., 0]
+
+        return val
@@ -0,0 +1,287 @@
+import os
+
+import numpy as np
+
+from hexasphere.batch import NEIGHBOR_OFFSETS
+from hexasphere.batch import canonicalize, cell_ordinals, face_positions
+from hexasphere.batch import pack_ids
+
+# Maximum number of cells of resolution n1 clipped at once: each one gives
+# about (n2 / n1 + 2) ** 2 candidate pieces of about 2 kB of intermediate
+# arrays
+CHUNK_SIZE = 1 << 12
+
+
+def remap(grid, n1: int, n2: int, cache_dir=None, chunk_size=CHUNK_SIZE):
+    """
+    Computes the overlaps between the cells of resolution n1 and the cells of
+    resolution n2, as sparse (COO) arrays over canonical cell ordinals (see
+    `batch.enumerate_cells`)
+
+    Overlaps are computed exactly in face coordinates, by clipping hexagons
+    against each other and against the face triangle, without sampling
+    points. As all the faces share the same layout of hexagons in face
+    coordinates, this is done once, for all the faces. With `SnyderEAProj`,
+    areas in face coordinates are proportional to areas on the sphere, and
+    the overlaps are exact. With `GnomonicProj`, they are approximate.
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - n1, n2 : int
+
+    - cache_dir : str, optional
+
+    If provided, the arrays are loaded from (or saved to) the file
+    `remap_n{n1}_n{n2}.npz` of this directory
+
+    - chunk_size : int, optional
+
+    Maximum number of cells of resolution n1 of a face clipped at once,
+    which bounds the memory used by intermediate arrays. The result itself
+    holds about 10 * (n1 + n2) ** 2 overlaps, of 24 bytes each
+
+    ## Returns
+
+    - rows : np.array, dtype = int64
+
+    Ordinals of the cells of resolution n2
+
+    - cols : np.array, dtype = int64
+
+    Ordinals of the cells of resolution n1
+
+    - fractions : np.array, dtype = float
+
+    Area of the overlap of cells rows and cols, as a fraction of the area of
+    an hexagon of resolution n1: the fractions of each hexagon of resolution
+    n1 sum to 1 (5 / 6 for the pentagons)
+    """
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"remap_n{n1}_n{n2}.npz")
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return cached["rows"], cached["cols"], cached["fractions"]
+
+    pos1, pos2, area = _face_overlaps(grid, n1, n2, chunk_size)
+
+    # Pieces are keyed by (row, col), face by face
+    size1 = 10 * (n1 + 1) ** 2 + 2
+    keys = np.empty(20 * len(area), dtype=np.int64)
+    for f in range(20):
+        face = np.full(len(area), f)
+        f1, p1 = canonicalize(face, pos1, n1)
+        f2, p2 = canonicalize(face, pos2, n2)
+        keys[f * len(area):(f + 1) * len(area)] = (
+            cell_ordinals(pack_ids(f2, p2), n2) * size1
+            + cell_ordinals(pack_ids(f1, p1), n1)
+        )
+
+    # The pieces of cells lying on several faces are summed
+    keys, inverse = np.unique(keys, return_inverse=True)
+    area = np.bincount(inverse.reshape(-1), weights=np.tile(area, 20))
+    rows, cols = keys // size1, keys % size1
+
+    # Area of an hexagon in face coordinates
+    fractions = area / (2 * np.sqrt(3) / (n1 + 1) ** 2)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, rows=rows, cols=cols, fractions=fractions)
+
+    return rows, cols, fractions
+
+
+def remap_matrix(grid, n1: int, n2: int, mean=True, cache_dir=None):
+    """
+    Returns the (n2 cells, n1 cells) `scipy.sparse.csr_matrix` resampling
+    fields indexed by canonical ordinals from resolution n1 to resolution
+    n2: `field2 = M @ field1`
+
+    ## Parameters
+
+    - grid : HexGrid
+
+    - n1, n2 : int
+
+    - mean : bool, optional
+
+    If True, fields are intensive (densities, averages): a cell of resolution
+    n2 gets the area-weighted mean of the cells it overlaps. Otherwise, fields
+    are extensive (counts, totals), and are split among the cells of
+    resolution n2 in proportion to the overlapping areas, so that totals are
+    preserved
+
+    - cache_dir : str, optional
+
+    See `remap`
+
+    Requires scipy
+    """
+    try:
+        from scipy.sparse import csr_matrix
+    except ImportError as e:
+        raise ImportError("remap_matrix requires scipy") from e
+
+    rows, cols, fractions = remap(grid, n1, n2, cache_dir=cache_dir)
+    size1 = 10 * (n1 + 1) ** 2 + 2
+    size2 = 10 * (n2 + 1) ** 2 + 2
+
+    if mean:
+        weights = fractions / np.bincount(rows, fractions, size2)[rows]
+    else:
+        weights = fractions / np.bincount(cols, fractions, size1)[cols]
+
+    return csr_matrix((weights, (rows, cols)), shape=(size2, size1))
+
+
+def _face_overlaps(grid, n1, n2, chunk_size):
+    """
+    Returns the overlapping pieces of the hexagons of resolutions n1 and n2
+    within the triangle of a face, as (pos1, pos2, area)
+    """
+    pos1 = face_positions(n1)
+    pieces = [
+        _chunk_overlaps(grid, pos1[start:start + chunk_size], n1, n2)
+        for start in range(0, len(pos1), chunk_size)
+    ]
+    return tuple(np.concatenate(arrays) for arrays in zip(*pieces))
+
+
+def _chunk_overlaps(grid, pos1, n1, n2):
+    """
+    Overlapping pieces (see `_face_overlaps`) of the hexagons pos1 of
+    resolution n1
+    """
+    N1, N2 = n1 + 1, n2 + 1
+
+    # Neighbor directions (unit vectors), and half the distance between
+    # neighbors: an hexagon is the set of points P such that
+    # |directions . (P - C)| <= 1 / N
+    directions = grid.Bis.dot(NEIGHBOR_OFFSETS[:3].T).T / np.sqrt(3)
+
+    C1 = _centers(grid, pos1, N1)
+
+    # Candidate hexagons of resolution n2, around each center C1, within the
+    # sum of the circumradii
+    radius = 2 / (np.sqrt(3) * N1) + 2 / (np.sqrt(3) * N2)
+    rings = int(np.ceil(radius * N2 / np.sqrt(3))) + 1
+    offsets = _ring_offsets(rings)
+
+    nearest = _nearest_pos(grid, C1, N2)
+    pos2 = nearest[:, None, :] + offsets[None, :, :]
+    i1 = np.repeat(np.arange(len(pos1)), len(offsets))
+    pos2 = pos2.reshape(-1, 3)
+
+    inside = np.all((pos2 >= 0) & (pos2 <= N2), axis=1)
+    i1, pos2 = i1[inside], pos2[inside]
+    C2 = _centers(grid, pos2, N2)
+
+    close = np.linalg.norm(C2 - C1[i1], axis=1) < radius
+    i1, pos2, C2 = i1[close], pos2[close], C2[close]
+
+    # Half-planes n . P <= d: the face triangle, then both hexagons
+    normals, limits = [], []
+    for k in range(3):
+        normals.append(np.broadcast_to(grid.Bis[:, k], (len(i1), 2)))
+        limits.append(np.full(len(i1), 1 / np.sqrt(3)))
+    for C, N in [(C1[i1], N1), (C2, N2)]:
+        for d in directions:
+            for s in [1, -1]:
+                normals.append(np.broadcast_to(s * d, (len(i1), 2)))
+                limits.append(s * C.dot(d) + 1 / N)
+
+    area = _clipped_area(normals, limits)
+
+    # Hexagons touching along an edge give slivers of rounding errors
+    keep = area > 1e-12 / max(N1, N2) ** 2
+    return pos1[i1[keep]], pos2[keep], area[keep]
+
+
+def _centers(grid, pos, N):
+    return 2 * np.sqrt(3) * pos.dot(grid.Bis.T) / (3 * N)
+
+
+def _nearest_pos(grid, P, N):
+    """
+    Returns the pos of resolution N - 1 nearest to face coordinates P (up to
+    one cell)
+    """
+    frac = 3 * N * P.dot(grid.Bis) / (2 * np.sqrt(3) * 1.5) + 2 * N / 3
+    pos = np.round(frac).astype(np.int64)
+    pos[:, 2] = 2 * N - pos[:, 0] - pos[:, 1]
+    return pos
+
+
+def _ring_offsets(rings):
+    """
+    Returns the (a, b, c) offsets of all the cells within the given number of
+    rings around a cell
+    """
+    i, j = np.meshgrid(
+        np.arange(-rings, rings + 1), np.arange(-rings, rings + 1),
+        indexing="ij"
+    )
+    k = -i - j
+    keep = np.abs(k) <= rings
+    return np.stack([i[keep], j[keep], k[keep]], axis=-1)
+
+
+def _clipped_area(normals, limits):
+    """
+    Returns the areas of the convex polygons given as intersections of
+    half-planes normals[i] . P <= limits[i], the first 3 half-planes
+    bounding a triangle (Sutherland-Hodgman clipping, vectorized over
+    polygons)
+    """
+    size = len(limits[0])
+
+    # Initial triangle: intersections of consecutive half-planes
+    V = np.zeros((size, 3, 2))
+    for k in range(3):
+        A = np.stack([normals[k], normals[(k + 1) % 3]], axis=1)
+        b = np.stack([limits[k], limits[(k + 1) % 3]], axis=1)
+        V[:, k] = np.linalg.solve(A, b[..., None])[..., 0]
+    count = np.full(size, 3)
+
+    rows = np.arange(size)[:, None]
+    for normal, limit in zip(normals[3:], limits[3:]):
+        m = V.shape[1]
+        valid = np.arange(m)[None, :] < count[:, None]
+
+        # Next vertex of each vertex, cycling over the count of each polygon
+        nxt = np.arange(1, m + 1)[None, :] % np.maximum(count, 1)[:, None]
+        W = V[rows, nxt]
+
+        dist_V = np.einsum("nmi,ni->nm", V, normal) - limit[:, None]
+        dist_W = np.einsum("nmi,ni->nm", W, normal) - limit[:, None]
+
+        in_V = dist_V <= 0
+        cross = valid & ((dist_V <= 0) != (dist_W <= 0))
+
+        # Unused slots and edges parallel to the line give nan, and are
+        # never kept
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = dist_V / (dist_V - dist_W)
+            X = V + t[..., None] * (W - V)
+
+        # Each edge gives up to 2 vertices: its start (if inside) and its
+        # intersection with the line (if crossing)
+        points = np.stack([V, X], axis=2).reshape(size, 2 * m, 2)
+        keep = np.stack([valid & in_V, cross], axis=2).reshape(size, 2 * m)
+
+        order = np.argsort(~keep, axis=1, kind="stable")
+        count = keep.sum(axis=1)
+        width = max(int(count.max()), 1)
+        V = np.take_along_axis(points, order[:, :width, None], axis=1)
+
+    # Shoelace formula
+    m = V.shape[1]
+    valid = np.arange(m)[None, :] < count[:, None]
+    nxt = np.arange(1, m + 1)[None, :] % np.maximum(count, 1)[:, None]
+    W = V[rows, nxt]
+    with np.errstate(invalid="ignore"):
+        cross = V[..., 0] * W[..., 1] - V[..., 1] * W[..., 0]
+
+    return 0.5 * np.abs(np.sum(np.where(valid, cross, 0), axis=1))
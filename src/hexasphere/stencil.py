@@ -0,0 +1,302 @@
+import numpy as np
+
+from hexasphere.geometry import R
+from hexasphere.batch import NEIGHBOR_OFFSETS
+from hexasphere.batch import enumerate_cells, ids_to_X, unpack_ids
+from hexasphere.batch import canonicalize, pack_ids, rectify_coordinates
+
+
+class Stencil:
+    """
+    Neighbor stencil operations over fields defined on all the cells of a
+    grid of resolution n
+
+    A field is an array whose first axis runs over the canonical cell ordinals
+    (see `batch.enumerate_cells`). Internally, each face is stored as a
+    square array indexed by (a, b), padded with a one cell wide halo:
+
+    - cells inside faces are processed with shifted-array arithmetic
+    - cells out of a face (the halo) are filled from their owner cell, with a
+    gather table precomputed through `rectify_coordinates` and
+    `neighboring_face`
+    - the 12 pentagons are then corrected with their 5-neighbor stencil
+
+    ### Attributes
+
+    - self.cells : packed ids of all cells, sorted by canonical ordinal
+    - self.degree : number of neighbors of each cell (6, or 5 for pentagons)
+    - self.pentagons : canonical ordinals of the 12 pentagons
+    - self.pentagon_neighbors : canonical ordinals of their neighbors
+    """
+
+    def __init__(self, grid, n: int):
+
+        self.grid = grid
+        self.n = n
+        N = n + 1
+
+        self.cells = enumerate_cells(n)
+        self.size = len(self.cells)
+
+        # Padded face arrays span a, b in [-1, N + 1]
+        self._width = N + 3
+        A, B = np.meshgrid(
+            np.arange(-1, N + 2), np.arange(-1, N + 2), indexing="ij"
+        )
+        C = 2 * N - A - B
+        inside = (
+            (A >= 0) & (B >= 0) & (C >= 0) & (A <= N) & (B <= N) & (C <= N)
+        )
+
+        needed = inside.copy()
+        ia, ib = np.nonzero(inside)
+        for da, db, _ in NEIGHBOR_OFFSETS:
+            needed[ia + da, ib + db] = True
+
+        # Halo exchange table: ordinal of the cell found at each padded pos
+        ka, kb = np.nonzero(needed)
+        pos = np.stack([A[ka, kb], B[ka, kb], C[ka, kb]], axis=-1)
+        face = np.repeat(np.arange(20), len(pos))
+        pos = np.tile(pos, (20, 1))
+
+        face, pos = rectify_coordinates(grid, face, pos, n)
+        face, pos = canonicalize(face, pos, n)
+        ordinals = np.searchsorted(self.cells, pack_ids(face, pos))
+
+        self._gather = np.zeros((20, self._width, self._width), dtype=np.intp)
+        self._gather[:, ka, kb] = ordinals.reshape(20, -1)
+
+        # Position of each cell in the (unpadded) face arrays
+        face, pos = unpack_ids(self.cells)
+        self._owner = (face, pos[:, 0], pos[:, 1])
+
+        # Pentagons: the 6 slots of their stencil only hold 5 distinct cells
+        self.pentagons = np.nonzero(np.any(pos == 0, axis=1))[0]
+        self.pentagon_neighbors = np.zeros((12, 5), dtype=np.intp)
+        for i, o in enumerate(self.pentagons):
+            self.pentagon_neighbors[i] = self._neighbors_of(o)[:5]
+
+        self.degree = np.full(self.size, 6)
+        self.degree[self.pentagons] = 5
+
+        self._metric_operators = None
+
+    def default_spacing(self):
+        """
+        Returns the average distance (in km) between neighboring hex centers
+        """
+        return 2 * self.grid.compute_height_for_n(self.n)
+
+    def halo_exchange(self, field):
+        """
+        Returns the padded face arrays of field, shape = (20, n + 4, n + 4, ...)
+        """
+        return np.asarray(field)[self._gather]
+
+    def _shifted(self, U, da, db):
+        w = self._width
+        return U[:, 1 + da: w - 1 + da, 1 + db: w - 1 + db]
+
+    def _to_cells(self, face_values):
+        return face_values[self._owner]
+
+    def neighbor_sum(self, field):
+        """
+        Returns, for each cell, the sum of field over its neighbors
+        """
+        field = np.asarray(field)
+        U = self.halo_exchange(field)
+
+        S = sum(self._shifted(U, da, db) for da, db, _ in NEIGHBOR_OFFSETS)
+        res = self._to_cells(S)
+
+        res[self.pentagons] = field[self.pentagon_neighbors].sum(axis=1)
+
+        return res
+
+    def neighbor_table(self):
+        """
+        Returns the canonical ordinals of the neighbors of all cells,
+        shape = (self.size, 6). The sixth neighbor of pentagons is -1
+        """
+        face, a, b = self._owner
+        table = np.stack(
+            [
+                self._gather[face, a + 1 + da, b + 1 + db]
+                for da, db, _ in NEIGHBOR_OFFSETS
+            ],
+            axis=1,
+        )
+        table[self.pentagons, :5] = self.pentagon_neighbors
+        table[self.pentagons, 5] = -1
+
+        return table
+
+    def _degree(self, field):
+        return self.degree.reshape((-1,) + (1,) * (np.ndim(field) - 1))
+
+    def neighbor_mean(self, field):
+        """
+        Returns, for each cell, the average of field over its neighbors
+        """
+        return self.neighbor_sum(field) / self._degree(field)
+
+    def laplacian(self, field, spacing=None):
+        """
+        Returns the discrete Laplace-Beltrami operator of field
+
+        Each cell is fitted a quadratic over its neighbors, in geodesic
+        coordinates of the plane tangent to the sphere at its center (see
+        `_operators`). The Laplacian is exact for quadratic fields of these
+        coordinates, and its error decreases with n, pentagons and the seams
+        of faces included.
+
+        ## Parameters
+
+        - field : np.array, shape = (self.size, ...)
+
+        - spacing : float, optional
+
+        Average distance between neighboring hex centers, in the unit of
+        length of the result. Defaults to `self.default_spacing()`, which
+        gives a Laplacian in km^-2
+        """
+        _, weights = self._operators()
+        D = self._differences(field)
+        res = np.einsum("nk,nk...->n...", weights, D)
+
+        if spacing is not None:
+            res *= (self.default_spacing() / spacing) ** 2
+
+        return res
+
+    def diffuse(self, field, rate, steps=1):
+        """
+        Applies steps of explicit diffusion to field:
+        u <- u + rate * sum(u_neighbor - u)
+
+        The sum of field over the grid is preserved. The scheme is stable for
+        rate <= 1 / 6
+        """
+        field = np.asarray(field, dtype=float)
+        degree = self._degree(field)
+
+        for _ in range(steps):
+            field = field + rate * (self.neighbor_sum(field) - degree * field)
+
+        return field
+
+    def smooth(self, field, weight=0.5, steps=1):
+        """
+        Replaces each value of field by a weighted average of itself
+        (1 - weight) and of the mean of its neighbors (weight)
+        """
+        field = np.asarray(field, dtype=float)
+
+        for _ in range(steps):
+            field = (1 - weight) * field + weight * self.neighbor_mean(field)
+
+        return field
+
+    def gradient(self, field, spacing=None):
+        """
+        Returns the gradient of field, as 3D vectors in orthogonal coordinates
+        tangent to the sphere, shape = (self.size, ..., 3)
+
+        The gradient is the linear term of the quadratic fitted to each cell
+        (see `laplacian`): it is exact for quadratic fields of the geodesic
+        coordinates, and its error decreases with n.
+
+        ## Parameters
+
+        - field : np.array, shape = (self.size, ...)
+
+        - spacing : float, optional
+
+        Average distance between neighboring hex centers, in the unit of
+        length of the result. Defaults to `self.default_spacing()`, which
+        gives a gradient per km
+        """
+        weights, _ = self._operators()
+        D = self._differences(field)
+        res = np.einsum("nkj,nk...->n...j", weights, D)
+
+        if spacing is not None:
+            res *= self.default_spacing() / spacing
+
+        return res
+
+    def _differences(self, field):
+        """
+        Returns the differences of field between the neighbors of each cell
+        and the cell, shape = (self.size, 6, ...). The sixth difference of
+        pentagons is 0
+        """
+        field = np.asarray(field, dtype=float)
+        table = self.neighbor_table()
+        table[self.pentagons, 5] = self.pentagons
+        return field[table] - field[:, None]
+
+    def _operators(self):
+        """
+        Returns the weights of the differences of `_differences` giving the
+        gradient, shape = (self.size, 6, 3), and the Laplacian, shape =
+        (self.size, 6), per km
+
+        Neighbors are placed with the logarithmic map of the sphere at the
+        center of each cell: their tangent displacements have the length of
+        the great circle arcs between centers, so that the planar derivatives
+        of the fit are the ones on the sphere, at the center. The quadratic
+        f(x, y) - f(0) = g.(x, y) + (H_xx x^2 + 2 H_xy xy + H_yy y^2) / 2 is
+        fitted by least squares over the 6 neighbors (exactly over the 5 of
+        pentagons).
+        """
+        if self._metric_operators is None:
+            table = self.neighbor_table()
+            missing = table < 0
+            table[missing] = np.nonzero(missing)[0]
+
+            # Actual centers of the cells, with the projection of the grid
+            X = ids_to_X(self.grid, self.cells)
+            Y = X[table]
+
+            # Orthonormal bases of the tangent planes
+            axis = np.eye(3)[np.argmin(np.abs(X), axis=1)]
+            E1 = np.cross(X, axis)
+            E1 /= np.linalg.norm(E1, axis=1)[:, None]
+            E2 = np.cross(X, E1)
+
+            # Logarithmic map, in units of the default spacing
+            cos = np.einsum("nkj,nj->nk", Y, X)
+            T = Y - cos[..., None] * X[:, None]
+            sin = np.linalg.norm(T, axis=2)
+            scale = np.arctan2(sin, cos) * R / self.default_spacing()
+            T *= (scale / np.where(sin > 0, sin, 1))[..., None]
+
+            x = np.einsum("nkj,nj->nk", T, E1)
+            y = np.einsum("nkj,nj->nk", T, E2)
+            A = np.stack([x, y, x * x / 2, x * y, y * y / 2], axis=-1)
+            A[missing] = 0
+
+            P = np.linalg.pinv(A) / self.default_spacing()
+            gradient = (
+                P[:, 0, :, None] * E1[:, None] + P[:, 1, :, None] * E2[:, None]
+            )
+            laplacian = (P[:, 2] + P[:, 4]) / self.default_spacing()
+
+            self._metric_operators = (gradient, laplacian)
+
+        return self._metric_operators
+
+    def _neighbors_of(self, o):
+        """
+        Returns the 6 neighbor slots of cell o (pentagons are given their own
+        ordinal as sixth neighbor)
+        """
+        face, (a, b, _) = self._owner[0][o], unpack_ids(self.cells[o])[1]
+        slots = self._gather[
+            face, a + 1 + NEIGHBOR_OFFSETS[:, 0], b + 1 + NEIGHBOR_OFFSETS[:, 1]
+        ]
+        if o in self.pentagons:
+            slots = np.append(np.unique(slots[slots != o]), o)
+        return slots
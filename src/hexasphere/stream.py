@@ -0,0 +1,394 @@
+import io
+
+import numpy as np
+
+from hexasphere.batch import latlon_to_ids
+
+
+class WindowAggregator:
+    """
+    Aggregates timestamped values by hexagon (count, sum and mean) over
+    tumbling or sliding time windows
+
+    Events are encoded with the batch encoder and accumulated in panes of
+    `slide` time units, keyed by packed ids: a window is the union of
+    window / slide consecutive panes, so that each event is added to a single
+    pane, whatever the number of windows it belongs to. Emitted windows are
+    computed incrementally from the previous one, merging the panes that enter
+    it and subtracting the ones that leave it. Windows are emitted once the
+    watermark (latest timestamp seen, minus the allowed lateness) has passed
+    their end, and panes are evicted as soon as no pending window contains
+    them. The state is thus bounded by (window + lateness) / slide + 1 panes,
+    of at most one entry per hexagon.
+
+    ### Attributes
+
+    - self.watermark : latest timestamp seen (None before the first event)
+    - self.late : number of events dropped, their windows being already
+    emitted
+    """
+
+    def __init__(self, grid, n: int, window, slide=None, lateness=0):
+        """
+        ## Parameters
+
+        - grid : HexGrid
+
+        - n : int
+
+        - window : float
+
+        Duration of the windows, in the unit of the timestamps
+
+        - slide : float, optional
+
+        Interval between the starts of two windows, which must divide window.
+        Windows are tumbling (slide = window) if not provided
+
+        - lateness : float, optional
+
+        Delay after their end before windows are emitted: events older than
+        the watermark by less than lateness are still aggregated
+        """
+        slide = window if slide is None else slide
+        if slide <= 0:
+            raise ValueError("slide must be positive and divide window")
+        k = window / slide
+        if k < 1 or not np.isclose(k, round(k)):
+            raise ValueError("slide must be positive and divide window")
+
+        self.grid = grid
+        self.n = n
+        self.window = window
+        self.slide = slide
+        self.lateness = lateness
+
+        # Number of panes of a window
+        self._k = int(round(k))
+
+        # Pane index -> (sorted ids, counts, sums)
+        self._panes = {}
+
+        # Pane index of the end of the last emitted window
+        self._emitted = None
+
+        # Aggregates of the panes [start, end): (start, end, ids, counts, sums)
+        self._running = None
+
+        self.watermark = None
+        self.late = 0
+
+    def update(self, t, lat, lon, values=None):
+        """
+        Adds a micro-batch of events
+
+        ## Parameters
+
+        - t : np.array, dtype = float
+
+        Timestamps, e.g. seconds since the epoch. Batches need not be sorted,
+        nor in order
+
+        - lat, lon : np.array, dtype = float
+
+        In degrees
+
+        - values : np.array, dtype = float, optional
+
+        Values to sum and average. Only events are counted if not provided
+
+        ## Returns
+
+        - windows : list of dict
+
+        Windows completed by the batch (see `flush`)
+        """
+        t = np.asarray(t, dtype=np.float64).reshape(-1)
+        ids = latlon_to_ids(self.grid, lat, lon, self.n)
+        values = (
+            np.zeros(len(t))
+            if values is None
+            else np.asarray(values, dtype=np.float64).reshape(-1)
+        )
+        if not len(t) == len(ids) == len(values):
+            raise ValueError("Arrays of different lengths")
+        if not len(t):
+            return []
+
+        pane = np.floor(t / self.slide).astype(np.int64)
+        if self._emitted is not None:
+            on_time = pane > self._emitted - self._k
+            self.late += int(np.sum(~on_time))
+            pane, ids, values = pane[on_time], ids[on_time], values[on_time]
+
+        watermark = float(t.max())
+        if self.watermark is None or watermark > self.watermark:
+            self.watermark = watermark
+
+        self._add(pane, ids, values)
+
+        limit = int(np.floor((self.watermark - self.lateness) / self.slide))
+        return self._emit(limit)
+
+    def flush(self):
+        """
+        Emits all the pending windows, and clears the state
+
+        ## Returns
+
+        - windows : list of dict
+
+        For each window with events, in order of end: its "start" and "end"
+        times, and the packed "ids" of its hexagons, sorted, with their
+        "count", "sum" and "mean"
+        """
+        if not self._panes:
+            return []
+        return self._emit(max(self._panes) + self._k)
+
+    def current(self):
+        """
+        Returns the aggregates (see `flush`) of the window ending with the
+        pane of the watermark, which may not be complete yet
+        """
+        end = 0 if self.watermark is None else self._pane(self.watermark) + 1
+        return self._window(end)
+
+    def __len__(self):
+        """
+        Number of (pane, hexagon) entries of the state
+        """
+        return sum(len(ids) for ids, _, _ in self._panes.values())
+
+    def _pane(self, t):
+        return int(np.floor(t / self.slide))
+
+    def _add(self, pane, ids, values):
+        if not len(pane):
+            return
+
+        # Events are reduced by (pane, id) before being merged with the panes
+        order = np.lexsort((ids, pane))
+        pane, ids, values = pane[order], ids[order], values[order]
+
+        starts = np.flatnonzero(
+            np.r_[True, (pane[1:] != pane[:-1]) | (ids[1:] != ids[:-1])]
+        )
+        counts = np.diff(np.r_[starts, len(ids)])
+        sums = np.add.reduceat(values, starts)
+        pane, ids = pane[starts], ids[starts]
+
+        bounds = np.flatnonzero(np.r_[True, pane[1:] != pane[:-1], True])
+        for i, j in zip(bounds[:-1], bounds[1:]):
+            p = int(pane[i])
+            parts = [(ids[i:j], counts[i:j], sums[i:j])]
+            if p in self._panes:
+                parts.append(self._panes[p])
+            self._panes[p] = _combine(parts)
+
+            # Late events of panes of the running aggregates
+            if self._running is not None:
+                start, end, *columns = self._running
+                if start <= p < end:
+                    columns = _combine([tuple(columns), parts[0]])
+                    self._running = (start, end, *columns)
+
+    def _window(self, end):
+        parts = [
+            self._panes[p]
+            for p in sorted(self._panes)
+            if end - self._k <= p < end
+        ]
+        return self._result(end, *_combine(parts))
+
+    def _result(self, end, ids, counts, sums):
+        return {
+            "start": (end - self._k) * self.slide,
+            "end": end * self.slide,
+            "ids": ids,
+            "count": counts,
+            "sum": sums,
+            "mean": sums / counts,
+        }
+
+    def _emit(self, limit):
+        """
+        Emits the windows with events ending at pane indices up to limit, and
+        evicts the panes that no pending window contains
+        """
+        windows = []
+        for end in self._ends(limit):
+            self._shift(end - self._k, end)
+            windows.append(self._result(end, *self._running[2:]))
+
+        if self._emitted is None or limit > self._emitted:
+            self._emitted = limit
+
+            # Evicted panes are subtracted from the running aggregates first
+            if self._running is not None:
+                start = limit - self._k + 1
+                self._shift(start, max(start, self._running[1]))
+            for p in [p for p in self._panes if p <= limit - self._k]:
+                del self._panes[p]
+
+        return windows
+
+    def _ends(self, limit):
+        """
+        Pane indices of the ends of the windows with events, not emitted yet,
+        up to limit, in order
+        """
+        first = -np.inf if self._emitted is None else self._emitted + 1
+
+        # Each pane p is in the windows ending at p + 1, ..., p + k: these
+        # ranges are merged, in order of pane
+        ranges = []
+        for p in sorted(self._panes):
+            lo, hi = int(max(p + 1, first)), min(p + self._k, limit)
+            if lo > hi:
+                continue
+            if ranges and lo <= ranges[-1][1] + 1:
+                ranges[-1][1] = max(ranges[-1][1], hi)
+            else:
+                ranges.append([lo, hi])
+
+        return [end for lo, hi in ranges for end in range(lo, hi + 1)]
+
+    def _shift(self, start, end):
+        """
+        Moves the running aggregates to the panes [start, end), subtracting
+        the panes before start and merging the ones from their end. Both
+        bounds only increase
+        """
+        if self._running is None or start >= self._running[1]:
+            self._running = (start, start, *_combine([]))
+
+        old_start, old_end, *columns = self._running
+        removed = [
+            self._panes[p]
+            for p in range(old_start, start)
+            if p in self._panes
+        ]
+        added = [self._panes[p] for p in range(old_end, end) if p in self._panes]
+
+        if removed or added:
+            ids, counts, sums = _combine(
+                [tuple(columns)]
+                + added
+                + [(ids, -counts, -sums) for ids, counts, sums in removed]
+            )
+
+            # Hexagons whose events all left the window are dropped
+            kept = counts != 0
+            columns = ids[kept], counts[kept], sums[kept]
+
+        self._running = (start, end, *columns)
+
+    def to_bytes(self):
+        """
+        Serializes the parameters and the state, as a compressed npz file
+        """
+        panes = sorted(self._panes)
+        columns = [self._panes[p] for p in panes]
+        buffer = io.BytesIO()
+
+        # The running aggregates are saved too, their sums being the result of
+        # additions and subtractions in the order of the panes
+        running = self._running
+        if running is None:
+            running = (np.nan, np.nan, *_combine([]))
+
+        np.savez_compressed(
+            buffer,
+            params=np.array(
+                [self.n, self.window, self.slide, self.lateness],
+                dtype=np.float64,
+            ),
+            state=np.array(
+                [
+                    np.nan if self.watermark is None else self.watermark,
+                    np.nan if self._emitted is None else self._emitted,
+                    self.late,
+                    running[0],
+                    running[1],
+                ],
+                dtype=np.float64,
+            ),
+            pane=np.repeat(
+                np.array(panes, dtype=np.int64),
+                [len(ids) for ids, _, _ in columns],
+            ),
+            ids=_concatenate([c[0] for c in columns], np.int64),
+            counts=_concatenate([c[1] for c in columns], np.int64),
+            sums=_concatenate([c[2] for c in columns], np.float64),
+            running_ids=running[2],
+            running_counts=running[3],
+            running_sums=running[4],
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, grid, data):
+        with np.load(io.BytesIO(data)) as saved:
+            n, window, slide, lateness = saved["params"].tolist()
+            watermark, emitted, late, start, end = saved["state"].tolist()
+
+            aggregator = cls(grid, int(n), window, slide, lateness)
+            aggregator.watermark = None if np.isnan(watermark) else watermark
+            aggregator._emitted = None if np.isnan(emitted) else int(emitted)
+            aggregator.late = int(late)
+            if not np.isnan(start):
+                aggregator._running = (
+                    int(start),
+                    int(end),
+                    saved["running_ids"],
+                    saved["running_counts"],
+                    saved["running_sums"],
+                )
+
+            pane, ids = saved["pane"], saved["ids"]
+            counts, sums = saved["counts"], saved["sums"]
+
+        if len(pane):
+            bounds = np.flatnonzero(np.r_[True, pane[1:] != pane[:-1], True])
+            for i, j in zip(bounds[:-1], bounds[1:]):
+                aggregator._panes[int(pane[i])] = (
+                    ids[i:j],
+                    counts[i:j],
+                    sums[i:j],
+                )
+
+        return aggregator
+
+
+def _concatenate(arrays, dtype):
+    return np.concatenate([np.empty(0, dtype=dtype)] + arrays).astype(dtype)
+
+
+def _combine(parts):
+    """
+    Sums (ids, counts, sums) columns by id
+    """
+    if len(parts) == 1:
+        return parts[0]
+    if not parts:
+        return (
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+        )
+
+    ids = _concatenate([p[0] for p in parts], np.int64)
+    ids, inverse = np.unique(ids, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(
+        inverse,
+        weights=_concatenate([p[1] for p in parts], np.int64),
+        minlength=len(ids),
+    ).astype(np.int64)
+    sums = np.bincount(
+        inverse,
+        weights=_concatenate([p[2] for p in parts], np.float64),
+        minlength=len(ids),
+    )
+    return ids, counts, sums
@@ -0,0 +1,194 @@
+import numpy as np
+
+from hexasphere.batch import NEIGHBOR_OFFSETS
+from hexasphere.geometry import R, latlon_to_X
+from hexasphere.hexgrid import Location
+
+
+# Upper bound of the distance between the edges of hexagons and the great
+# circles through their vertices, relative to `HexGrid.compute_height_for_n`
+# (below 0.05 with SnyderEAProj, 0 with GnomonicProj)
+EDGE_MARGIN = 0.1
+
+
+class HexTracker:
+    """
+    Tracks the hexagons of moving entities on a grid of resolution n
+
+    The last hexagon of each entity is cached, along with its center and
+    bounds in the coordinate system of the face the entity was projected on.
+    A new position is first tested against the great circles through the
+    vertices of the cached hexagon, with a few dot products: points well
+    inside (or well outside) them are decided without projecting. Points
+    close to the edges, which may not be great circles (see EDGE_MARGIN),
+    are projected on the cached face and tested against the bounds of the
+    hexagon. The full `Location.find_hex` path is only run on a miss.
+
+    ### Attributes
+
+    - self.hits : number of updates answered from the cache
+    - self.misses : number of updates that required the full path
+    """
+
+    def __init__(self, grid, n: int, hysteresis=0, out_str=False):
+        """
+        ## Parameters
+
+        - grid : HexGrid
+
+        The grid must not be overlapping
+
+        - n : int
+
+        - hysteresis : float, optional
+
+        Distance (in km) an entity must go beyond the edge of its current
+        hexagon to be moved to another one. Reduces flapping between hexagons
+        of entities moving along an edge. The distance is converted to face
+        coordinates using the average hex height, so it is approximate.
+
+        - out_str : bool, optional
+
+        If True, string identifiers are returned instead of Hexagon objects
+        """
+        self.grid = grid
+        self.n = n
+        self.out_str = out_str
+
+        # Half the distance between two neighboring hex centers, in face
+        # coordinates
+        self._half_spacing = 1 / (n + 1)
+        self._margin = (
+            hysteresis * self._half_spacing / grid.compute_height_for_n(n)
+        )
+
+        # Unit directions of three neighbors, in face coordinates. The edges
+        # of an hexagon are orthogonal to these directions.
+        self._directions = (
+            grid.Bis.dot(NEIGHBOR_OFFSETS[:3].T).T / np.sqrt(3)
+        )
+
+        # Offsets of the vertices from the center, in face coordinates: each
+        # vertex is between two consecutive neighbor directions
+        U = grid.Bis.dot(NEIGHBOR_OFFSETS.T).T / np.sqrt(3)
+        self._vertex_offsets = (U + np.roll(U, -1, axis=0)) * 2 / (3 * (n + 1))
+
+        # Thresholds of the plane test, in radians: edges are within
+        # _edge_margin of the planes, and hysteresis (converted to face
+        # coordinates with the average height) is at most doubled locally
+        height = grid.compute_height_for_n(n) / R
+        self._edge_margin = EDGE_MARGIN * height
+        self._outer_margin = self._edge_margin + 2 * hysteresis / R
+
+        self._cache = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, entity, lat, lon):
+        """
+        Returns the hexagon the entity belongs to, at its new position
+        (lat, lon), in degrees
+        """
+        if self.grid.margin > 0:
+            raise ValueError("HexTracker doesn't support overlapping grids")
+
+        X = latlon_to_X(lat, lon)
+
+        cached = self._cache.get(entity)
+        if cached is not None and self._contains(X, *cached[1:]):
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+
+        location = Location(self.grid)
+        location.retrieve_by_projection(X=X)
+        hexagon = location.find_hex(self.n, out_str=self.out_str)[0]
+
+        # Bounds are expressed in the face the point was projected on, that
+        # may differ from the standard face of the hexagon
+        x, y, z = self.grid.Tr.T.dot(location.P) + 1
+        face, pos = location.find_pos_from_P_TrB(
+            location.face, (x, y, z), self.n
+        )
+        if face == location.face:
+            C = (
+                2 * np.sqrt(3) * self.grid.Bis.dot(np.array(pos))
+                / (3 * (self.n + 1))
+            )
+            self._cache[entity] = (hexagon, face, C, self._planes(face, C))
+        else:
+            self._cache.pop(entity, None)
+
+        return hexagon
+
+    def _planes(self, face, C):
+        """
+        Returns the inward unit normals of the great circles through the
+        consecutive vertices of the hexagon of center C in face, shape =
+        (6, 3), or None if some of its vertices are out of the face
+        """
+        V = C + self._vertex_offsets
+        if np.any(V.dot(self.grid.Bis) > 1 / np.sqrt(3)):
+            return None
+
+        A = self.grid.projection.inv_project_batch(V, np.full(6, face))
+        B = A[[1, 2, 3, 4, 5, 0]]
+
+        # Cross products, written out: np.cross is slow on small arrays
+        normals = (
+            A[:, [1, 2, 0]] * B[:, [2, 0, 1]]
+            - A[:, [2, 0, 1]] * B[:, [1, 2, 0]]
+        )
+        return normals / np.linalg.norm(normals, axis=1)[:, None]
+
+    def _contains(self, X, face, C, planes):
+        """
+        Checks whether X falls into the hexagon of center C in face
+        """
+        if planes is not None:
+            inside = planes.dot(X).min()
+            if inside >= self._edge_margin:
+                return True
+            if inside < -self._outer_margin:
+                return False
+
+        if self.grid.k[face].dot(X) <= 0:
+            return False
+
+        P = self.grid.projection.project(X, face)
+
+        # The point must be projected on the face triangle, whose edges are
+        # at a distance 1 / sqrt(3) of its center along the bisectors
+        if np.any(self.grid.Bis.T.dot(P) > 1 / np.sqrt(3) + self._margin):
+            return False
+
+        d = np.abs(self._directions.dot(P - C))
+        return bool(np.all(d <= self._half_spacing + self._margin))
+
+    def forget(self, entity):
+        """
+        Removes an entity from the cache
+        """
+        self._cache.pop(entity, None)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """
+        Returns hit and miss counts, hit rate and number of tracked entities
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entities": len(self._cache),
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
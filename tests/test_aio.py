@@ -0,0 +1,61 @@
+import asyncio
+import numpy as np
+from unittest import IsolatedAsyncioTestCase
+
+from src.hexasphere import hexgrid, projection
+from src.hexasphere.aio import AsyncHexGrid
+
+
+class TestAsyncHexGrid(IsolatedAsyncioTestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.SnyderEAProj(grid)
+
+    async def test_latlon_to_hex(self):
+
+        agrid = AsyncHexGrid(self.grid, window=0.01, max_batch=64)
+
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(-90, 90, 300)
+        lon = rng.uniform(-180, 180, 300)
+
+        res = await asyncio.gather(*[
+            agrid.latlon_to_hex(lat_i, lon_i, 40, out_str=True)
+            for lat_i, lon_i in zip(lat, lon)
+        ])
+        self.assertEqual(res, [
+            self.grid.latlon_to_hex(lat_i, lon_i, 40, out_str=True)
+            for lat_i, lon_i in zip(lat, lon)
+        ])
+
+        hexagons = await agrid.latlon_to_hex(lat[0], lon[0], 40)
+        self.assertEqual(hexagons[0].to_str_id(), res[0][0])
+
+        stats = agrid.stats()["latlon_to_hex"]
+        self.assertEqual(stats["requests"], 301)
+        self.assertLessEqual(stats["max_batch_size"], 64)
+        self.assertLess(stats["batches"], 301)
+        self.assertGreater(stats["latency_p99"], 0)
+
+    async def test_retrieve_polygon(self):
+
+        agrid = AsyncHexGrid(self.grid)
+
+        str_ids = [
+            "A00012-00012-00012", "C00005-00017-00012", "B00003-00001-00004"
+        ]
+        polygons = await asyncio.gather(*[
+            agrid.retrieve_polygon(str_id, out_geojson=True)
+            for str_id in str_ids
+        ])
+
+        for str_id, polygon in zip(str_ids, polygons):
+            expected = hexgrid.Hexagon(self.grid, str_id=str_id).retrieve_polygon(
+                out_geojson=True
+            )
+            self.assertTrue(np.allclose(
+                polygon["coordinates"], expected["coordinates"]
+            ))
+
+        # One batch per resolution
+        self.assertEqual(agrid.stats()["retrieve_polygon"]["batches"], 3)
@@ -0,0 +1,93 @@
+from unittest import TestCase, skipIf
+
+import numpy as np
+
+from src.hexasphere import batch, hexgrid, projection
+
+try:
+    import pyarrow as pa
+    from src.hexasphere import arrow
+except ImportError:
+    pa = None
+
+
+@skipIf(pa is None, "pyarrow is not installed")
+class TestArrow(TestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.SnyderEAProj(grid)
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-90, 90, 2000)
+    lon = rng.uniform(-180, 180, 2000)
+
+    def test_encode(self):
+
+        n = 321
+        expected = batch.latlon_to_ids(self.grid, self.lat, self.lon, n)
+
+        ids = arrow.latlon_to_ids(
+            self.grid, pa.array(self.lat), pa.array(self.lon), n
+        )
+        self.assertEqual(ids.type, pa.uint64())
+        self.assertTrue(np.array_equal(arrow.arrow_to_ids(ids), expected))
+
+        lat = pa.chunked_array([self.lat[:500], self.lat[500:]])
+        lon = pa.chunked_array([self.lon[:500], self.lon[500:]])
+        ids = arrow.latlon_to_ids(self.grid, lat, lon, n)
+        self.assertEqual(ids.num_chunks, 2)
+        self.assertTrue(np.array_equal(arrow.arrow_to_ids(ids), expected))
+
+        with self.assertRaises(ValueError):
+            arrow.latlon_to_ids(self.grid, pa.array([1.0, None]), lon, n)
+
+    def test_ids(self):
+
+        ids = batch.latlon_to_ids(self.grid, self.lat, self.lon, 5)
+
+        # Zero-copy
+        array = arrow.ids_to_arrow(ids)
+        self.assertEqual(array.buffers()[1].address, ids.ctypes.data)
+        self.assertEqual(
+            arrow.arrow_to_ids(array).ctypes.data, ids.ctypes.data
+        )
+
+        array = arrow.ids_to_arrow(ids, dictionary=True)
+        self.assertTrue(pa.types.is_dictionary(array.type))
+        self.assertEqual(len(array.dictionary), len(np.unique(ids)))
+        self.assertEqual(
+            array.dictionary_decode().to_pylist(), batch.ids_to_str(ids)
+        )
+        self.assertTrue(np.array_equal(arrow.arrow_to_ids(array), ids))
+
+        # Narrower integers are converted, not reinterpreted
+        small = np.array([0, 1, 2**17 + 3, 2**31 - 1])
+        for type in [pa.int32(), pa.uint32()]:
+            converted = arrow.arrow_to_ids(pa.array(small, type=type))
+            self.assertEqual(converted.dtype, np.int64)
+            self.assertTrue(np.array_equal(converted, small))
+
+        with self.assertRaises(TypeError):
+            arrow.arrow_to_ids(pa.array(ids.astype(float)))
+
+        strings = pa.array(batch.ids_to_str(ids))
+        self.assertTrue(np.array_equal(arrow.arrow_to_ids(strings), ids))
+        self.assertTrue(
+            np.array_equal(arrow.arrow_to_ids(strings[7:]), ids[7:])
+        )
+
+    def test_aggregate(self):
+
+        ids = batch.latlon_to_ids(self.grid, self.lat, self.lon, 2)
+        values = self.rng.random(len(ids))
+
+        table = arrow.aggregate(ids, pa.array(values), dictionary=True)
+        self.assertEqual(table.column_names, ["cell", "count", "sum", "mean"])
+        self.assertEqual(sum(table["count"].to_pylist()), len(ids))
+        self.assertAlmostEqual(sum(table["sum"].to_pylist()), values.sum())
+
+        cell = batch.ids_to_str(ids[:1])[0]
+        row = table["cell"].to_pylist().index(cell)
+        self.assertAlmostEqual(
+            table["mean"][row].as_py(), values[ids == ids[0]].mean()
+        )
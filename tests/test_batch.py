@@ -0,0 +1,291 @@
+import numpy as np
+from unittest import TestCase
+
+from src.hexasphere import batch, hexgrid, projection
+
+
+class TestBatch(TestCase):
+
+    def test_encode(self):
+
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(-90, 90, 500)
+        lon = rng.uniform(-180, 180, 500)
+
+        for proj in [projection.GnomonicProj, projection.SnyderEAProj]:
+            grid = hexgrid.HexGrid()
+            grid.projection = proj(grid)
+
+            for n in [1, 35, 1534]:
+                ids = batch.latlon_to_ids(grid, lat, lon, n)
+
+                self.assertEqual(
+                    batch.ids_to_str(ids),
+                    [
+                        grid.latlon_to_hex(lat_i, lon_i, n, out_str=True)[0]
+                        for lat_i, lon_i in zip(lat, lon)
+                    ]
+                )
+
+    def test_decode(self):
+
+        for proj in [projection.GnomonicProj, projection.SnyderEAProj]:
+            grid = hexgrid.HexGrid()
+            grid.projection = proj(grid)
+
+            n = 12
+            cells = batch.enumerate_cells(n)
+            X = batch.ids_to_X(grid, cells)
+
+            self.assertTrue(np.allclose(np.linalg.norm(X, axis=1), 1))
+            self.assertTrue(np.array_equal(batch.X_to_ids(grid, X, n), cells))
+
+            for hex_id, X_i in zip(batch.ids_to_str(cells[13:300:7]), X[13:300:7]):
+                H = hexgrid.Hexagon(grid, str_id=hex_id)
+                self.assertTrue(
+                    np.allclose(grid.projection.inv_project(H.P, H.face), X_i)
+                )
+
+    def test_polygons(self):
+
+        for proj in [projection.GnomonicProj, projection.SnyderEAProj]:
+            grid = hexgrid.HexGrid()
+            grid.projection = proj(grid)
+
+            for n in [0, 4, 21]:
+                ids = batch.enumerate_cells(n)
+                X, index = batch.ids_to_polygons(grid, ids)
+
+                # Each vertex is shared by 3 cells
+                self.assertEqual(len(X), 20 * (n + 1) ** 2)
+                self.assertEqual(np.sum(index[:, 5] == -1), 12)
+
+                for i in range(0, len(ids), 7):
+                    hexagon = hexgrid.Hexagon(
+                        grid, str_id=batch.ids_to_str(ids[i:i + 1])[0]
+                    )
+                    polygon = hexagon.retrieve_polygon()
+                    if index[i, 5] >= 0:
+                        self.assertTrue(np.allclose(X[index[i]], polygon))
+
+    def test_dtype_and_out(self):
+
+        grid = hexgrid.HexGrid()
+        grid.projection = projection.SnyderEAProj(grid)
+
+        rng = np.random.default_rng(3)
+        lat = rng.uniform(-90, 90, 1000)
+        lon = rng.uniform(-180, 180, 1000)
+        n = 2000
+
+        ids = batch.latlon_to_ids(grid, lat, lon, n)
+
+        # Chunked pipelines reuse their output buffers
+        out = np.zeros(1000, dtype=np.int64)
+        res = batch.latlon_to_ids(grid, lat, lon, n, out=out, chunk_size=64)
+        self.assertIs(res, out)
+        self.assertTrue(np.array_equal(out, ids))
+
+        X = batch.ids_to_X(grid, ids)
+        out = np.zeros((1000, 3), dtype=np.float32)
+        batch.ids_to_X(grid, ids, out=out, chunk_size=100)
+        self.assertLessEqual(
+            6371 * np.abs(out - X).max(), batch.FLOAT32_ERROR
+        )
+        self.assertTrue(np.array_equal(batch.X_to_ids(grid, X, n), ids))
+
+        latlon = batch.ids_to_latlon(grid, ids, dtype=np.float32)
+        self.assertEqual(latlon.dtype, np.float32)
+        error = np.linalg.norm(
+            batch.latlon_to_X(*latlon.astype(float).T)
+            - batch.latlon_to_X(*batch.ids_to_latlon(grid, ids).T),
+            axis=1
+        )
+        self.assertLessEqual(6371 * error.max(), batch.FLOAT32_ERROR)
+
+        vertices, _ = batch.ids_to_polygons(grid, ids, dtype=np.float32)
+        self.assertEqual(vertices.dtype, np.float32)
+
+        # Vertices are written to the first rows of the output buffer
+        X, index = batch.ids_to_polygons(grid, ids)
+        out = (np.zeros((6000, 3)), np.zeros((1000, 6), dtype=np.int64))
+        res = batch.ids_to_polygons(grid, ids, out=out, chunk_size=100)
+        self.assertIs(res[1], out[1])
+        self.assertTrue(np.shares_memory(res[0], out[0]))
+        self.assertTrue(np.array_equal(res[0], X))
+        self.assertTrue(np.array_equal(res[1], index))
+        with self.assertRaises(ValueError):
+            batch.ids_to_polygons(grid, ids, out=(np.zeros((10, 3)), None))
+
+        with self.assertRaises(ValueError):
+            batch.ids_to_X(grid, ids, out=np.zeros((999, 3)))
+
+    def test_canonicalize(self):
+
+        grid = hexgrid.HexGrid()
+
+        faces, positions, resolutions = [], [], []
+        for n in [0, 1, 4]:
+            pos = batch.face_positions(n)
+            faces.append(np.repeat(np.arange(20), len(pos)))
+            positions.append(np.tile(pos, (20, 1)))
+            resolutions.append(np.full(20 * len(pos), n))
+
+        face = np.concatenate(faces)
+        pos = np.concatenate(positions)
+        n = np.concatenate(resolutions)
+
+        new_face, new_pos = batch.canonicalize(face, pos, n)
+        for i in range(len(face)):
+            hexagon = hexgrid.Hexagon(
+                grid, face[i], tuple(pos[i]), solve_conflicts=True
+            )
+            self.assertEqual(new_face[i], hexagon.face)
+            self.assertEqual(tuple(new_pos[i]), tuple(hexagon.pos))
+
+        # Resolutions are deduced from pos, and canonical forms are stable
+        again_face, again_pos = batch.canonicalize(new_face, new_pos)
+        self.assertTrue(np.array_equal(again_face, new_face))
+        self.assertTrue(np.array_equal(again_pos, new_pos))
+
+    def test_multi_resolution(self):
+
+        rng = np.random.default_rng(2)
+        lat = rng.uniform(-90, 90, 300)
+        lon = rng.uniform(-180, 180, 300)
+        ns = [3, 14, 59, 239, 959]
+
+        grid = hexgrid.HexGrid()
+        grid.projection = projection.SnyderEAProj(grid)
+
+        ids = batch.latlon_to_ids_multi(grid, lat, lon, ns, chunk_size=128)
+        self.assertEqual(ids.shape, (300, len(ns)))
+        for j, n in enumerate(ns):
+            self.assertTrue(
+                np.array_equal(ids[:, j], batch.latlon_to_ids(grid, lat, lon, n))
+            )
+
+        X = batch.latlon_to_X(lat, lon)
+        self.assertTrue(
+            np.array_equal(batch.X_to_ids_multi(grid, X, ns), ids)
+        )
+
+        hexes = grid.latlon_to_hexes(lat[0], lon[0], ns, out_str=True)
+        self.assertEqual(
+            [h[0] for h in hexes], batch.ids_to_str(ids[0]),
+        )
+
+    def test_vectors(self):
+
+        rng = np.random.default_rng(3)
+        lat = rng.uniform(-90, 90, 200)
+        lon = rng.uniform(-180, 180, 200)
+        n = 77
+
+        grid = hexgrid.HexGrid()
+        grid.projection = projection.SnyderEAProj(grid)
+
+        # ECEF coordinates (in km) of points on the sphere
+        X = batch.latlon_to_X(lat, lon)
+        ecef = 6371 * X
+        ids = batch.latlon_to_ids(grid, lat, lon, n)
+
+        self.assertTrue(np.array_equal(batch.X_to_ids(grid, X, n), ids))
+        self.assertTrue(
+            np.array_equal(batch.X_to_ids(grid, ecef, n, normalize=True), ids)
+        )
+        self.assertTrue(
+            np.array_equal(
+                batch.X_to_ids_multi(grid, ecef, [n], normalize=True)[:, 0],
+                ids,
+            )
+        )
+
+        str_ids = batch.ids_to_str(ids)
+        for i in range(5):
+            self.assertEqual(
+                grid.X_to_hex(ecef[i], n, out_str=True, normalize=True),
+                [str_ids[i]],
+            )
+            H = grid.X_to_hex(X[i], n)[0]
+            self.assertTrue(
+                np.allclose(grid.hex_to_X(H), batch.ids_to_X(grid, ids[i:i+1]))
+            )
+            self.assertTrue(
+                np.allclose(
+                    grid.hex_to_X(str_ids[i], in_str=True), grid.hex_to_X(H)
+                )
+            )
+
+    def test_select_faces(self):
+
+        grid = hexgrid.HexGrid()
+
+        rng = np.random.default_rng(4)
+        X = rng.normal(size=(10000, 3))
+        X[:1000, 0] = 0
+        X[1000:2000, 1:] = 0
+
+        # Vertices, middles of edges and centers of faces
+        X = np.concatenate(
+            [
+                X, grid.a, grid.b, grid.c, grid.a + grid.b, grid.b + grid.c,
+                grid.k, np.eye(3), -np.eye(3),
+            ]
+        )
+        X /= np.linalg.norm(X, axis=1)[:, None]
+
+        self.assertTrue(
+            np.array_equal(
+                batch.select_faces(grid, X), np.argmax(X.dot(grid.k.T), axis=1)
+            )
+        )
+
+    def test_bytes(self):
+
+        grid = hexgrid.HexGrid()
+        grid.projection = projection.GnomonicProj(grid)
+
+        rng = np.random.default_rng(5)
+        lat = rng.uniform(-90, 90, 1000)
+        lon = rng.uniform(-180, 180, 1000)
+        ids = batch.latlon_to_ids(grid, lat, lon, 4321)
+        str_ids = batch.ids_to_str(ids)
+
+        data = batch.ids_to_bytes(ids)
+        self.assertEqual(data, "".join(str_ids).encode())
+        self.assertTrue(np.array_equal(batch.bytes_to_ids(data), ids))
+
+        array = np.array(str_ids, dtype="S18")
+        self.assertTrue(np.array_equal(batch.bytes_to_ids(array), ids))
+
+        lines = batch.ids_to_bytes(ids, sep=b"\n")
+        self.assertEqual(lines.decode().splitlines(), str_ids)
+        self.assertTrue(
+            np.array_equal(batch.bytes_to_ids(lines, stride=19), ids)
+        )
+
+        # Malformed rows
+        array[3] = b"U00001-00002-00003"
+        array[5] = b"A00001-00002-0000x"
+        array[8] = b"A00001_00002-00003"
+        array[13] = b"A00001-00002-00004"
+        array[21] = b"A00001-00002-00009"
+        self.assertEqual(
+            batch.invalid_str_ids(array).tolist(), [3, 5, 8, 13, 21]
+        )
+        with self.assertRaises(ValueError):
+            batch.bytes_to_ids(array)
+        masked = batch.bytes_to_ids(array, errors="mask")
+        self.assertTrue(np.all(masked[[3, 5, 8, 13, 21]] == -1))
+        self.assertEqual(np.sum(masked == ids), len(ids) - 5)
+
+        with self.assertRaises(ValueError):
+            batch.bytes_to_ids(data[:-1])
+        with self.assertRaises(ValueError):
+            batch.bytes_to_ids(data, errors="ignore")
+
+        # Resolutions too fine for 5 digits
+        big = batch.pack_ids([0], np.array([[100000, 100000, 100000]]))
+        with self.assertRaises(ValueError):
+            batch.ids_to_bytes(big)
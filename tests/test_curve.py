@@ -0,0 +1,43 @@
+import numpy as np
+from unittest import TestCase
+
+from src.hexasphere import hexgrid
+from src.hexasphere.batch import enumerate_cells, pack_ids, unpack_ids
+from src.hexasphere.curve import curve_to_ids, ids_to_curve, sort_by_curve
+
+
+class TestCurve(TestCase):
+
+    def test_round_trip(self):
+
+        for n in [0, 5, 12, 35]:
+            cells = enumerate_cells(n)
+            index = ids_to_curve(cells, n)
+
+            self.assertEqual(len(np.unique(index)), len(cells))
+            self.assertTrue(np.array_equal(curve_to_ids(index, n), cells))
+
+    def test_locality(self):
+
+        n = 35
+        face, pos = unpack_ids(sort_by_curve(enumerate_cells(n), n))
+
+        same_face = face[1:] == face[:-1]
+        steps = np.abs(np.diff(pos, axis=0)).max(axis=1)[same_face]
+
+        self.assertLess(steps.mean(), 1.5)
+
+    def test_hierarchy(self):
+
+        grid = hexgrid.HexGrid()
+
+        n = 8
+        child_n = 4 * (n + 1) - 1
+
+        H = hexgrid.Hexagon(grid, str_id="C00036-00016-00020")
+        parent = H.find_parent_hex()[0]
+
+        self.assertEqual(
+            ids_to_curve(pack_ids([H.face], [H.pos]), child_n)[0] >> 4,
+            ids_to_curve(pack_ids([parent.face], [parent.pos]), n)[0]
+        )
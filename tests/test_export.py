@@ -0,0 +1,63 @@
+import io
+import json
+import numpy as np
+from unittest import TestCase
+
+from src.hexasphere import batch, hexgrid, projection
+from src.hexasphere.export import GeoJSONWriter, write_geojson
+
+
+class TestExport(TestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.SnyderEAProj(grid)
+
+    def test_feature_collection(self):
+
+        n = 6
+        ids = batch.enumerate_cells(n)
+        values = np.arange(len(ids))
+
+        fp = io.StringIO()
+        count = write_geojson(
+            self.grid, ids, fp, properties={"value": values}, chunk_size=100
+        )
+        self.assertEqual(count, len(ids))
+
+        collection = json.loads(fp.getvalue())
+        self.assertEqual(collection["type"], "FeatureCollection")
+        features = collection["features"]
+        self.assertEqual(len(features), len(ids))
+
+        for i in [0, 1, 99, 100, 101, len(ids) - 1]:
+            feature = features[i]
+            hexagon = hexgrid.Hexagon(self.grid, str_id=feature["id"])
+            self.assertEqual(feature["properties"], {"value": i})
+
+            ring = feature["geometry"]["coordinates"][0]
+            self.assertEqual(ring[0], ring[-1])
+            if len(ring) == 7:
+                expected = hexagon.retrieve_polygon(out_geojson=True)
+                self.assertTrue(np.allclose(
+                    ring, expected["coordinates"][0], atol=1e-6
+                ))
+            else:
+                self.assertEqual(len(ring), 6)
+
+    def test_ndjson(self):
+
+        rng = np.random.default_rng(0)
+        ids = batch.latlon_to_ids(
+            self.grid, rng.uniform(-90, 90, 50), rng.uniform(-180, 180, 50), 30
+        )
+
+        fp = io.StringIO()
+        with GeoJSONWriter(self.grid, fp, ndjson=True, chunk_size=7) as writer:
+            writer.write(ids[:20])
+            writer.write(ids[20:])
+
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(len(lines), 50)
+        self.assertEqual(
+            [json.loads(line)["id"] for line in lines], batch.ids_to_str(ids)
+        )
@@ -0,0 +1,77 @@
+import tempfile
+from unittest import TestCase, skipIf
+
+import numpy as np
+
+from src.hexasphere import hexgrid
+from src.hexasphere.batch import enumerate_cells, neighbor_ids, pack_ids
+from src.hexasphere.graph import adjacency, adjacency_matrix
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
+
+
+class TestAdjacency(TestCase):
+
+    grid = hexgrid.HexGrid()
+
+    def test_adjacency(self):
+
+        n = 6
+        cells = enumerate_cells(n)
+        indptr, indices = adjacency(self.grid, n)
+
+        degree = np.diff(indptr)
+        self.assertEqual(len(degree), 10 * (n + 1) ** 2 + 2)
+        self.assertEqual(np.sum(degree == 5), 12)
+        self.assertEqual(np.sum(degree == 6), len(degree) - 12)
+
+        H = hexgrid.Hexagon(self.grid, str_id="A00001-00006-00007")
+        i = np.searchsorted(cells, pack_ids([H.face], [H.pos]))[0]
+
+        neighbors = [
+            H.compute_neighbor(dP) for dP in
+            [(1, -1, 0), (1, 0, -1), (0, 1, -1), (-1, 1, 0), (-1, 0, 1), (0, -1, 1)]
+        ]
+        expected = np.searchsorted(
+            cells,
+            pack_ids([h.face for h in neighbors], [h.pos for h in neighbors])
+        )
+
+        self.assertCountEqual(indices[indptr[i]:indptr[i + 1]], expected)
+
+    def test_neighbor_ids(self):
+
+        n = 5
+        cells = enumerate_cells(n)
+        indptr, indices = adjacency(self.grid, n)
+        neighbors = neighbor_ids(self.grid, cells)
+
+        self.assertEqual(np.sum(neighbors < 0), 12)
+        for i, row in enumerate(neighbors):
+            self.assertCountEqual(
+                row[row >= 0], cells[indices[indptr[i]:indptr[i + 1]]]
+            )
+
+    def test_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            indptr, indices = adjacency(self.grid, 4, cache_dir=cache_dir)
+            cached_indptr, cached_indices = adjacency(
+                self.grid, 4, cache_dir=cache_dir
+            )
+
+        self.assertTrue(np.array_equal(indptr, cached_indptr))
+        self.assertTrue(np.array_equal(indices, cached_indices))
+
+    @skipIf(scipy is None, "scipy is not installed")
+    def test_connected_components(self):
+
+        from scipy.sparse.csgraph import connected_components
+
+        matrix = adjacency_matrix(self.grid, 10)
+
+        self.assertTrue((matrix != matrix.T).nnz == 0)
+        self.assertEqual(connected_components(matrix)[0], 1)
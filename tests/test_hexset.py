@@ -0,0 +1,73 @@
+import numpy as np
+from unittest import TestCase
+
+from src.hexasphere import hexgrid, projection
+from src.hexasphere.hexset import HexSet
+
+
+class TestHexSet(TestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.SnyderEAProj(grid)
+
+    def test_set_algebra(self):
+
+        H = hexgrid.Hexagon(self.grid, str_id="A00012-00012-00012")
+        ring_1 = HexSet.from_str_ids(H.k_ring(1, out_str=True))
+        ring_2 = HexSet.from_hexagons(H.k_ring(2))
+
+        self.assertEqual(len(ring_1), 7)
+        self.assertEqual(len(ring_2), 19)
+        self.assertEqual(ring_1 | ring_2, ring_2)
+        self.assertEqual(ring_1 & ring_2, ring_1)
+        self.assertEqual(len(ring_2 - ring_1), 12)
+        self.assertEqual(ring_2 ^ ring_1, ring_2 - ring_1)
+
+        self.assertIn("A00012-00012-00012", ring_1)
+        self.assertIn(H, ring_1)
+        self.assertNotIn("A00015-00010-00011", ring_1)
+
+        with self.assertRaises(ValueError):
+            ring_1 | HexSet.from_str_ids(["A00001-00001-00002"])
+
+    def test_validation(self):
+
+        with self.assertRaises(ValueError):
+            HexSet.from_str_ids(["A00012-00012-00012", "A00001-00001-00004"])
+
+        with self.assertRaises(ValueError):
+            HexSet(HexSet.from_str_ids(["A00012-00012-00012"]).ids, n=5)
+
+        # The standard id of this hexagon is E00006-00001-00005
+        with self.assertRaises(ValueError):
+            HexSet.from_str_ids(["A00001-00006-00005"])
+        self.assertEqual(len(HexSet.from_str_ids(["E00006-00001-00005"])), 1)
+
+    def test_contains_latlon(self):
+
+        n = 35
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(-10, 10, 200)
+        lon = rng.uniform(-10, 10, 200)
+
+        area = HexSet.from_latlon(self.grid, lat[:100], lon[:100], n)
+
+        self.assertTrue(np.all(area.contains_latlon(self.grid, lat[:100], lon[:100])))
+        self.assertEqual(
+            area.contains_latlon(self.grid, lat[100:], lon[100:]).tolist(),
+            [
+                self.grid.latlon_to_hex(lat_i, lon_i, n, out_str=True)[0] in area
+                for lat_i, lon_i in zip(lat[100:], lon[100:])
+            ]
+        )
+
+    def test_serialization(self):
+
+        H = hexgrid.Hexagon(self.grid, str_id="A00012-00012-00012")
+        area = HexSet.from_hexagons(H.k_ring(5))
+
+        data = area.to_bytes()
+
+        self.assertEqual(HexSet.from_bytes(data), area)
+        self.assertEqual(HexSet.from_bytes(data).n, 17)
+        self.assertLess(len(data), 8 * len(area))
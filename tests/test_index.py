@@ -0,0 +1,80 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from src.hexasphere import batch, hexgrid, projection
+from src.hexasphere.geometry import R
+from src.hexasphere.index import PointIndex
+
+
+class TestIndex(TestCase):
+
+    def setUp(self):
+        self.grid = hexgrid.HexGrid()
+        self.grid.projection = projection.SnyderEAProj(self.grid)
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(20000, 3))
+        self.X = X / np.linalg.norm(X, axis=1)[:, None]
+        self.lat, self.lon = batch.X_to_latlon(self.X).T
+
+        # Random points, and the vertices of the icosahedron
+        Q = np.concatenate([rng.normal(size=(20, 3)), self.grid.a])
+        self.queries = batch.X_to_latlon(
+            Q / np.linalg.norm(Q, axis=1)[:, None]
+        )
+
+    def distances(self, lat, lon):
+        x = batch.latlon_to_X(lat, lon).reshape(3)
+        chord = np.linalg.norm(self.X - x, axis=1)
+        return 2 * np.arcsin(np.minimum(chord / 2, 1)) * R
+
+    def test_query(self):
+
+        index = PointIndex.from_latlon(self.grid, self.lat, self.lon, 30)
+        self.assertEqual(len(index), len(self.X))
+
+        for lat, lon in self.queries:
+            indices, distances = index.query(lat, lon, k=10)
+            expected = np.sort(self.distances(lat, lon))[:10]
+
+            np.testing.assert_allclose(distances, expected)
+            np.testing.assert_allclose(
+                self.distances(lat, lon)[indices], distances
+            )
+
+    def test_query_radius(self):
+
+        index = PointIndex.from_latlon(self.grid, self.lat, self.lon, 30)
+
+        for lat, lon in self.queries:
+            indices, distances = index.query_radius(lat, lon, 300)
+            d = self.distances(lat, lon)
+
+            self.assertCountEqual(indices, np.flatnonzero(d <= 300))
+            self.assertTrue(np.all(np.diff(distances) >= 0))
+
+    def test_sparse(self):
+
+        # Few points: the rings are larger than the occupied hexagons
+        index = PointIndex.from_X(self.grid, self.X[:5], 100)
+        indices, _ = index.query(0, 0, k=10)
+        self.assertCountEqual(indices, range(5))
+
+    def test_mmap(self):
+
+        index = PointIndex.from_latlon(self.grid, self.lat, self.lon, 30)
+        lat, lon = self.queries[0]
+
+        with tempfile.TemporaryDirectory() as path:
+            index.save(path)
+            mapped = PointIndex.load(self.grid, path)
+
+            self.assertIsInstance(mapped.X, np.memmap)
+            self.assertEqual(mapped.n, 30)
+            for res, expected in zip(
+                mapped.query(lat, lon, k=5), index.query(lat, lon, k=5)
+            ):
+                np.testing.assert_array_equal(res, expected)
+            del mapped
@@ -0,0 +1,122 @@
+import os
+import subprocess
+import sys
+import numpy as np
+from unittest import TestCase, skipIf
+
+from src.hexasphere import batch, hexgrid, projection
+
+# The kernels module used by batch and projection
+kernels = batch.kernels
+
+
+@skipIf(not kernels.available(), "numba is not installed")
+class TestKernels(TestCase):
+
+    def setUp(self):
+        self.backend = kernels.get_backend()
+
+    def tearDown(self):
+        kernels.set_backend(self.backend)
+
+    def both(self, func, *args):
+        """
+        Returns the outputs of func with the NumPy and Numba backends
+        """
+        kernels.set_backend("numpy")
+        expected = func(*args)
+        kernels.set_backend("numba")
+        return expected, func(*args)
+
+    def test_cell_assignment(self):
+
+        grid = hexgrid.HexGrid()
+        rng = np.random.default_rng(0)
+
+        for n in [0, 1, 7, 100]:
+            N = n + 1
+
+            # Positions out of their face, up to one face away
+            face = rng.integers(0, 20, 10000)
+            a = rng.integers(-N, 2 * N + 1, 10000)
+            b = rng.integers(-N, 2 * N + 1, 10000)
+            pos = np.stack([a, b, 2 * N - a - b], axis=-1)
+            keep = np.all((pos >= -N) & (pos <= 2 * N), axis=1)
+
+            expected, result = self.both(
+                batch.rectify_coordinates, grid, face[keep], pos[keep], n
+            )
+            self.assertTrue(np.array_equal(expected[0], result[0]))
+            self.assertTrue(np.array_equal(expected[1], result[1]))
+
+            pos = batch.face_positions(n)
+            face = np.repeat(np.arange(20), len(pos))
+            pos = np.tile(pos, (20, 1))
+            expected, result = self.both(
+                batch.canonicalize, face, pos, n
+            )
+            self.assertTrue(np.array_equal(expected[0], result[0]))
+            self.assertTrue(np.array_equal(expected[1], result[1]))
+
+    def test_projections(self):
+
+        grid = hexgrid.HexGrid()
+        rng = np.random.default_rng(1)
+
+        X = rng.normal(size=(100000, 3))
+        X /= np.linalg.norm(X, axis=1)[:, None]
+        X = np.concatenate([X, grid.a, grid.b, grid.c])
+
+        for proj in [projection.GnomonicProj, projection.SnyderEAProj]:
+            grid.projection = proj(grid)
+
+            expected, result = self.both(batch.project, grid, X)
+            self.assertTrue(np.array_equal(expected[0], result[0]))
+            self.assertTrue(np.allclose(expected[1], result[1], atol=1e-12))
+
+            face, P = expected
+            expected, result = self.both(
+                grid.projection.inv_project_batch, P, face
+            )
+            self.assertTrue(np.allclose(expected, result, atol=1e-12))
+
+            for n in [0, 3, 250, 10000]:
+                expected, result = self.both(batch.X_to_ids, grid, X, n)
+                self.assertTrue(np.array_equal(expected, result))
+
+                expected, result = self.both(batch.ids_to_X, grid, expected)
+                self.assertTrue(np.allclose(expected, result, atol=1e-12))
+
+    def test_set_backend(self):
+
+        kernels.set_backend("numpy")
+        self.assertFalse(kernels.enabled())
+        kernels.set_backend("numba")
+        self.assertTrue(kernels.enabled())
+
+        with self.assertRaises(ValueError):
+            kernels.set_backend("cuda")
+
+    def test_threads(self):
+
+        # Kernels first run from worker threads, in a fresh interpreter that
+        # must exit
+        script = """
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from hexasphere import batch, hexgrid
+
+grid = hexgrid.get_grid()
+lat = np.linspace(-90, 90, 2000)
+with ThreadPoolExecutor(8) as executor:
+    for ids in executor.map(
+        lambda i: batch.latlon_to_ids(grid, lat, lat + i, 100), range(32)
+    ):
+        batch.ids_to_X(grid, ids)
+"""
+        src = os.path.join(os.path.dirname(__file__), "..", "src")
+        env = dict(os.environ, PYTHONPATH=os.path.abspath(src))
+        process = subprocess.run(
+            [sys.executable, "-c", script], env=env, timeout=60
+        )
+        self.assertEqual(process.returncode, 0)
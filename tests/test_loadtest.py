@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+import numpy as np
+
+from src.hexasphere import batch, geometry, hexgrid, loadtest, projection
+
+
+class TestLoadTest(TestCase):
+
+    def test_run(self):
+
+        results = loadtest.run(
+            n=50, points=300, batch_size=100, scalar_points=20
+        )
+
+        self.assertEqual(
+            len(results),
+            len(loadtest.WORKLOADS) * len(loadtest.PROJECTIONS) * 15,
+        )
+        for r in results:
+            self.assertEqual(r["errors"], 0, r)
+            self.assertGreater(r["throughput"], 0)
+            self.assertLessEqual(r["p50"], r["p99"])
+
+        self.assertIn("face_edges", loadtest.format_report(results))
+
+    def test_poles(self):
+
+        # Signed zeros at the poles
+        X = np.array([[-0.0, 0.0, 1.0], [-0.0, -0.0, -1.0]])
+        self.assertEqual(geometry.X_to_latlon(X[0]), [90, 0])
+        self.assertEqual(geometry.X_to_latlon(X[1]), [-90, 0])
+        np.testing.assert_array_equal(batch.X_to_latlon(X), [[90, 0], [-90, 0]])
+
+    def test_vertices(self):
+
+        # Vertices, up to the rounding errors of (lat, lon) coordinates
+        grid = hexgrid.HexGrid()
+        grid.projection = projection.SnyderEAProj(grid)
+
+        rng = np.random.default_rng(0)
+        lat, lon = loadtest.vertices(rng, 200, jitter=0)
+        ids = batch.latlon_to_ids(grid, lat, lon, 7)
+
+        for lat_i, lon_i, id_i in zip(lat, lon, batch.ids_to_str(ids)):
+            self.assertEqual(
+                grid.latlon_to_hex(lat_i, lon_i, 7, out_str=True), [id_i]
+            )
+
+            # Pentagons are centered on the vertices
+            hexagon = hexgrid.Hexagon(grid, str_id=id_i)
+            self.assertTrue(np.all(np.isfinite(grid.hex_to_latlon(hexagon))))
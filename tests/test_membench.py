@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from src.hexasphere import membench
+
+
+class TestMembench(TestCase):
+
+    def test_budgets(self):
+
+        names = [
+            "latlon_to_ids",
+            "latlon_to_ids_multi",
+            "ids_to_bytes",
+            "bytes_to_ids",
+            "HexSet",
+            "k_ring",
+            "remap",
+            "Stencil",
+            "adjacency",
+        ]
+        results = membench.run(cells=20000, ring=20, names=names)
+
+        self.assertEqual(sorted(r["name"] for r in results), sorted(names))
+        for r in results:
+            self.assertFalse(r["over_budget"], r)
+            self.assertGreater(r["peak"], 0)
+            self.assertGreaterEqual(r["peak"], r["retained"])
+
+        # Columnar sets are lighter than objects
+        by_name = {r["name"]: r for r in results}
+        self.assertLess(
+            by_name["HexSet"]["retained"], by_name["k_ring"]["retained"]
+        )
+
+    def test_exceeded(self):
+
+        results = membench.run(
+            cells=1000, names=["HexSet"], budgets={"HexSet": (0, 0)}
+        )
+        self.assertTrue(results[0]["over_budget"])
+        self.assertIn("EXCEEDED", membench.format_report(results))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "budgets.json")
+            with open(path, "w") as f:
+                json.dump({"HexSet": [0, 0]}, f)
+
+            args = ["--cells", "1000", "--names", "HexSet", "--budgets", path]
+            self.assertEqual(membench.main(args), 1)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from src.hexasphere import hexgrid, projection
+from src.hexasphere.batch import enumerate_cells, ids_to_str
+from src.hexasphere.graph import adjacency
+from src.hexasphere.mesh import grid_mesh
+
+
+class TestMesh(TestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.SnyderEAProj(grid)
+
+    def test_mesh(self):
+
+        n = 9
+        vertices, cells = grid_mesh(self.grid, n)
+
+        self.assertEqual(vertices.dtype, np.float32)
+        self.assertEqual(vertices.shape, (20 * (n + 1) ** 2, 3))
+        self.assertEqual(cells.shape, (10 * (n + 1) ** 2 + 2, 6))
+        self.assertTrue(np.allclose(np.linalg.norm(vertices, axis=1), 1))
+
+        # Every vertex is shared by 3 cells
+        counts = np.bincount(cells[cells >= 0], minlength=len(vertices))
+        self.assertTrue(np.all(counts == 3))
+
+        # Neighboring cells share 2 vertices
+        indptr, indices = adjacency(self.grid, n)
+        for i in range(0, len(cells), 13):
+            for j in indices[indptr[i]:indptr[i + 1]]:
+                shared = np.intersect1d(cells[i], cells[j])
+                self.assertEqual(np.sum(shared >= 0), 2)
+
+        i = 123
+        hexagon = hexgrid.Hexagon(
+            self.grid, str_id=ids_to_str(enumerate_cells(n)[i:i + 1])[0]
+        )
+        self.assertTrue(np.allclose(
+            vertices[cells[i]], hexagon.retrieve_polygon(), atol=1e-6
+        ))
+
+    def test_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            vertices, cells = grid_mesh(self.grid, 3, cache_dir=cache_dir)
+            cached_vertices, cached_cells = grid_mesh(
+                self.grid, 3, cache_dir=cache_dir
+            )
+
+        self.assertTrue(np.array_equal(vertices, cached_vertices))
+        self.assertTrue(np.array_equal(cells, cached_cells))
+
+    def test_cache_name(self):
+
+        # The approximate inverse projection is cached separately
+        grid = hexgrid.HexGrid()
+        grid.projection = projection.SnyderEAProj(grid, max_error=1e-3)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            grid_mesh(self.grid, 3, cache_dir=cache_dir)
+            grid_mesh(grid, 3, cache_dir=cache_dir)
+            self.assertEqual(
+                sorted(os.listdir(cache_dir)),
+                ["mesh_SnyderEAProj_e0.001_n3.npz", "mesh_SnyderEAProj_n3.npz"],
+            )
@@ -0,0 +1,51 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from src.hexasphere import hexgrid, projection
+from src.hexasphere.batch import enumerate_cells, pack_ids
+from src.hexasphere.geometry import R
+from src.hexasphere.metrics import cell_metrics, metrics_table
+
+
+class TestMetrics(TestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.GnomonicProj(grid)
+
+    def test_metrics(self):
+
+        n = 12
+        area, perimeter, radius = cell_metrics(self.grid, enumerate_cells(n))
+
+        # Cells cover the sphere
+        self.assertAlmostEqual(area.sum() / (4 * np.pi * R**2), 1)
+        self.assertTrue(np.allclose(radius, np.sqrt(area / np.pi)))
+
+        # Pentagons are the smallest cells
+        smallest = np.sort(np.argsort(area)[:12])
+        shortest = np.sort(np.argsort(perimeter)[:12])
+        self.assertEqual(smallest.tolist(), shortest.tolist())
+
+        # Close to the approximations of HexGrid
+        self.assertTrue(
+            np.allclose(radius, self.grid.compute_radius_for_n(n), rtol=0.5)
+        )
+        # Regular hexagon, at the center of a face
+        H = hexgrid.Hexagon(self.grid, str_id="A00009-00009-00008")
+        _, _, radius = cell_metrics(self.grid, [pack_ids(H.face, H.pos)])
+        self.assertAlmostEqual(H.effective_radius() / radius[0], 1, places=2)
+
+    def test_table(self):
+
+        n = 9
+        expected = cell_metrics(self.grid, enumerate_cells(n))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            table = metrics_table(self.grid, n, cache_dir=cache_dir)
+            cached = metrics_table(self.grid, n, cache_dir=cache_dir)
+
+        for x, y, z in zip(expected, table, cached):
+            self.assertTrue(np.allclose(x, y, rtol=1e-9))
+            self.assertTrue(np.array_equal(y, z))
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import numpy as np
+
+from src.hexasphere import batch, hexgrid, projection
+
+
+class TestRegistry(TestCase):
+
+    def test_constants(self):
+
+        grid = hexgrid.HexGrid()
+        other = hexgrid.HexGrid()
+
+        self.assertIs(grid.k, other.k)
+        self.assertFalse(grid.k.flags.writeable)
+        self.assertFalse(grid.abc[0].flags.writeable)
+        with self.assertRaises(ValueError):
+            grid.a[0, 0] = 1
+
+    def test_get_grid(self):
+
+        grid = hexgrid.get_grid()
+        self.assertIs(grid, hexgrid.get_grid())
+        self.assertEqual(type(grid.projection).__name__, "SnyderEAProj")
+
+        gnomonic = hexgrid.get_grid(projection.GnomonicProj, overlap=1)
+        self.assertIsNot(gnomonic, grid)
+        self.assertIs(gnomonic, hexgrid.get_grid(projection.GnomonicProj, 1))
+        self.assertGreater(gnomonic.margin, 0)
+
+        with self.assertRaises(AttributeError):
+            grid.set_overlap(1)
+        with self.assertRaises(AttributeError):
+            grid.projection = projection.GnomonicProj(grid)
+
+        # The projection is frozen too
+        with self.assertRaises(AttributeError):
+            grid.projection.max_error = 1e-3
+        with self.assertRaises(ValueError):
+            grid.projection._abc[0, 0, 0] = 1
+
+        approx = hexgrid.get_grid(max_error=1e-3)
+        with self.assertRaises(ValueError):
+            approx.projection._inv_table._coefficients[0] = 0
+
+        reference = hexgrid.HexGrid()
+        reference.projection = projection.SnyderEAProj(reference)
+
+        lat, lon = np.array([12.5, -40.1]), np.array([3.2, 170.0])
+        self.assertTrue(
+            np.array_equal(
+                batch.latlon_to_ids(grid, lat, lon, 50),
+                batch.latlon_to_ids(reference, lat, lon, 50),
+            )
+        )
+
+    def test_threads(self):
+
+        grid = hexgrid.get_grid()
+
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(-90, 90, (16, 5000))
+        lon = rng.uniform(-180, 180, (16, 5000))
+
+        def run(i):
+            ids = batch.latlon_to_ids(grid, lat[i], lon[i], 100)
+            X = batch.ids_to_X(grid, ids)
+            vertices, _ = batch.ids_to_polygons(grid, ids[:100])
+            return ids, X, vertices
+
+        expected = [run(i) for i in range(len(lat))]
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(run, range(len(lat))))
+
+        for result, reference in zip(results, expected):
+            for array, reference_array in zip(result, reference):
+                self.assertTrue(np.array_equal(array, reference_array))
@@ -0,0 +1,90 @@
+import tempfile
+from unittest import TestCase, skipIf
+
+import numpy as np
+
+from src.hexasphere import hexgrid, projection
+from src.hexasphere.batch import X_to_ids, cell_ordinals
+from src.hexasphere.remap import remap, remap_matrix
+
+try:
+    import scipy
+except ImportError:
+    scipy = None
+
+
+class TestRemap(TestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.SnyderEAProj(grid)
+
+    def test_fractions(self):
+
+        n1, n2 = 6, 4
+        rows, cols, fractions = remap(self.grid, n1, n2)
+
+        # Hexagons sum to 1, pentagons to 5 / 6, on both sides
+        totals = np.bincount(cols, fractions)
+        self.assertEqual(len(totals), 10 * (n1 + 1) ** 2 + 2)
+        self.assertTrue(np.allclose(np.sort(totals)[:12], 5 / 6))
+        self.assertTrue(np.allclose(np.sort(totals)[12:], 1))
+
+        totals = np.bincount(rows, fractions) * ((n2 + 1) / (n1 + 1)) ** 2
+        self.assertTrue(np.allclose(np.sort(totals)[:12], 5 / 6))
+        self.assertTrue(np.allclose(np.sort(totals)[12:], 1))
+
+        # Same resolution
+        rows, cols, fractions = remap(self.grid, n1, n1)
+        self.assertTrue(np.array_equal(rows, cols))
+
+    def test_chunks(self):
+
+        expected = remap(self.grid, 9, 14)
+        for x, y in zip(remap(self.grid, 9, 14, chunk_size=7), expected):
+            self.assertTrue(np.allclose(x, y, rtol=1e-12))
+
+    def test_sampling(self):
+
+        # With an equal-area projection, fractions are the frequencies of
+        # random points
+        n1, n2 = 2, 3
+        rows, cols, fractions = remap(self.grid, n1, n2)
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200000, 3))
+        X /= np.linalg.norm(X, axis=1)[:, None]
+
+        i = cell_ordinals(X_to_ids(self.grid, X, n1), n1)
+        j = cell_ordinals(X_to_ids(self.grid, X, n2), n2)
+        size1 = 10 * (n1 + 1) ** 2 + 2
+        size2 = 10 * (n2 + 1) ** 2 + 2
+        counts = np.bincount(j * size1 + i, minlength=size1 * size2)
+
+        frequencies = counts[rows * size1 + cols] / len(X) * 10 * (n1 + 1) ** 2
+        self.assertEqual(counts.sum(), counts[rows * size1 + cols].sum())
+        self.assertTrue(np.allclose(frequencies, fractions, atol=0.05))
+
+    def test_cache(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            res = remap(self.grid, 3, 5, cache_dir=cache_dir)
+            cached = remap(self.grid, 3, 5, cache_dir=cache_dir)
+
+        for x, y in zip(res, cached):
+            self.assertTrue(np.array_equal(x, y))
+
+    @skipIf(scipy is None, "scipy is not installed")
+    def test_matrix(self):
+
+        n1, n2 = 7, 4
+        field = np.random.default_rng(0).random(10 * (n1 + 1) ** 2 + 2)
+
+        # Totals are preserved
+        M = remap_matrix(self.grid, n1, n2, mean=False)
+        self.assertAlmostEqual((M @ field).sum(), field.sum())
+
+        # Constant fields stay constant
+        M = remap_matrix(self.grid, n1, n2)
+        self.assertTrue(np.allclose(M @ np.ones(M.shape[1]), 1))
+        self.assertTrue(np.all((M @ field >= field.min())))
+        self.assertTrue(np.all((M @ field <= field.max())))
@@ -0,0 +1,73 @@
+import numpy as np
+from unittest import TestCase, skipIf
+
+from src.hexasphere import batch, hexgrid, projection
+from src.hexasphere.batch import project
+
+
+class TestSnyderApprox(TestCase):
+
+    def test_inv_project_approx(self):
+
+        grid = hexgrid.HexGrid()
+        exact = projection.SnyderEAProj(grid)
+        approx = projection.SnyderEAProj(grid, max_error=1e-5)
+        grid.projection = exact
+
+        self.assertLessEqual(approx.table_error, 1e-5)
+        self.assertEqual(approx._inv_table.size, 128)
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(100000, 3))
+        X /= np.linalg.norm(X, axis=1)[:, None]
+        face, P = project(grid, X)
+
+        X_exact = exact.inv_project_batch(P, face)
+        X_approx = approx.inv_project_batch(P, face)
+
+        # Allows for the roundoff errors of the exact inverse projection
+        error = 6371 * np.linalg.norm(X_exact - X_approx, axis=1)
+        self.assertLessEqual(error.max(), 1e-5 + 1e-5)
+
+        for i in range(100):
+            self.assertLessEqual(
+                6371 * np.linalg.norm(
+                    approx.inv_project(P[i], face[i]) - X_exact[i]
+                ),
+                2e-5
+            )
+
+        # Vertices and centers of faces
+        for f in range(20):
+            self.assertTrue(np.allclose(
+                approx.inv_project_batch(np.zeros((1, 2)), [f])[0],
+                grid.k[f]
+            ))
+            for i in range(3):
+                self.assertTrue(np.allclose(
+                    approx.inv_project_batch(approx._P_vertex[[i]], [f])[0],
+                    grid.abc[f][i]
+                ))
+
+    @skipIf(not batch.kernels.available(), "numba is not installed")
+    def test_approx_kernel(self):
+
+        # The compiled kernel interpolates the same table as NumPy
+        grid = hexgrid.HexGrid()
+        approx = projection.SnyderEAProj(grid, max_error=1e-3)
+        grid.projection = approx
+
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(10000, 3))
+        X /= np.linalg.norm(X, axis=1)[:, None]
+        face, P = project(grid, X)
+
+        backend = batch.kernels.get_backend()
+        self.addCleanup(batch.kernels.set_backend, backend)
+
+        batch.kernels.set_backend("numba")
+        X_kernel = approx.inv_project_batch(P, face)
+        batch.kernels.set_backend("numpy")
+        X_numpy = approx.inv_project_batch(P, face)
+
+        self.assertTrue(np.allclose(X_kernel, X_numpy, rtol=0, atol=1e-14))
@@ -0,0 +1,106 @@
+import numpy as np
+from unittest import TestCase
+
+from src.hexasphere import hexgrid, projection
+from src.hexasphere.batch import NEIGHBOR_OFFSETS, ids_to_X, unpack_ids
+from src.hexasphere.geometry import R
+from src.hexasphere.stencil import Stencil
+
+
+class TestStencil(TestCase):
+
+    grid = hexgrid.HexGrid()
+    grid.projection = projection.SnyderEAProj(grid)
+
+    def test_neighbor_sum(self):
+
+        n = 5
+        stencil = Stencil(self.grid, n)
+
+        self.assertEqual(stencil.size, 10 * (n + 1) ** 2 + 2)
+        self.assertEqual(np.sum(stencil.degree == 5), 12)
+
+        field = np.random.default_rng(0).random(stencil.size)
+        computed_sum = stencil.neighbor_sum(field)
+
+        ids = {str_id: i for i, str_id in enumerate(self._str_ids(stencil))}
+        for i, str_id in enumerate(ids):
+            H = hexgrid.Hexagon(self.grid, str_id=str_id)
+            neighbors = {
+                H.compute_neighbor(tuple(dP)).to_str_id()
+                for dP in NEIGHBOR_OFFSETS
+            }
+            neighbors.discard(str_id)
+
+            self.assertAlmostEqual(
+                computed_sum[i],
+                sum(field[ids[h_id]] for h_id in neighbors)
+            )
+
+    def test_diffusion(self):
+
+        stencil = Stencil(self.grid, 8)
+
+        field = np.zeros(stencil.size)
+        field[[0, 100, stencil.pentagons[3]]] = 1
+
+        diffused = stencil.diffuse(field, rate=0.1, steps=20)
+
+        self.assertAlmostEqual(diffused.sum(), 3)
+        self.assertLess(diffused.max(), 1)
+        self.assertTrue(np.all(diffused >= 0))
+
+        laplacian = stencil.laplacian(np.ones(stencil.size))
+        self.assertTrue(np.allclose(laplacian, 0))
+
+    def test_convergence(self):
+
+        # f = z + xy: its Laplacian on the unit sphere is -2z - 6xy
+        errors = []
+        for n in [10, 20, 40]:
+            stencil = Stencil(self.grid, n)
+            X = ids_to_X(self.grid, stencil.cells)
+            x, y, z = X.T
+            field = z + x * y
+
+            gradient = np.stack([y, x, np.ones(len(X))], axis=1)
+            gradient -= (gradient * X).sum(axis=1)[:, None] * X
+            laplacian = -2 * z - 6 * x * y
+
+            errors.append(
+                [
+                    np.abs(stencil.gradient(field) * R - gradient).max(),
+                    np.abs(stencil.laplacian(field) * R**2 - laplacian).max(),
+                ]
+            )
+
+        errors = np.array(errors)
+        self.assertLess(errors[-1, 0], 1e-3)
+        self.assertLess(errors[-1, 1], 5e-3)
+
+        # Second order for the gradient, first order (on pentagons and seams)
+        # for the Laplacian
+        self.assertTrue(np.all(errors[:-1, 0] / errors[1:, 0] > 3.5))
+        self.assertTrue(np.all(errors[:-1, 1] / errors[1:, 1] > 1.8))
+
+    def test_spacing(self):
+
+        stencil = Stencil(self.grid, 6)
+        field = ids_to_X(self.grid, stencil.cells)[:, 2]
+        s = stencil.default_spacing()
+
+        self.assertTrue(
+            np.allclose(stencil.laplacian(field, spacing=1),
+                        stencil.laplacian(field) * s**2)
+        )
+        self.assertTrue(
+            np.allclose(stencil.gradient(field, spacing=1),
+                        stencil.gradient(field) * s)
+        )
+
+    def _str_ids(self, stencil):
+        face, pos = unpack_ids(stencil.cells)
+        return [
+            hexgrid.Hexagon.face_char[f] + "{:05}-{:05}-{:05}".format(*p)
+            for f, p in zip(face, pos)
+        ]
@@ -0,0 +1,149 @@
+import numpy as np
+from unittest import TestCase
+
+from src.hexasphere import batch, hexgrid, projection
+from src.hexasphere.stream import WindowAggregator
+
+
+class TestStream(TestCase):
+
+    def setUp(self):
+        self.grid = hexgrid.HexGrid()
+        self.grid.projection = projection.SnyderEAProj(self.grid)
+
+        rng = np.random.default_rng(0)
+        size = 5000
+        self.t = np.sort(rng.uniform(0, 100, size))
+        self.lat = rng.uniform(40, 42, size)
+        self.lon = rng.uniform(2, 4, size)
+        self.values = rng.normal(size=size)
+        self.n = 20
+        self.ids = batch.latlon_to_ids(self.grid, self.lat, self.lon, self.n)
+
+    def stream(self, aggregator, size=250):
+        windows = []
+        for i in range(0, len(self.t), size):
+            s = slice(i, i + size)
+            windows += aggregator.update(
+                self.t[s], self.lat[s], self.lon[s], self.values[s]
+            )
+        return windows + aggregator.flush()
+
+    def check(self, window, received=True):
+        inside = (self.t >= window["start"]) & (self.t < window["end"])
+        inside &= received
+        ids, inverse, counts = np.unique(
+            self.ids[inside], return_inverse=True, return_counts=True
+        )
+        np.testing.assert_array_equal(window["ids"], ids)
+        np.testing.assert_array_equal(window["count"], counts)
+        np.testing.assert_allclose(
+            window["sum"],
+            np.bincount(inverse.reshape(-1), weights=self.values[inside]),
+        )
+
+    def test_tumbling(self):
+
+        windows = self.stream(WindowAggregator(self.grid, self.n, 10))
+        starts = [w["start"] for w in windows]
+        self.assertEqual(starts, list(range(0, 100, 10)))
+        for window in windows:
+            self.check(window)
+
+    def test_sliding(self):
+
+        aggregator = WindowAggregator(self.grid, self.n, 10, slide=2)
+        windows = []
+        for i in range(0, len(self.t), 250):
+            s = slice(i, i + 250)
+            windows += aggregator.update(
+                self.t[s], self.lat[s], self.lon[s], self.values[s]
+            )
+            # State is bounded by the panes of a window
+            self.assertLessEqual(len(aggregator._panes), 6)
+        windows += aggregator.flush()
+
+        self.assertEqual([w["end"] for w in windows], list(range(2, 110, 2)))
+        for window in windows:
+            self.check(window)
+
+        self.assertEqual(len(aggregator), 0)
+
+    def test_parameters(self):
+
+        for slide in [0, -2]:
+            with self.assertRaises(ValueError):
+                WindowAggregator(self.grid, self.n, 10, slide=slide)
+        with self.assertRaises(ValueError):
+            WindowAggregator(self.grid, self.n, 10, slide=3)
+
+    def test_out_of_order(self):
+
+        # Events up to 15 time units out of order, with no lateness: some of
+        # them are dropped, the others are added to pending windows
+        rng = np.random.default_rng(1)
+        order = np.argsort(self.t + rng.uniform(0, 15, len(self.t)))
+        self.t, self.lat, self.lon, self.values, self.ids = (
+            x[order] for x in [self.t, self.lat, self.lon, self.values, self.ids]
+        )
+
+        aggregator = WindowAggregator(self.grid, self.n, 10, slide=1)
+        received = np.zeros(len(self.t), dtype=bool)
+        for i in range(0, len(self.t), 100):
+            s = slice(i, i + 100)
+            if aggregator._emitted is not None:
+                pane = np.floor(self.t[s])
+                received[s] = pane > aggregator._emitted - 10
+            else:
+                received[s] = True
+
+            for window in aggregator.update(
+                self.t[s], self.lat[s], self.lon[s], self.values[s]
+            ):
+                self.check(window, received)
+
+            # Checkpoints keep the running aggregates
+            aggregator = WindowAggregator.from_bytes(
+                self.grid, aggregator.to_bytes()
+            )
+
+        for window in aggregator.flush():
+            self.check(window, received)
+        self.assertEqual(aggregator.late, np.sum(~received))
+        self.assertGreater(aggregator.late, 0)
+
+    def test_late_events(self):
+
+        aggregator = WindowAggregator(self.grid, self.n, 10, lateness=5)
+        self.assertEqual(aggregator.update([3, 12], [0, 0], [0, 0]), [])
+        self.assertEqual(aggregator.update([4], [0], [0]), [])
+
+        # The window [0, 10) is emitted once the watermark reaches 15
+        windows = aggregator.update([16], [0], [0])
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(windows[0]["count"].tolist(), [2])
+
+        self.assertEqual(aggregator.update([5, 13], [0, 0], [0, 0]), [])
+        self.assertEqual(aggregator.late, 1)
+        self.assertEqual(aggregator.current()["count"].tolist(), [3])
+
+    def test_checkpoint(self):
+
+        aggregator = WindowAggregator(self.grid, self.n, 10, slide=5)
+        half = len(self.t) // 2
+        aggregator.update(
+            self.t[:half], self.lat[:half], self.lon[:half], self.values[:half]
+        )
+
+        restored = WindowAggregator.from_bytes(
+            self.grid, aggregator.to_bytes()
+        )
+        self.assertEqual(len(restored), len(aggregator))
+
+        s = slice(half, None)
+        for a in [aggregator, restored]:
+            a.update(self.t[s], self.lat[s], self.lon[s], self.values[s])
+        for w1, w2 in zip(aggregator.flush(), restored.flush()):
+            self.assertEqual(w1["start"], w2["start"])
+            np.testing.assert_array_equal(w1["ids"], w2["ids"])
+            np.testing.assert_array_equal(w1["sum"], w2["sum"])
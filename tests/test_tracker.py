@@ -0,0 +1,89 @@
+import numpy as np
+from unittest import TestCase
+
+from src.hexasphere import hexgrid, projection
+from src.hexasphere.tracker import HexTracker
+
+
+class TestTracker(TestCase):
+
+    def test_tracker(self):
+
+        grid = hexgrid.HexGrid()
+        proj = projection.SnyderEAProj(grid)
+        grid.projection = proj
+
+        n = 50
+        tracker = HexTracker(grid, n, out_str=True)
+
+        rng = np.random.default_rng(0)
+        for entity in range(5):
+            lat, lon = rng.uniform(-80, 80), rng.uniform(-170, 170)
+            for _ in range(100):
+                lat += rng.normal(0, 0.05)
+                lon += rng.normal(0, 0.05)
+
+                self.assertEqual(
+                    tracker.update(entity, lat, lon),
+                    grid.latlon_to_hex(lat, lon, n, out_str=True)[0]
+                )
+
+        self.assertEqual(tracker.hits + tracker.misses, 500)
+        self.assertGreater(tracker.hit_rate, 0.5)
+        self.assertEqual(tracker.stats()["entities"], 5)
+
+    def test_plane_test(self):
+
+        grid = hexgrid.HexGrid()
+        proj = projection.SnyderEAProj(grid)
+        grid.projection = proj
+
+        n = 50
+        tracker = HexTracker(grid, n, out_str=True)
+        hexagon = grid.latlon_to_hex(45, 3, n)[0]
+        lat, lon = grid.hex_to_latlon(hexagon)
+        tracker.update(0, lat, lon)
+
+        # Hits close to the center are decided without projecting
+        calls = []
+        project = proj.project
+        proj.project = lambda *args: calls.append(args) or project(*args)
+
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            self.assertEqual(
+                tracker.update(
+                    0, lat + rng.normal(0, 0.05), lon + rng.normal(0, 0.05)
+                ),
+                hexagon.to_str_id()
+            )
+        self.assertEqual(tracker.hits, 50)
+        self.assertEqual(calls, [])
+
+    def test_hysteresis(self):
+
+        grid = hexgrid.HexGrid()
+        proj = projection.GnomonicProj(grid)
+        grid.projection = proj
+
+        n = 35
+        height = grid.compute_height_for_n(n)
+        tracker = HexTracker(grid, n, hysteresis=0.5 * height, out_str=True)
+
+        # Latitude where the hexagon of points (lat, 0) changes
+        lats = np.linspace(0, 2 * height * 180 / (np.pi * 6371), 1000)
+        hexes = [grid.latlon_to_hex(lat, 0, n, out_str=True)[0] for lat in lats]
+        edge = lats[hexes.index(hexes[-1])]
+        self.assertNotEqual(hexes[0], hexes[-1])
+
+        # The point oscillates across the edge, but stays in its hexagon
+        first = tracker.update(0, edge - 0.002, 0)
+        self.assertEqual(first, hexes[0])
+
+        for i in range(20):
+            self.assertEqual(
+                tracker.update(0, edge + 0.002 * (-1) ** i, 0),
+                first
+            )
+
+        self.assertEqual(tracker.misses, 1)